@@ -614,6 +614,18 @@ EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Auto_Un_Check_Fitting_
 EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Auto_Un_Check_Fitting_Options', @language = 'Fr', @ref_desc = 'Fr: Auto Un-Checking Data Fitting Options'
 EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Auto_Select_Fitting_Options', @language = 'En', @ref_desc = 'Auto Reselecting Data Fitting Options'
 EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Auto_Select_Fitting_Options', @language = 'Fr', @ref_desc = 'Fr: Auto Reselecting Data Fitting Options'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Downsampled_Points', @language = 'En', @ref_desc = 'Showing {} of {} points'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Downsampled_Points', @language = 'Fr', @ref_desc = 'Affichage de {} points sur {}'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Top_N', @language = 'En', @ref_desc = 'Top N'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Top_N', @language = 'Fr', @ref_desc = 'Les N premiers'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Point_Budget', @language = 'En', @ref_desc = 'Point Budget'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Point_Budget', @language = 'Fr', @ref_desc = 'Budget de points'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Other', @language = 'En', @ref_desc = 'Other'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Other', @language = 'Fr', @ref_desc = 'Autre'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Animation_Dates_Averaged', @language = 'En', @ref_desc = '{} dates averaged into {} frames'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Animation_Dates_Averaged', @language = 'Fr', @ref_desc = '{} dates moyennes en {} images'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Animation_Dates_Skipped', @language = 'En', @ref_desc = 'Showing {} of {} dates'
+EXEC InsertOPRef @ref_table = 'Labels', @ref_value = 'LBL_Animation_Dates_Skipped', @language = 'Fr', @ref_desc = 'Affichage de {} dates sur {}'
 
 EXEC InsertOPRef @ref_table = 'Hierarchy_type', @ref_value = 'Organizations', @language = 'En', @ref_desc = 'Organizations'
 EXEC InsertOPRef @ref_table = 'Hierarchy_type', @ref_value = 'Commodities', @language = 'En', @ref_desc = 'Commodities'
@@ -242,16 +242,16 @@ begin
   --
   else if (@pr_action = 'Find')
   begin
+    -- the layouts themselves are not returned, they are fetched one at a time with Get
     declare @t_results table (ref_value varchar(64), ref_desc varchar(255), char_id int,
-        clob_filename varchar(64), clob_type varchar(64), clob_text varchar(max), clob_size int)
+        clob_filename varchar(64), clob_type varchar(64), clob_size int)
 
-    insert @t_results (ref_value, ref_desc, char_id, clob_filename, clob_type, clob_text, clob_size)
+    insert @t_results (ref_value, ref_desc, char_id, clob_filename, clob_type, clob_size)
     select ref.ref_value,
            ref.ref_desc,
            cha.char_id,
            ref.ref_table + '.json',
            'application/json',
-           cha.char_value_text,
            len(cha.char_value_text)
       from dbo.op_ref as ref with (nolock)
      inner join dbo.op_char as cha with (nolock)
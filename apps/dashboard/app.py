@@ -20,6 +20,7 @@ app.layout = get_layout
 import apps.dashboard.user_interface_callbacks
 import apps.dashboard.functionality_callbacks
 import apps.dashboard.saving_loading_callbacks
+import apps.dashboard.routes
 
 # ****************************************************CHECKLIST*******************************************************
 
@@ -12,18 +12,28 @@ from datetime import datetime, timedelta, date
 # import numpy as np
 import pandas as pd
 import logging
+import json
+from hashlib import md5
+from bisect import bisect_left
+from heapq import nsmallest
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from threading import Lock
 from pandas import DataFrame
 from vaex import from_pandas
-from numpy import nan, datetime64, float64, full
+from numpy import nan, datetime64, float64, full, int64, arange, empty, absolute, union1d, flatnonzero, nan_to_num, \
+    concatenate
 # import pyodbc
 from dateutil.relativedelta import relativedelta
-from flask import session
+from flask import session, current_app
+from treelib import Tree
 import statsmodels.api as sm
 from statsmodels.sandbox.regression.predstd import wls_prediction_std
 from sklearn.preprocessing import PolynomialFeatures
 
 # Internal Modules
-# import config
+import config
 from conn import get_ref, exec_storedproc_results
 from server import get_hierarchy  # , get_hierarchy_parent, get_variable_parent,
 
@@ -86,19 +96,189 @@ DATA_CONTENT_SHOW = {'max-width': '300px', 'min-width': '300px', 'background-col
 DATA_CONTENT_HIDE = {'display': 'none'}
 
 
+# ********************************************RENDER CACHE************************************************************
+
+# render stage results are kept in the process rather than the pickled flask session, by user session (least recently
+# used sessions are dropped first) then by stage, each stage being its own LRU
+RENDER_CACHES = OrderedDict()
+RENDER_CACHE_LOCK = Lock()
+
+
+def get_render_cache_key(*params):
+    """Returns a canonical cache key for the given render parameters."""
+    return md5(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_render_stage(cache_type):
+    """Returns the user session's LRU of a render stage. Must be called holding RENDER_CACHE_LOCK."""
+    stages = RENDER_CACHES.pop(session['sessionID'], {})
+    RENDER_CACHES[session['sessionID']] = stages
+    while len(RENDER_CACHES) > config.RENDER_CACHE_SESSIONS:
+        RENDER_CACHES.popitem(last=False)
+    return stages.setdefault(cache_type, OrderedDict())
+
+
+def get_render_cache(cache_type, key):
+    """Returns the cached render stage result for the key, None if it is not cached."""
+    with RENDER_CACHE_LOCK:
+        stage = get_render_stage(cache_type)
+        if key not in stage:
+            return None
+        stage.move_to_end(key)
+        return stage[key]
+
+
+def set_render_cache(cache_type, key, value):
+    """Caches a render stage result, evicting the stage's oldest entries past the configured cache size."""
+    with RENDER_CACHE_LOCK:
+        stage = get_render_stage(cache_type)
+        stage[key] = value
+        stage.move_to_end(key)
+        while len(stage) > config.RENDER_CACHE_SIZE:
+            stage.popitem(last=False)
+
+
+def clear_render_cache():
+    """Drops every cached render stage result of the user session."""
+    with RENDER_CACHE_LOCK:
+        RENDER_CACHES.pop(session['sessionID'], None)
+
+
+# ********************************************DATA SET VERSIONS*******************************************************
+
+# versions of the data sets loaded by this process, shared by every user session, by language and session key
+DATASET_VERSIONS = {}
+DATASET_VERSIONS_LOCK = Lock()
+
+# digest of a data set pulled without rows, so an emptied data set still gets a version of its own
+EMPTY_DATASET_DIGEST = 'empty'
+
+
+def get_dataset_digest(df):
+    """Returns the digest of a pulled data set's rows."""
+    return md5(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def set_dataset_version(session_key, digest):
+    """
+    Records the version of a loaded data set and returns it: the digest of its rows and the time the process first
+    loaded those rows, so reloading unchanged data keeps its version.
+    """
+    with DATASET_VERSIONS_LOCK:
+        version = DATASET_VERSIONS.get((session['language'], session_key))
+        if version is None or version[0] != digest:
+            version = (digest, datetime.utcnow().replace(microsecond=0))
+            DATASET_VERSIONS[(session['language'], session_key)] = version
+    return version
+
+
+def get_dataset_version(session_key):
+    """
+    Returns the version of the data set loaded in the user session, else the last version loaded by the process, None
+    if the process has not loaded the data set.
+    """
+    version = session.get('dataset_versions', {}).get(session_key)
+    if version is None:
+        with DATASET_VERSIONS_LOCK:
+            version = DATASET_VERSIONS.get((session['language'], session_key))
+    return version
+
+
+# ********************************************HIERARCHY TREES*********************************************************
+
+# hierarchy trees shared by every user session, keyed on their data set's session key and version, least recently used
+# trees are dropped first
+HIERARCHY_TREES = OrderedDict()
+HIERARCHY_TREES_LOCK = Lock()
+
+
+# ********************************************DATA SET CONSTANTS******************************************************
+
+
+def get_loaded_version(session_key):
+    """Returns the digest of the data set version loaded in the user session, None if it is not loaded."""
+    version = session.get('dataset_versions', {}).get(session_key)
+    return version and version[0]
+
+
+def get_df_const_token(df_const):
+    """
+    Caches the data set constants server-side, keyed on the version of the data set loaded in the user session, and
+    returns the token kept in the df-constants-storage store. The token holds each data set's version and the measure
+    type values read by the clientside callbacks.
+    """
+    if df_const is None:
+        return None
+    token = {}
+    for session_key in df_const:
+        version = get_loaded_version(session_key)
+        session['df_const_' + session_key] = (version, df_const[session_key])
+        token[session_key] = {
+            'VERSION': version,
+            'MEASURE_TYPE_VALUES': df_const[session_key]['MEASURE_TYPE_VALUES'] if df_const[session_key] else None}
+    return token
+
+
+def get_df_const(df_const_token):
+    """Returns the data set constants of a df-constants-storage token, resolved from the server-side cache."""
+    if df_const_token is None:
+        return None
+    df_const = {}
+    for session_key in df_const_token:
+        version, constants = session.get('df_const_' + session_key, (None, None))
+        # constants missing from the cache, or of another version of the data set than the token's or the one loaded
+        # in the session, are left out so callers reload them like any data set not yet loaded
+        if 'df_const_' + session_key in session and \
+                df_const_token[session_key]['VERSION'] == version == get_loaded_version(session_key):
+            df_const[session_key] = constants
+    return df_const
+
+
 # ********************************************DATASET*****************************************************************
 
 
 def dataset_to_df(df_name, time_period):
     """Queries for the dataset and returns a formatted pandas, data frame."""
+    return store_dataset(df_name, time_period,
+                         *pull_dataset(df_name, time_period, session["sessionID"], session["language"]))
+
+
+def store_dataset(df_name, time_period, df_vaex, digest, node_df_vaex):
+    """
+    Records a pulled data set's version, and its node data, in the user session and returns the data frame. Called on
+    the request thread only.
+    """
+    # figures and aggregates rendered from the previous load are stale, even if the data set is now empty
+    clear_render_cache()
+    # exports and api responses are keyed on the version of the loaded data
+    session_key = df_name if df_name == 'OPG010' else df_name + time_period
+    session.setdefault('dataset_versions', {})[session_key] = set_dataset_version(session_key, digest)
+    if node_df_vaex is not None:
+        session[df_name + "_NodeData"] = node_df_vaex
+    else:
+        session.pop(df_name + "_NodeData", None)
+    # node data was reloaded, drop the stale sankey node metadata built from the previous load in every language
+    for lookup in [key for key in session if key.startswith(df_name + "_NodeMeta_")]:
+        session.pop(lookup)
+    return df_vaex
+
+
+def pull_dataset(df_name, time_period, session_id, language):
+    """
+    Queries for the dataset and returns the formatted vaex data frame, the digest of its rows and its node data, None if
+    it has none. The digest of an empty data set is EMPTY_DATASET_DIGEST. Does not touch the flask session, so data
+    sets can be pulled concurrently (see load_data_sets).
+    """
     query = """\
     declare @p_result_status varchar(255)
     exec dbo.OPP_Get_DataSet {}, \'{}\', \'{}\',\'{}\', @p_result_status output
     select @p_result_status as result_status
-    """.format(session["sessionID"], session["language"], df_name, time_period)
+    """.format(session_id, language, df_name, time_period)
     df = exec_storedproc_results(query)
     if df.empty:
-        return df
+        return df, EMPTY_DATASET_DIGEST, None
+    digest = get_dataset_digest(df)
+    node_df_vaex = None
     df_vaex = from_pandas(df)
     df_vaex.variables['nan'] = nan
     logging.debug("done converting pandas to vaex")
@@ -108,7 +288,7 @@ def dataset_to_df(df_name, time_period):
         declare @p_result_status varchar(255)
         exec dbo.opp_get_dataset_nodedata {}, \'{}\', \'{}\', @p_result_status output
         select @p_result_status as result_status
-        """.format(session["sessionID"], session["language"], df_name)
+        """.format(session_id, language, df_name)
 
         node_df = exec_storedproc_results(query)
         node_df_vaex = from_pandas(node_df)
@@ -116,7 +296,6 @@ def dataset_to_df(df_name, time_period):
         node_df_vaex['x_coord'] = node_df_vaex['x_coord'].astype('float64')
         node_df_vaex['y_coord'] = node_df_vaex['y_coord'].astype('float64')
 
-        session[df_name + "_NodeData"] = node_df_vaex
         df_vaex['Measure Type'] = df_vaex.func.where(df_vaex['Measure Type'] == '', None, df_vaex['Measure Type'])
         df_vaex['Partial Period'] = df_vaex.func.where(df_vaex['Partial Period'] == '', 'False',
                                                        df_vaex['Partial Period'])
@@ -214,7 +393,97 @@ def dataset_to_df(df_name, time_period):
         df_vaex.Link = list(map(lambda x: '[Link]({})'.format(x), df.Link))
 
     logging.debug("dataset {} loaded.".format(df_name))
-    return df_vaex
+    return df_vaex, digest, node_df_vaex
+
+
+def get_node_metadata(df_name):
+    """
+    Returns the sankey node labels, long labels, coordinates and colours for the dataset. Built once per dataset and
+    language from the node data and cached in the session.
+    """
+    lookup = df_name + "_NodeMeta_" + session["language"]
+    node_meta = session.get(lookup)
+
+    if node_meta is None:
+        node_df = session[df_name + "_NodeData"].to_pandas_df(['node_id', 'x_coord', 'y_coord', 'colour'])
+        node_ids = "LBL_" + node_df['node_id'].astype(str)
+        node_meta = {'label': get_labels(node_ids, df_name),
+                     'customdata': get_labels(node_ids + "_Long", df_name),
+                     'x': node_df['x_coord'].to_numpy(),
+                     'y': node_df['y_coord'].to_numpy(),
+                     'colour': node_df['colour'].to_numpy(dtype=object)}
+        session[lookup] = node_meta
+        logging.debug("node metadata for {} built.".format(df_name))
+
+    return node_meta
+
+
+def get_hierarchy_tree(session_key, secondary=False):
+    """
+    Returns the tree of the data set's hierarchy, or of its secondary (variable) hierarchy. Node identifiers are the
+    node id paths of the hierarchy filters ('root^||^...') and children are in dropdown order. Each node's data is the
+    prefix search index of its children, see search_hierarchy_children(). Built once per data set version and cached
+    in the process.
+    """
+    tree_key = (session_key, get_loaded_version(session_key), secondary)
+    with HIERARCHY_TREES_LOCK:
+        tree = HIERARCHY_TREES.get(tree_key)
+        if tree is not None:
+            HIERARCHY_TREES.move_to_end(tree_key)
+
+    if tree is None:
+        if secondary:
+            hierarchy_levels = ['Variable Name', 'Variable Name Qualifier', 'Variable Name Sub Qualifier']
+        else:
+            hierarchy_levels = ['H0', 'H1', 'H2', 'H3', 'H4']
+        paths = session[session_key][hierarchy_levels].to_pandas_df().drop_duplicates()
+        tree = Tree()
+        tree.create_node('root', 'root')
+        for depth in range(len(hierarchy_levels)):
+            # every distinct path down to this level, sorted so each node's children are added in order
+            level_paths = paths[hierarchy_levels[:depth + 1]].dropna().drop_duplicates() \
+                .sort_values(hierarchy_levels[:depth + 1])
+            for path in level_paths.itertuples(index=False, name=None):
+                parent = '^||^'.join(['root'] + [str(name) for name in path[:-1]])
+                tree.create_node(path[-1], '{}^||^{}'.format(parent, path[-1]), parent=parent)
+        # children keys lowered and sorted, so the children starting with a typed prefix are found by bisection, each
+        # with its position in dropdown order
+        for node in tree.all_nodes_itr():
+            children = sorted((str(child.tag).lower(), position, child.tag)
+                              for position, child in enumerate(tree.children(node.identifier)))
+            node.data = ([key for key, _, _ in children], [(position, name) for _, position, name in children])
+        with HIERARCHY_TREES_LOCK:
+            HIERARCHY_TREES[tree_key] = tree
+            while len(HIERARCHY_TREES) > config.HIERARCHY_CACHE_SIZE:
+                HIERARCHY_TREES.popitem(last=False)
+        logging.debug("hierarchy tree for {} built.".format(session_key))
+
+    return tree
+
+
+def get_hierarchy_children(session_key, nid_path, secondary=False):
+    """Returns the sorted children of a hierarchy node, none if the node is a leaf or not in the data set."""
+    tree = get_hierarchy_tree(session_key, secondary)
+    if not tree.contains(nid_path):
+        return []
+    return [node.tag for node in tree.children(nid_path)]
+
+
+def search_hierarchy_children(session_key, nid_path, search_value, limit, secondary=False):
+    """
+    Returns up to limit children of a hierarchy node starting with the searched prefix, ignoring case, in dropdown
+    order.
+    """
+    tree = get_hierarchy_tree(session_key, secondary)
+    if not tree.contains(nid_path):
+        return []
+    if not search_value:
+        return [node.tag for node in tree.children(nid_path)[:limit]]
+    keys, names = tree[nid_path].data
+    prefix = search_value.lower()
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + '\U0010ffff', start)
+    return [name for _, name in nsmallest(limit, names[start:end])]
 
 
 def generate_constants(df_name, session_key):
@@ -447,6 +716,49 @@ def generate_constants(df_name, session_key):
     return storage
 
 
+def load_data_sets(data_sets, df_const):
+    """
+    Loads the data sets missing from the session or the constants concurrently and returns the constants with theirs
+    added. Each worker only pulls its data set on its own connection, pooled by the ODBC driver manager, the session
+    is written on the request thread once every data set is pulled.
+    :param data_sets: (df_name, time_period) pairs, duplicates are loaded once
+    :param df_const: the data set constants, None if there are none yet
+    """
+    pending = {}
+    for df_name, time_period in data_sets:
+        session_key = df_name if df_name == 'OPG010' else df_name + time_period
+        if session_key not in session or (df_const is not None and session_key not in df_const):
+            pending[session_key] = (df_name, time_period)
+
+    if not pending:
+        return df_const
+
+    app = current_app._get_current_object()
+
+    def pull_data_set(df_name, time_period, session_id, language):
+        """Pulls the data set in its own app context, so on its own connection, and returns it."""
+        start = perf_counter()
+        with app.app_context():
+            pulled = pull_dataset(df_name, time_period, session_id, language)
+        logging.debug("{} pulled in {:.2f}s.".format(df_name + time_period, perf_counter() - start))
+        return pulled
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(pending), config.DATASET_LOAD_WORKERS)) as executor:
+        futures = {session_key: executor.submit(pull_data_set, df_name, time_period, session['sessionID'],
+                                                session['language'])
+                   for session_key, (df_name, time_period) in pending.items()}
+    if df_const is None:
+        df_const = {}
+    for session_key, future in futures.items():
+        df_name, time_period = pending[session_key]
+        session[session_key] = store_dataset(df_name, time_period, *future.result())
+        df_const[session_key] = generate_constants(df_name, session_key)
+    logging.debug("{} data sets loaded in {:.2f}s.".format(len(pending), perf_counter() - start))
+
+    return df_const
+
+
 # ****************************************************DATE FUNCTIONS**************************************************
 def last_calender_week(year):
     try:
@@ -739,6 +1051,28 @@ def data_manipulator(hierarchy_path, hierarchy_toggle, hierarchy_level_dropdown,
     return filtered_df
 
 
+def get_filtered_base(hierarchy_path, hierarchy_toggle, hierarchy_level_dropdown, hierarchy_graph_children, df_name,
+                      df_const, secondary_type, end_secondary, end_year, start_secondary, start_year, timeframe,
+                      fiscal_toggle, num_periods, period_type, session_key):
+    """
+    Returns a copy of the hierarchy and date filtered data frame. The filtered frame is shared by every tile with the
+    same selections, so linked tiles filter once per parent data menu change.
+    """
+    base_key = get_render_cache_key(df_name, session_key, hierarchy_path, hierarchy_toggle, hierarchy_level_dropdown,
+                                    hierarchy_graph_children, secondary_type, end_secondary, end_year, start_secondary,
+                                    start_year, timeframe, fiscal_toggle, num_periods, period_type)
+    filtered_df = get_render_cache('base', base_key)
+
+    if filtered_df is None:
+        filtered_df = data_manipulator(hierarchy_path, hierarchy_toggle, hierarchy_level_dropdown,
+                                       hierarchy_graph_children, df_name, df_const, secondary_type, end_secondary,
+                                       end_year, start_secondary, start_year, timeframe, fiscal_toggle, num_periods,
+                                       period_type, session_key=session_key)
+        set_render_cache('base', base_key, filtered_df)
+
+    return filtered_df.copy()
+
+
 def data_hierarchy_filter(hierarchy_path, hierarchy_toggle, hierarchy_level_dropdown, hierarchy_graph_children, df_name,
                           df_const, session_key):
     """Returns filtered the data frame based on hierarchy selections."""
@@ -2335,11 +2669,8 @@ def customize_menu_filter(dff, measure_type, df_const, secondary_path,
 
 # *********************************************LANGUAGE DATA***********************************************************
 
-def get_label(label, table=None):
-    """Given a label returns the appropriate ref_desc from OP_Ref."""
-    if label is None:
-        return None
-
+def get_label_df(table=None):
+    """Returns the OP_Ref labels of the given table, loading them into the session on first use."""
     lookup = "labels"
 
     if table is None:
@@ -2353,6 +2684,18 @@ def get_label(label, table=None):
         language_df = get_ref(table, session["language"])
         session[lookup] = language_df
 
+    return language_df
+
+
+def get_label(label, table=None):
+    """Given a label returns the appropriate ref_desc from OP_Ref."""
+    if label is None:
+        return None
+
+    if table is None:
+        table = "Labels"
+
+    language_df = get_label_df(table)
     row = language_df[language_df["ref_value"] == label]
 
     if len(row) != 1:
@@ -2361,6 +2704,21 @@ def get_label(label, table=None):
     return row["ref_desc"].iloc[0]
 
 
+def get_labels(labels, table=None):
+    """Given a series of labels returns the matching ref_desc values from OP_Ref as a numpy array."""
+    if table is None:
+        table = "Labels"
+
+    language_df = get_label_df(table)
+    # ambiguous labels resolve to a key error, same as get_label
+    language_df = language_df.drop_duplicates(subset="ref_value", keep=False)
+    descriptions = labels.map(language_df.set_index("ref_value")["ref_desc"])
+    missing = descriptions.isna()
+    descriptions[missing] = 'Key Error: {}|'.format(table) + labels[missing]
+
+    return descriptions.to_numpy(dtype=object)
+
+
 # ********************************************DATA FITTING OPERATIONS**************************************************
 
 def linear_regression(df, x, y, ci):
@@ -2407,3 +2765,128 @@ def confidence_intervals(model):
     """
     _, lower, upper = wls_prediction_std(model)
     return lower, upper
+
+
+# ********************************************BOX PLOT STATISTICS*****************************************************
+
+def box_plot_statistics(dff, group_columns, outlier_cap):
+    """
+    Computes the quartiles, mean and Tukey fences of 'Measure Value' for every group. Returns the statistics data frame
+    (one row per group) and the outliers data frame, capped to the most extreme outliers of each group.
+    """
+    grouped = dff.groupby(group_columns, sort=False)['Measure Value']
+    mean = grouped.mean()
+    stats_df = grouped.quantile([0.25, 0.5, 0.75]).unstack().reindex(mean.index)
+    stats_df.columns = ['q1', 'median', 'q3']
+    stats_df['mean'] = mean
+
+    # values inside 1.5 IQR of the quartiles set the whiskers, everything else is an outlier
+    iqr = stats_df['q3'] - stats_df['q1']
+    bounds = DataFrame({'low': stats_df['q1'] - 1.5 * iqr, 'high': stats_df['q3'] + 1.5 * iqr,
+                        'median': stats_df['median']})
+    values = dff[group_columns + ['Measure Value']].join(bounds, on=group_columns)
+    values = values[values['Measure Value'].notna()]
+    inside = values['Measure Value'].between(values['low'], values['high'])
+
+    fences = values[inside].groupby(group_columns, sort=False)['Measure Value'].agg(['min', 'max'])
+    stats_df['lowerfence'] = fences['min']
+    stats_df['upperfence'] = fences['max']
+
+    outliers_df = values[~inside]
+    outliers_df = outliers_df.assign(distance=(outliers_df['Measure Value'] - outliers_df['median']).abs())
+    outliers_df = outliers_df.sort_values(by='distance', ascending=False).groupby(group_columns, sort=False).head(
+        outlier_cap)
+
+    return stats_df.reset_index(), outliers_df[group_columns + ['Measure Value']]
+
+
+# *********************************************DOWNSAMPLING OPERATIONS*************************************************
+
+def lttb_downsample(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the positional indices of the points kept, always including
+    the first and last point.
+    """
+    length = len(x)
+
+    if threshold >= length or threshold < 3:
+        return arange(length)
+
+    y = nan_to_num(y)
+    bucket_size = (length - 2) / (threshold - 2)
+    kept = empty(threshold, dtype=int64)
+    kept[0] = 0
+    kept[-1] = length - 1
+    selected = 0
+
+    for i in range(threshold - 2):
+        bucket_start = int(i * bucket_size) + 1
+        bucket_end = int((i + 1) * bucket_size) + 1
+        # average of the next bucket is the third corner of the triangle
+        next_end = min(int((i + 2) * bucket_size) + 1, length)
+        avg_x = x[bucket_end:next_end].mean()
+        avg_y = y[bucket_end:next_end].mean()
+
+        areas = absolute((x[selected] - avg_x) * (y[bucket_start:bucket_end] - y[selected]) -
+                         (x[selected] - x[bucket_start:bucket_end]) * (avg_y - y[selected]))
+        selected = bucket_start + int(areas.argmax())
+        kept[i + 1] = selected
+
+    return kept
+
+
+def downsample_traces(dff, trace_columns, point_budget):
+    """
+    Downsamples each trace of a time series data frame (sorted by trace then date) so the whole frame fits within the
+    point budget. The extremes and partial periods of every trace are always kept. Returns the downsampled data frame.
+    """
+    if len(dff) <= point_budget:
+        return dff
+
+    dff = dff.reset_index(drop=True)
+    x_values = pd.to_datetime(dff['Date of Event']).to_numpy().astype(int64).astype(float64)
+    y_values = dff['Measure Value'].to_numpy(dtype=float64)
+    partial = (dff['Partial Period'].astype(str) == 'True').to_numpy()
+    traces = dff.groupby(trace_columns, sort=False, dropna=False).indices if trace_columns else {None: arange(len(dff))}
+    trace_budget = max(point_budget // len(traces), 3)
+    kept = []
+
+    for positions in traces.values():
+        positions = positions[x_values[positions].argsort(kind='stable')]
+        trace_y = nan_to_num(y_values[positions])
+        trace_kept = lttb_downsample(x_values[positions], trace_y, trace_budget)
+        if len(trace_kept) != len(positions):
+            trace_kept = union1d(trace_kept, flatnonzero(partial[positions]))
+            trace_kept = union1d(trace_kept, [trace_y.argmax(), trace_y.argmin()])
+        kept.append(positions[trace_kept])
+
+    return dff.take(concatenate(kept))
+
+
+# *********************************************TOP-N BUCKETING*********************************************************
+
+def top_n_bucketing(dff, member_column, top_n, other_label, rank_mask=None):
+    """
+    Keeps the top n members of member_column (ranked by total 'Measure Value', optionally over the rank_mask rows only)
+    and sums every other member into a single "Other" member per date, variable and measure type. Returns the bucketed
+    data frame.
+    """
+    if not top_n or member_column not in dff.columns or 'Measure Value' not in dff.columns \
+            or dff[member_column].nunique() <= int(top_n):
+        return dff
+
+    ranking_df = dff[rank_mask] if rank_mask is not None else dff
+    top_members = ranking_df.groupby(member_column)['Measure Value'].sum().nlargest(int(top_n)).index
+    is_top = dff[member_column].isin(top_members)
+
+    # member specific columns no longer describe the bucket, blank them so the remaining members collapse together
+    other_df = dff[~is_top].assign(**{col: nan for col in ['Hierarchy One Name', 'H0', 'H1', 'H2', 'H3', 'H4', 'H5',
+                                                          'Activity Event Id'] if col in dff.columns})
+    other_df[member_column] = other_label
+    other_df['Partial Period'] = other_df['Partial Period'].astype(str) == 'True'
+    group_columns = [col for col in other_df.columns if col not in ['Measure Value', 'Partial Period']]
+    other_df = other_df.groupby(group_columns, sort=False, dropna=False, as_index=False).agg(
+        {'Measure Value': 'sum', 'Partial Period': 'max'})
+    other_df['Partial Period'] = other_df['Partial Period'].map({True: True, False: nan})
+
+    return pd.concat([dff[is_top], other_df[dff.columns]], ignore_index=True)
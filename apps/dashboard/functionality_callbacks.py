@@ -9,41 +9,143 @@ Stores all callbacks for the functionality of the app.
 # External Packages
 import math
 import dash
-from dash.dependencies import Input, Output, State, ALL, MATCH
+from dash.dependencies import Input, Output, State, ALL, MATCH, ClientsideFunction
 from dash.exceptions import PreventUpdate
 from dash_html_components import Div, Button, P, Header
 import dash_core_components as dcc
-from re import search
+from re import search, compile as compile_regex
+from functools import lru_cache
+from numpy import ones, flatnonzero
 from flask import session
 from dash import no_update
 
 # Internal Modules
-from apps.dashboard.graphs import __update_graph
+import config
+from apps.dashboard.graphs import __update_graph, get_hierarchy_trail, set_graph_tile
 from apps.dashboard.hierarchy_filter import generate_history_button, generate_dropdown
-from apps.dashboard.secondary_hierarchy_filter import generate_secondary_history_button, generate_secondary_dropdown
+from apps.dashboard.secondary_hierarchy_filter import generate_secondary_history_button, generate_secondary_dropdown, \
+    get_secondary_options
 from apps.dashboard.app import app
-from apps.dashboard.data import CLR, get_label, GRAPH_OPTIONS, data_manipulator
+from apps.dashboard.data import CLR, get_label, GRAPH_OPTIONS, get_filtered_base, get_render_cache_key, \
+    get_render_cache, set_render_cache, get_df_const
 from apps.dashboard.datepicker import get_date_box, update_date_columns, get_secondary_data
 
 # Contents:
 #   GRAPH
+#       - PARENT_SPEC_KEYS
+#       - get_parent_spec()
+#       - set_parent_spec()
+#       - _publish_parent_spec()
 #       - _update_graph()
+#       - updateGraphStyle() (clientside)
 #   HIERARCHY
 #       - _print_choice_to_display_and_modify_dropdown()
+#       - _print_choice_to_display_and_modify_secondary_dropdown()
+#       - _search_secondary_dropdown()
 #       - _show_filter_based_on_hierarchy_toggle()
 #   DATE PICKER
 #       - _update_date_picker()
 #       - _unlock_past_x_selections()
 #   DATA-TABLE
 #       - operators
+#       - filter_part_pattern
 #       - split_filter_part()
+#       - compile_filter_query()
+#       - get_filtered_positions()
+#       - trim_table_cache()
 #       - _update_table()
 # ***************************************************GRAPH************************************************************
 
+PARENT_SPEC_KEYS = ('secondary_type', 'timeframe', 'fiscal_toggle', 'start_year', 'end_year', 'start_secondary',
+                    'end_secondary', 'num_periods', 'period_type', 'state_of_display', 'hierarchy_toggle',
+                    'hierarchy_level_dropdown', 'hierarchy_graph_children', 'hierarchy_options', 'df_name',
+                    'df_confirm', 'time_period', 'hierarchy_type')
+
+
+def get_parent_spec(token):
+    """Returns the parent data menu's published selections for a parent-spec token, or None if it has expired."""
+    return session.get('parent_specs', {}).get(token)
+
+
+def set_parent_spec(token, parent_spec):
+    """Stores the parent data menu's selections under their token, keeping the most recent specs per session."""
+    parent_specs = session.get('parent_specs', {})
+    parent_specs.pop(token, None)
+    parent_specs[token] = parent_spec
+    while len(parent_specs) > config.RENDER_CACHE_SIZE:
+        del parent_specs[next(iter(parent_specs))]
+    session['parent_specs'] = parent_specs
+
+
+# publishes the parent data menu's selections once for every linked tile, tiles only receive the spec's token
+@app.callback(
+    Output('parent-spec', 'data'),
+    [Input({'type': 'date-picker-trigger', 'index': 4}, 'data-boolean'),
+     Input({'type': 'num-periods', 'index': 4}, 'value'),
+     Input({'type': 'period-type', 'index': 4}, 'value'),
+     Input({'type': 'hierarchy_display_button', 'index': 4}, 'children'),
+     Input({'type': 'hierarchy-toggle', 'index': 4}, 'value'),
+     Input({'type': 'hierarchy_level_dropdown', 'index': 4}, 'value'),
+     Input({'type': 'graph_children_toggle', 'index': 4}, 'value')],
+    [State({'type': 'start-year-input', 'index': 4}, 'name'),
+     State({'type': 'radio-timeframe', 'index': 4}, 'value'),
+     State({'type': 'fiscal-year-toggle', 'index': 4}, 'value'),
+     State({'type': 'start-year-input', 'index': 4}, 'value'),
+     State({'type': 'end-year-input', 'index': 4}, 'value'),
+     State({'type': 'start-secondary-input', 'index': 4}, 'value'),
+     State({'type': 'end-secondary-input', 'index': 4}, 'value'),
+     State({'type': 'hierarchy_specific_dropdown', 'index': 4}, 'options'),
+     State({'type': 'data-set', 'index': 4}, 'value'),
+     State({'type': 'data-set-parent', 'index': 4}, 'value'),
+     State({'type': 'time-period', 'index': 4}, 'value'),
+     State({'type': 'hierarchy_type_dropdown', 'index': 4}, 'value'),
+     State('parent-spec', 'data'),
+     State({'type': 'tile-link', 'index': ALL}, 'className'),
+     State('df-constants-storage', 'data')]
+)
+def _publish_parent_spec(_datepicker_trigger, num_periods, period_type, state_of_display, hierarchy_toggle,
+                         hierarchy_level_dropdown, hierarchy_graph_children, secondary_type, timeframe, fiscal_toggle,
+                         start_year, end_year, start_secondary, end_secondary, hierarchy_options, df_name, df_confirm,
+                         time_period, hierarchy_type, prev_token, link_states, df_const):
+    parent_spec = {'secondary_type': secondary_type, 'timeframe': timeframe, 'fiscal_toggle': fiscal_toggle,
+                   'start_year': start_year, 'end_year': end_year, 'start_secondary': start_secondary,
+                   'end_secondary': end_secondary, 'num_periods': num_periods, 'period_type': period_type,
+                   'state_of_display': state_of_display, 'hierarchy_toggle': hierarchy_toggle,
+                   'hierarchy_level_dropdown': hierarchy_level_dropdown,
+                   'hierarchy_graph_children': hierarchy_graph_children, 'hierarchy_options': hierarchy_options,
+                   'df_name': df_name, 'df_confirm': df_confirm, 'time_period': time_period,
+                   'hierarchy_type': hierarchy_type}
+    token = get_render_cache_key(parent_spec)
+
+    # unchanged selections (e.g. a re-validated date picker) do not redraw the linked tiles
+    if token == prev_token and get_parent_spec(token) is not None:
+        raise PreventUpdate
+
+    set_parent_spec(token, parent_spec)
+
+    # filter the parent's data once here, before the linked tiles fire, so each tile only aggregates and draws a copy
+    if 'fa fa-link' in link_states and df_name is not None and start_year and end_year and start_secondary and \
+            end_secondary and (num_periods or timeframe != 'to-current'):
+        if df_name != 'OPG010':
+            session_key = df_name + time_period
+        else:
+            session_key = df_name
+        df_const = get_df_const(df_const)
+        if session_key in session and session_key in df_const:
+            get_filtered_base(get_hierarchy_trail(state_of_display, hierarchy_toggle, hierarchy_graph_children,
+                                                  hierarchy_options), hierarchy_toggle, hierarchy_level_dropdown,
+                              hierarchy_graph_children, df_name, df_const, secondary_type, end_secondary, end_year,
+                              start_secondary, start_year, timeframe, fiscal_toggle, num_periods, period_type,
+                              session_key)
+
+    return token
+
+
 # update graph
 for x in range(4):
     @app.callback(
         [Output({'type': 'graph_display', 'index': x}, 'children'),
+         Output({'type': 'graph_display', 'index': x}, 'data-drawn'),
          Output({'type': 'axes-popup', 'index': x}, 'children'),
          Output({'type': 'axes-popup', 'index': x}, 'is_open'),
          Output({'type': 'data-fitting-trigger', 'index': x}, 'value'),
@@ -55,8 +157,6 @@ for x in range(4):
         [Input({'type': 'update-graph-trigger', 'index': x}, 'data-graph_menu_trigger'),
          # Customize menu inputs
          Input({'type': 'args-value: {}'.replace("{}", str(x)), 'index': ALL}, 'value'),
-         Input({'type': 'gridline', 'index': x}, 'value'),
-         Input({'type': 'legend', 'index': x}, 'value'),
          Input({'type': 'graph-type-dropdown', 'index': x}, 'value'),
          # View menu inputs
          Input({'type': 'tile-title', 'index': x}, 'value'),
@@ -64,20 +164,13 @@ for x in range(4):
          Input({'type': 'date-picker-trigger', 'index': x}, 'data-boolean'),
          Input({'type': 'num-periods', 'index': x}, 'value'),
          Input({'type': 'period-type', 'index': x}, 'value'),
-         # Date Picker parent inputs
-         Input({'type': 'date-picker-trigger', 'index': 4}, 'data-boolean'),
-         Input({'type': 'num-periods', 'index': 4}, 'value'),
-         Input({'type': 'period-type', 'index': 4}, 'value'),
          # Hierarchy inputs for tiles data menu
          Input({'type': 'hierarchy-toggle', 'index': x}, 'value'),
          Input({'type': 'hierarchy_level_dropdown', 'index': x}, 'value'),
          Input({'type': 'graph_children_toggle', 'index': x}, 'value'),
          Input({'type': 'hierarchy_display_button', 'index': x}, 'children'),
-         # Hierarchy inputs for parent data menu
-         Input({'type': 'hierarchy_display_button', 'index': 4}, 'children'),
-         Input({'type': 'hierarchy-toggle', 'index': 4}, 'value'),
-         Input({'type': 'hierarchy_level_dropdown', 'index': 4}, 'value'),
-         Input({'type': 'graph_children_toggle', 'index': 4}, 'value'),
+         # Parent data menu selections, published once by _publish_parent_spec
+         Input('parent-spec', 'data'),
          # Secondary Hierarchy
          Input({'type': 'secondary_hierarchy_display_button', 'index': x}, 'children'),
          Input({'type': 'secondary_hierarchy-toggle', 'index': x}, 'value'),
@@ -90,28 +183,17 @@ for x in range(4):
          State({'type': 'end-year-input', 'index': x}, 'value'),
          State({'type': 'start-secondary-input', 'index': x}, 'value'),
          State({'type': 'end-secondary-input', 'index': x}, 'value'),
-         # Date picker states for parent data menu
-         State({'type': 'start-year-input', 'index': 4}, 'name'),
-         State({'type': 'radio-timeframe', 'index': 4}, 'value'),
-         State({'type': 'fiscal-year-toggle', 'index': 4}, 'value'),
-         State({'type': 'start-year-input', 'index': 4}, 'value'),
-         State({'type': 'end-year-input', 'index': 4}, 'value'),
-         State({'type': 'start-secondary-input', 'index': 4}, 'value'),
-         State({'type': 'end-secondary-input', 'index': 4}, 'value'),
-         State({'type': 'graph_display', 'index': x}, 'children'),
+         # Whether the graph is drawn, instead of sending the drawn figure back
+         State({'type': 'graph_display', 'index': x}, 'data-drawn'),
          # Data set states
          State({'type': 'data-set', 'index': x}, 'value'),
-         State({'type': 'data-set', 'index': 4}, 'value'),
          # Link state
          State({'type': 'tile-link', 'index': x}, 'className'),
          # Hierarchy Options
          State({'type': 'hierarchy_specific_dropdown', 'index': x}, 'options'),
-         State({'type': 'hierarchy_specific_dropdown', 'index': 4}, 'options'),
          State({'type': 'secondary_hierarchy_specific_dropdown', 'index': x}, 'options'),
          # Constants
          State('df-constants-storage', 'data'),
-         # Float menu result
-         State({'type': 'data-set-parent', 'index': 4}, 'value'),
          # Axes titles
          State({'type': 'xaxis-title', 'index': x}, 'value'),
          State({'type': 'yaxis-title', 'index': x}, 'value'),
@@ -127,23 +209,22 @@ for x in range(4):
          # data set result flag
          State({'type': 'data-set-result', 'index': x}, 'data'),
          State({'type': 'time-period', 'index': x}, 'value'),
-         State({'type': 'time-period', 'index': 4}, 'value'),
          State({'type': 'hierarchy_type_dropdown', 'index': x}, 'value'),
-         State({'type': 'hierarchy_type_dropdown', 'index': 4}, 'value')],
+         # Style only options, toggling them is applied in the browser by updateGraphStyle
+         State({'type': 'gridline', 'index': x}, 'value'),
+         State({'type': 'legend', 'index': x}, 'value')],
         prevent_initial_call=True
     )
-    def _update_graph(_df_trigger, arg_value, gridline, legend, graph_type, tile_title, _datepicker_trigger,
-                      num_periods, period_type, _parent_datepicker_trigger, parent_num_periods,
-                      parent_period_type, hierarchy_toggle, hierarchy_level_dropdown, hierarchy_graph_children,
-                      state_of_display, parent_state_of_display, parent_hierarchy_toggle,
-                      parent_hierarchy_level_dropdown, parent_hierarchy_graph_children, secondary_state_of_display,
-                      secondary_hierarchy_toggle, secondary_level_dropdown, secondary_graph_children, secondary_type,
-                      timeframe, fiscal_toggle, start_year, end_year, start_secondary, end_secondary,
-                      parent_secondary_type, parent_timeframe, parent_fiscal_toggle, parent_start_year, parent_end_year,
-                      parent_start_secondary, parent_end_secondary, graph_display, df_name, parent_df_name,
-                      link_state, hierarchy_options, parent_hierarchy_options, secondary_options, df_const, df_confirm,
-                      xaxis, yaxis, xlegend, ylegend, xmodified, ymodified, num_tiles, prev_fitting_trigger, swap_flag,
-                      data_set_flag, time_period, parent_time_period, hierarchy_type, parent_hierarchy_type):
+    def _update_graph(_df_trigger, arg_value, graph_type, tile_title, _datepicker_trigger, num_periods, period_type,
+                      hierarchy_toggle, hierarchy_level_dropdown, hierarchy_graph_children, state_of_display,
+                      parent_spec_token, secondary_state_of_display, secondary_hierarchy_toggle,
+                      secondary_level_dropdown, secondary_graph_children, secondary_type, timeframe, fiscal_toggle,
+                      start_year, end_year, start_secondary, end_secondary, graph_drawn, df_name, link_state,
+                      hierarchy_options, secondary_options, df_const, xaxis, yaxis, xlegend, ylegend, xmodified,
+                      ymodified, num_tiles, prev_fitting_trigger, swap_flag, data_set_flag, time_period, hierarchy_type,
+                      gridline, legend):
+        df_const = get_df_const(df_const)
+        parent_spec = get_parent_spec(parent_spec_token) or dict.fromkeys(PARENT_SPEC_KEYS)
 
         # -------------------------------------------Variable Declarations----------------------------------------------
         changed_id = [i['prop_id'] for i in dash.callback_context.triggered][0]
@@ -158,26 +239,26 @@ for x in range(4):
         data_set_flag_output = False
         # --------------------------------------------------------------------------------------------------------------
         # if new/delete while the graph already exists, prevent update
-        if changed_id == '.' and graph_display:
+        if changed_id == '.' and graph_drawn:
             raise PreventUpdate
 
         # if swapping between dashboards dont rebuild graph
         if swap_flag is True:
-            return graph_display, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
+            return no_update, no_update, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
                    swap_flag_output, data_set_flag_output
 
         # check to see if df_name and parent_df_name has not been selected, build empty graph
-        if '"type":"tile-view"}.className' in changed_id and df_name is None and parent_df_name is None:
-            return None, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, swap_flag_output, \
-                   data_set_flag_output
+        if '"type":"tile-view"}.className' in changed_id and df_name is None and parent_spec['df_name'] is None:
+            return None, False, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
+                   swap_flag_output, data_set_flag_output
 
         # edit menu was not build properly, build empty graph
         if len(arg_value) == 0 and graph_type != "Sankey":
-            return None, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, swap_flag_output, \
-                   data_set_flag_output
+            return None, False, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
+                   swap_flag_output, data_set_flag_output
 
         # if unlinked and parent changes, prevent update
-        if (link_state == 'fa fa-unlink' and '"index":4' in changed_id) and 'args-value' not in changed_id:
+        if (link_state == 'fa fa-unlink' and 'parent-spec' in changed_id) and 'args-value' not in changed_id:
             raise PreventUpdate
 
         # flag for warning user of a modified graph axes
@@ -198,9 +279,10 @@ for x in range(4):
 
         # if tile un-linked and graph-type is in both data sets update graph
         if link_state == 'fa fa-link' and data_set_flag is True and (df_name is not None and graph_type in
-                        GRAPH_OPTIONS[df_name] and (df_name != parent_df_name or time_period != parent_time_period)):
-            if df_confirm is not None:
-                df_tile = df_confirm
+                        GRAPH_OPTIONS[df_name] and (df_name != parent_spec['df_name'] or
+                                                          time_period != parent_spec['time_period'])):
+            if parent_spec['df_confirm'] is not None:
+                df_tile = parent_spec['df_confirm']
 
             if df_name != 'OPG010':
                 session_key = df_tile + time_period
@@ -215,28 +297,29 @@ for x in range(4):
                                    secondary_level_dropdown, secondary_state_of_display, secondary_hierarchy_toggle,
                                    secondary_graph_children, secondary_options, session_key, hierarchy_type)
 
-            return graph, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, swap_flag_output,\
-                   data_set_flag_output
+            graph = set_graph_tile(graph, tile)
+            return graph, True, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
+                   swap_flag_output, data_set_flag_output
 
         # checks tile is linked or not
         if link_state == 'fa fa-link':
-            secondary_type = parent_secondary_type
-            timeframe = parent_timeframe
-            fiscal_toggle = parent_fiscal_toggle
-            start_year = parent_start_year
-            end_year = parent_end_year
-            start_secondary = parent_start_secondary
-            end_secondary = parent_end_secondary
-            hierarchy_toggle = parent_hierarchy_toggle
-            hierarchy_level_dropdown = parent_hierarchy_level_dropdown
-            state_of_display = parent_state_of_display
-            hierarchy_graph_children = parent_hierarchy_graph_children
-            num_periods = parent_num_periods
-            period_type = parent_period_type
-            df_name = parent_df_name
-            hierarchy_options = parent_hierarchy_options
-            time_period = parent_time_period
-            hierarchy_type = parent_hierarchy_type
+            secondary_type = parent_spec['secondary_type']
+            timeframe = parent_spec['timeframe']
+            fiscal_toggle = parent_spec['fiscal_toggle']
+            start_year = parent_spec['start_year']
+            end_year = parent_spec['end_year']
+            start_secondary = parent_spec['start_secondary']
+            end_secondary = parent_spec['end_secondary']
+            hierarchy_toggle = parent_spec['hierarchy_toggle']
+            hierarchy_level_dropdown = parent_spec['hierarchy_level_dropdown']
+            state_of_display = parent_spec['state_of_display']
+            hierarchy_graph_children = parent_spec['hierarchy_graph_children']
+            num_periods = parent_spec['num_periods']
+            period_type = parent_spec['period_type']
+            df_name = parent_spec['df_name']
+            hierarchy_options = parent_spec['hierarchy_options']
+            time_period = parent_spec['time_period']
+            hierarchy_type = parent_spec['hierarchy_type']
         else:
             df_name = df_tile
 
@@ -292,8 +375,24 @@ for x in range(4):
         if graph is None:
             raise PreventUpdate
 
-        return graph, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, swap_flag_output, \
-               data_set_flag_output
+        graph = set_graph_tile(graph, tile)
+        return graph, True, popup_text, popup_is_open, data, fitting_popup_text, fitting_popup_is_open, \
+               swap_flag_output, data_set_flag_output
+
+
+# applies the gridline and legend toggles to the tile's graph figure in the browser
+app.clientside_callback(
+    ClientsideFunction(
+        namespace='clientside',
+        function_name='updateGraphStyle'
+    ),
+    Output({'type': 'graph-display', 'index': MATCH}, 'figure'),
+    [Input({'type': 'gridline', 'index': MATCH}, 'value'),
+     Input({'type': 'legend', 'index': MATCH}, 'value')],
+    [State({'type': 'graph-display', 'index': MATCH}, 'figure')],
+    prevent_initial_call=True
+)
+
 
 # *******************************************************HIERARCHY***************************************************
 
@@ -390,7 +489,7 @@ for x in range(5):
             dropdown = generate_dropdown(changed_index, df_name, nid_path, session_key)
 
         # check if leaf node, if so say graph all siblings instead of graph all in dropdown
-        if 'options=[]' not in str(dropdown):
+        if dropdown.options:
             options = [{'label': get_label('LBL_Graph_All_In_Dropdown'), 'value': 'graph_children'}]
         else:
             options = [{'label': get_label('LBL_Graph_All_Siblings'), 'value': 'graph_children'}]
@@ -419,6 +518,7 @@ def _print_choice_to_display_and_modify_secondary_dropdown(dropdown_val, _n_clic
                                                            n_clicks_click_history, state_of_display, df_name,
                                                            parent_df_name, time_period, parent_time_period,
                                                            link_state, df_const):
+    df_const = get_df_const(df_const)
     changed_id = [i['prop_id'] for i in dash.callback_context.triggered][0]
     if link_state == "fa fa-link":
         df_name = parent_df_name
@@ -491,7 +591,7 @@ def _print_choice_to_display_and_modify_secondary_dropdown(dropdown_val, _n_clic
         dropdown = generate_secondary_dropdown(changed_index, df_name, nid_path, df_const, session_key)
 
     # check if leaf node, if so say graph all siblings instead of graph all in dropdown
-    if 'options=[]' not in str(dropdown):
+    if dropdown.options:
         options = [{'label': get_label('LBL_Graph_All_In_Dropdown'), 'value': 'graph_children'}]
     else:
         options = [{'label': get_label('LBL_Graph_All_Siblings'), 'value': 'graph_children'}]
@@ -499,6 +599,43 @@ def _print_choice_to_display_and_modify_secondary_dropdown(dropdown_val, _n_clic
     return display_button, dropdown, options
 
 
+@app.callback(
+    Output({'type': 'secondary_hierarchy_specific_dropdown', 'index': MATCH}, 'options'),
+    [Input({'type': 'secondary_hierarchy_specific_dropdown', 'index': MATCH}, 'search_value')],
+    [State({'type': 'secondary_hierarchy_display_button', 'index': MATCH}, 'children'),
+     State({'type': 'data-set', 'index': MATCH}, 'value'),
+     State({'type': 'data-set', 'index': 4}, 'value'),
+     State({'type': 'time-period', 'index': MATCH}, 'value'),
+     State({'type': 'time-period', 'index': 4}, 'value'),
+     State({'type': 'tile-link', 'index': MATCH}, 'className'),
+     State('df-constants-storage', 'data')],
+    prevent_initial_call=True
+)
+def _search_secondary_dropdown(search_value, state_of_display, df_name, parent_df_name, time_period,
+                               parent_time_period, link_state, df_const):
+    """Serves the variables starting with the typed prefix, the dropdown only holds the first ones."""
+    if search_value is None:
+        raise PreventUpdate
+
+    if link_state == "fa fa-link":
+        df_name = parent_df_name
+        time_period = parent_time_period
+    if not df_name:
+        raise PreventUpdate
+
+    if df_name != 'OPG010':
+        session_key = df_name + time_period
+    else:
+        session_key = df_name
+
+    # Ensures that state_of_display is a list of dictionaries
+    if type(state_of_display) == dict:
+        state_of_display = [state_of_display]
+    nid_path = '^||^'.join(['root'] + ['{}'.format(i['props']['children']) for i in state_of_display or []])
+
+    return get_secondary_options(df_name, nid_path, get_df_const(df_const), session_key, search_value)
+
+
 # primary hierarchy toggle, swaps between displaying the SPECIFIC and LEVEL hierarchy menus
 app.clientside_callback(
     """
@@ -564,6 +701,7 @@ def _update_date_picker(input_method, fiscal_toggle, _year_button_clicks, _quart
                         _month_button_clicks, _week_button_clicks, start_year_selection, end_year_selection,
                         start_secondary_selection, end_secondary_selection, update_trigger, tab, df_name, df_const,
                         time_period):
+    df_const = get_df_const(df_const)
     # ----------------------------------------------Variable Declarations-----------------------------------------------
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
     tile = dash.callback_context.inputs_list[0]['id']['index']
@@ -788,40 +926,75 @@ app.clientside_callback(
 
 # *************************************************DATA-TABLE*********************************************************
 
-operators = [[' ge ', '>='],
-             [' le ', '<='],
-             [' lt ', '<'],
-             [' gt ', '>'],
-             [' ne ', '!='],
-             [' eq ', '='],
-             [' contains '],
-             [' datestartswith ']]
+operators = {'>=': 'ge', '<=': 'le', '<': 'lt', '>': 'gt', '!=': 'ne', '=': 'eq'}
+
+filter_part_pattern = compile_regex(r'\{(?P<name>[^}]*)\}\s*(?P<operator>>=|<=|!=|<|>|=|'
+                                    r'(?:ge|le|lt|gt|ne|eq|contains|datestartswith)(?=\s))\s*(?P<value>.*)')
 
 
 # datatable filtering function
 def split_filter_part(filter_part):
     """Returns column name, operator and filter_value or None given a filter part."""
-    for operator_type in operators:
-        for operator in operator_type:
-            if operator in filter_part:
-                name_part, value_part = filter_part.split(operator, 1)
-                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
-
-                value_part = value_part.strip()
-                v0 = value_part[0]
-                if v0 == value_part[-1] and v0 in ("'", '"', '`'):
-                    value = value_part[1: -1].replace('\\' + v0, v0)
-                else:
-                    try:
-                        value = float(value_part)
-                    except ValueError:
-                        value = value_part
+    match = filter_part_pattern.search(filter_part)
+    if match is None or not match.group('value').strip():
+        return [None] * 3
+
+    value_part = match.group('value').strip()
+    v0 = value_part[0]
+    if v0 == value_part[-1] and v0 in ("'", '"', '`'):
+        value = value_part[1: -1].replace('\\' + v0, v0)
+    else:
+        try:
+            value = float(value_part)
+        except ValueError:
+            value = value_part
+
+    # symbol operators are stored under their pandas series operator method names
+    return match.group('name'), operators.get(match.group('operator'), match.group('operator')), value
+
+
+@lru_cache(maxsize=128)
+def compile_filter_query(filter_query):
+    """Returns the (column name, operator, filter value) clauses of a datatable filter query."""
+    clauses = []
+    for filter_part in filter_query.split(' && '):
+        col_name, operator, filter_value = split_filter_part(filter_part)
+        if operator in ('contains', 'datestartswith'):
+            if type(filter_value) is not str:
+                continue
+            filter_value = filter_value.lower()
+        elif operator is None:
+            continue
+        clauses.append((col_name, operator, filter_value))
+    return tuple(clauses)
+
+
+def get_filtered_positions(dff, filter_query, lowered_columns):
+    """Returns the positions of the data frame rows matching the datatable filter query."""
+    # every clause is and-ed into a single mask, so no intermediate data frames are built
+    mask = ones(len(dff), dtype=bool)
+    for col_name, operator, filter_value in compile_filter_query(filter_query):
+        if operator in ('contains', 'datestartswith'):
+            # string columns are lowered once per cached data frame and shared by every filter on it
+            if col_name not in lowered_columns:
+                lowered_columns[col_name] = dff[col_name].astype(str).str.lower()
+            if operator == 'contains':
+                mask &= lowered_columns[col_name].str.contains(filter_value, regex=False).to_numpy()
+            else:
+                # this is a simplification of the front-end filtering logic,
+                # only works with complete fields in standard format
+                mask &= lowered_columns[col_name].str.startswith(filter_value).to_numpy()
+        else:
+            # these operators match pandas series operator method names
+            mask &= getattr(dff[col_name], operator)(filter_value).to_numpy()
+
+    return flatnonzero(mask)
 
-                # word operators need spaces after them in the filter string,
-                # but we don't want these later
-                return name, operator_type[0].strip(), value
 
-    return [None] * 3
+def trim_table_cache(cache):
+    """Drops the oldest filtered views or sort orders of a table cache past the configured cache size."""
+    while len(cache) > config.RENDER_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
 
 
 @app.callback(
@@ -835,8 +1008,10 @@ def split_filter_part(filter_part):
      Input({'type': 'update-graph-trigger', 'index': MATCH}, 'data-graph_menu_trigger'),
      # update table trigger
      Input({'type': 'update-graph-trigger', 'index': MATCH}, 'data-graph_menu_table_trigger')],
-    # Link state
-    [State({'type': 'tile-link', 'index': MATCH}, 'className'),
+    # Paging mode
+    [State({'type': 'datatable', 'index': MATCH}, 'page_action'),
+     # Link state
+     State({'type': 'tile-link', 'index': MATCH}, 'className'),
      # Data set state
      State({'type': 'data-set', 'index': MATCH}, 'value'),
      # Date picker state
@@ -855,64 +1030,45 @@ def split_filter_part(filter_part):
      State({'type': 'hierarchy_display_button', 'index': MATCH}, 'children'),
      State({'type': 'graph_children_toggle', 'index': MATCH}, 'value'),
      State({'type': 'hierarchy_specific_dropdown', 'index': MATCH}, 'options'),
-     # Date picker states for parent data menu
-     State({'type': 'start-year-input', 'index': 4}, 'name'),
-     State({'type': 'radio-timeframe', 'index': 4}, 'value'),
-     State({'type': 'fiscal-year-toggle', 'index': 4}, 'value'),
-     State({'type': 'start-year-input', 'index': 4}, 'value'),
-     State({'type': 'end-year-input', 'index': 4}, 'value'),
-     State({'type': 'start-secondary-input', 'index': 4}, 'value'),
-     State({'type': 'end-secondary-input', 'index': 4}, 'value'),
-     State({'type': 'num-periods', 'index': 4}, 'value'),
-     State({'type': 'period-type', 'index': 4}, 'value'),
-     # Hierarchy States for parent data menu
-     State({'type': 'hierarchy-toggle', 'index': 4}, 'value'),
-     State({'type': 'hierarchy_level_dropdown', 'index': 4}, 'value'),
-     State({'type': 'hierarchy_display_button', 'index': 4}, 'children'),
-     State({'type': 'graph_children_toggle', 'index': 4}, 'value'),
-     State({'type': 'hierarchy_specific_dropdown', 'index': 4}, 'options'),
-     # Parent Data set
-     State({'type': 'data-set', 'index': 4}, 'value'),
+     # Parent data menu selections, published once by _publish_parent_spec
+     State('parent-spec', 'data'),
      State('df-constants-storage', 'data'),
-     State({'type': 'data-set-parent', 'index': 4}, 'value'),
      State({'type': 'tile-df-name', 'index': MATCH}, 'data'),
      State({'type': 'graph-type-dropdown', 'index': MATCH}, 'value'),
-     State({'type': 'time-period', 'index': MATCH}, 'value'),
-     State({'type': 'time-period', 'index': 4}, 'value')]
+     State({'type': 'time-period', 'index': MATCH}, 'value')]
 )
-def _update_table(page_current, page_size, sort_by, filter_query, _graph_trigger, _table_trigger, link_state,
-                  df_name, secondary_type, timeframe, fiscal_toggle, start_year, end_year, start_secondary,
+def _update_table(page_current, page_size, sort_by, filter_query, _graph_trigger, _table_trigger, page_action,
+                  link_state, df_name, secondary_type, timeframe, fiscal_toggle, start_year, end_year, start_secondary,
                   end_secondary, num_periods, period_type, hierarchy_toggle, hierarchy_level_dropdown,
-                  state_of_display, hierarchy_graph_children, hierarchy_options, parent_secondary_type,
-                  parent_timeframe, parent_fiscal_toggle, parent_start_year, parent_end_year,
-                  parent_start_secondary, parent_end_secondary, parent_num_periods, parent_period_type,
-                  parent_hierarchy_toggle, parent_hierarchy_level_dropdown, parent_state_of_display,
-                  parent_hierarchy_graph_children, parent_hierarchy_options, parent_df_name, df_const, df_confirm,
-                  table_df, graph_type, time_period, parent_time_period):
-
-    if graph_type != 'Table':
+                  state_of_display, hierarchy_graph_children, hierarchy_options, parent_spec_token, df_const, table_df,
+                  graph_type, time_period):
+    df_const = get_df_const(df_const)
+
+    # native tables are shipped whole by get_table_figure and handled in the browser
+    if graph_type != 'Table' or page_action == 'native':
         raise PreventUpdate
 
-    if table_df == parent_df_name and link_state == 'fa fa-link':
-        secondary_type = parent_secondary_type
-        timeframe = parent_timeframe
-        fiscal_toggle = parent_fiscal_toggle
-        start_year = parent_start_year
-        end_year = parent_end_year
-        start_secondary = parent_start_secondary
-        end_secondary = parent_end_secondary
-        hierarchy_toggle = parent_hierarchy_toggle
-        hierarchy_level_dropdown = parent_hierarchy_level_dropdown
-        state_of_display = parent_state_of_display
-        hierarchy_graph_children = parent_hierarchy_graph_children
-        num_periods = parent_num_periods
-        period_type = parent_period_type
-        hierarchy_options = parent_hierarchy_options
-        if df_confirm is not None:
-            df_name = df_confirm
+    parent_spec = get_parent_spec(parent_spec_token) or dict.fromkeys(PARENT_SPEC_KEYS)
+    if table_df == parent_spec['df_name'] and link_state == 'fa fa-link':
+        secondary_type = parent_spec['secondary_type']
+        timeframe = parent_spec['timeframe']
+        fiscal_toggle = parent_spec['fiscal_toggle']
+        start_year = parent_spec['start_year']
+        end_year = parent_spec['end_year']
+        start_secondary = parent_spec['start_secondary']
+        end_secondary = parent_spec['end_secondary']
+        hierarchy_toggle = parent_spec['hierarchy_toggle']
+        hierarchy_level_dropdown = parent_spec['hierarchy_level_dropdown']
+        state_of_display = parent_spec['state_of_display']
+        hierarchy_graph_children = parent_spec['hierarchy_graph_children']
+        num_periods = parent_spec['num_periods']
+        period_type = parent_spec['period_type']
+        hierarchy_options = parent_spec['hierarchy_options']
+        if parent_spec['df_confirm'] is not None:
+            df_name = parent_spec['df_confirm']
         else:
-            df_name = parent_df_name
-        time_period = parent_time_period
+            df_name = parent_spec['df_name']
+        time_period = parent_spec['time_period']
     # prevent update if invalid selections exist - should be handled by update_datepicker, but double check
     if not start_year or not end_year or not start_secondary or not end_secondary:
         raise PreventUpdate
@@ -922,66 +1078,62 @@ def _update_table(page_current, page_size, sort_by, filter_query, _graph_trigger
     else:
         session_key = df_name
 
-    # Creates a hierarchy trail from the display
-    if type(state_of_display) == dict:
-        state_of_display = [state_of_display]
-    list_of_names = []
-    if len(state_of_display) > 0:
-        for obj in state_of_display:
-            list_of_names.append(obj['props']['children'])
-
-    if hierarchy_toggle == 'Specific Item' and hierarchy_graph_children == ['graph_children']:
-        # If at a leaf node then display its parents data
-        nid_path = "root"
-        for i in list_of_names:
-            nid_path += ('^||^{}'.format(i))
-        if not hierarchy_options:
-            list_of_names.pop()
+    list_of_names = get_hierarchy_trail(state_of_display, hierarchy_toggle, hierarchy_graph_children,
+                                        hierarchy_options)
 
     # If "Last ___ ____" is active and the num_periods is invalid (None), return an empty graph
     if timeframe == 'to-current' and not num_periods:
         return [], 0
-    # else, filter normally
-    else:
-        dff = data_manipulator(list_of_names, hierarchy_toggle, hierarchy_level_dropdown,
-                               hierarchy_graph_children, df_name, df_const, secondary_type, end_secondary,
-                               end_year, start_secondary, start_year, timeframe, fiscal_toggle, num_periods,
-                               period_type, session_key=session_key)
+
+    # the aggregated frame is cached per tile in the process-side render cache, so paging, sorting and filtering
+    # don't re-run get_filtered_base, and the filtered views and sort orders added to the entry stay with it
+    tile = dash.callback_context.inputs_list[0]['id']['index']
+    query_key = get_render_cache_key(df_name, session_key, list_of_names, hierarchy_toggle, hierarchy_level_dropdown,
+                                     hierarchy_graph_children, secondary_type, timeframe, fiscal_toggle, start_year,
+                                     end_year, start_secondary, end_secondary, num_periods, period_type)
+    table_cache = get_render_cache('table', str(tile))
+
+    if table_cache is None or table_cache['query'] != query_key:
+        dff = get_filtered_base(list_of_names, hierarchy_toggle, hierarchy_level_dropdown,
+                                hierarchy_graph_children, df_name, df_const, secondary_type, end_secondary,
+                                end_year, start_secondary, start_year, timeframe, fiscal_toggle, num_periods,
+                                period_type, session_key)
         if dff.empty:
             return [], 0
 
-    # Reformat date column
-    if df_name == "OPG010":
-        dff['Date of Event'] = dff['Date of Event'].transform(lambda y: y.strftime(format='%Y-%m-%d'))
-    # Filter based on data table filters
-    filtering_expressions = filter_query.split(' && ')
-    for filter_part in filtering_expressions:
-        col_name, operator, filter_value = split_filter_part(filter_part)
-        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
-            # these operators match pandas series operator method names
-            dff = dff.loc[getattr(dff[col_name], operator)(filter_value)]
-        elif operator == 'contains':
-            if type(filter_value) is not str:
-                continue
-            dff = dff.loc[dff[col_name].astype(str).str.lower().str.contains(filter_value.lower())]
-        elif operator == 'datestartswith':
-            if type(filter_value) is not str:
-                continue
-            # this is a simplification of the front-end filtering logic,
-            # only works with complete fields in standard format
-            dff = dff.loc[dff[col_name].astype(str).str.lower().str.startswith(filter_value.lower())]
-
-    if len(sort_by):
-        dff = dff.sort_values(
-            [col['column_id'] for col in sort_by],
-            ascending=[
-                col['direction'] == 'asc'
-                for col in sort_by
-            ],
-            inplace=False)
-
-    return dff.iloc[page_current * page_size: (page_current + 1) * page_size].to_dict('records'), \
-           math.ceil(dff.iloc[:, 0].size / page_size)
+        dff = dff.reset_index(drop=True)
+        # Reformat date column
+        if df_name == "OPG010":
+            dff['Date of Event'] = dff['Date of Event'].transform(lambda y: y.strftime(format='%Y-%m-%d'))
+        table_cache = {'query': query_key, 'data': dff, 'lowered': {}, 'views': {}, 'orders': {}}
+        set_render_cache('table', str(tile), table_cache)
+
+    dff = table_cache['data']
+
+    # filtered views are keyed by the normalized filter expression, sort orders by the view and the sort columns
+    filter_key = ' && '.join(sorted(part.strip() for part in filter_query.split(' && ') if part.strip()))
+    if filter_key not in table_cache['views']:
+        table_cache['views'][filter_key] = get_filtered_positions(dff, filter_query, table_cache['lowered'])
+        trim_table_cache(table_cache['views'])
+    view = table_cache['views'][filter_key]
+
+    sort_key = filter_key + str([(col['column_id'], col['direction']) for col in sort_by])
+    if sort_key not in table_cache['orders']:
+        if len(sort_by):
+            table_cache['orders'][sort_key] = dff.iloc[view].sort_values(
+                [col['column_id'] for col in sort_by],
+                ascending=[
+                    col['direction'] == 'asc'
+                    for col in sort_by
+                ],
+                inplace=False).index.to_numpy()
+        else:
+            table_cache['orders'][sort_key] = view
+        trim_table_cache(table_cache['orders'])
+    order = table_cache['orders'][sort_key]
+
+    return dff.iloc[order[page_current * page_size: (page_current + 1) * page_size]].to_dict('records'), \
+        math.ceil(len(order) / page_size)
 
 
 # *************************************************DATA-FITTING******************************************************
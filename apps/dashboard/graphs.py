@@ -8,6 +8,8 @@ Contains functions to generate graphs.
 
 # External Packages
 from _datetime import datetime
+from copy import copy, deepcopy
+import logging
 
 from flask import session
 from parse import parse
@@ -18,65 +20,532 @@ import dash_html_components as html
 import dash
 import pandas as pd
 import plotly.graph_objects as go
+from numpy import nan, full, float64, int64, zeros, linspace, unique, flatnonzero, column_stack, split, \
+    bincount, arange, array, append, diff, where, add
 
 # Internal Modules
+import config
 from apps.dashboard.data import get_label, customize_menu_filter, linear_regression, polynomial_regression, \
-    data_manipulator
+    get_filtered_base, get_node_metadata, downsample_traces, box_plot_statistics, top_n_bucketing, \
+    get_render_cache_key, get_render_cache, set_render_cache
+from apps.dashboard.secondary_hierarchy_filter import get_secondary_children_options
 
+# frames between full key frames of an animation, the frames in between only carry the traces that changed
+ANIMATION_KEY_FRAME_INTERVAL = 10
+
+# graph types whose rendered figure is cached, the remaining types are cheap to rebuild or are not plotly figures
+CACHED_GRAPH_TYPES = ['Line', 'Scatter', 'Bar', 'Bubble', 'Box_Plot']
+
+# position of the top n option in each graph type's customize menu arg values
+TOP_N_ARG_INDEX = {'Line': 7, 'Scatter': 7, 'Bar': 5, 'Bubble': 7}
+
+# layout skeleton of a single cartesian subplot figure, matching what plotly express generates
+BASE_CARTESIAN_LAYOUT = {
+    'title': {'text': None},
+    'legend': {'tracegroupgap': 0, 'title': {'text': None}},
+    'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': None}},
+    'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': None}}}
+
+# prebuilt layout of each graph type, the cartesian skeleton plus the entries plotly express adds for that type
+GRAPH_TYPE_LAYOUTS = {
+    'Line': BASE_CARTESIAN_LAYOUT,
+    'Bar': dict(BASE_CARTESIAN_LAYOUT, barmode='group'),
+    'Bubble': dict(BASE_CARTESIAN_LAYOUT, legend=dict(BASE_CARTESIAN_LAYOUT['legend'], itemsizing='constant')),
+    'Box_Plot': dict(BASE_CARTESIAN_LAYOUT, boxmode='group')}
+
+# largest bubble diameter in pixels, plotly express's size_max default
+BUBBLE_SIZE_MAX = 20
 
 # ***********************************************HELPER FUNCTIONS****************************************************
 
 
+def get_hierarchy_trail(state_of_display, hierarchy_toggle, hierarchy_graph_children, hierarchy_options):
+    """Returns the hierarchy path of a display's buttons, ending at the parent when graphing a leaf's siblings."""
+    # Creates a hierarchy trail from the display
+    if type(state_of_display) == dict:
+        state_of_display = [state_of_display]
+
+    list_of_names = [obj['props']['children'] for obj in state_of_display]
+
+    # If at a leaf node then display its parents data
+    if hierarchy_toggle == 'Specific Item' and hierarchy_graph_children == ['graph_children'] and \
+            not hierarchy_options:
+        list_of_names.pop()
+
+    return list_of_names
+
+
 def set_partial_periods(fig, dataframe, graph_type):
     """Marks partial periods on the graph and returns the updated figure."""
-    # ---------------------------------------Variable Declarations------------------------------------------------------
+    # None on bar graph due to formatting
+    if graph_type == 'Bar':
+        return fig
+
     partial_data_points = dataframe[dataframe['Partial Period'] == get_label('LBL_TRUE')]
-    index_vals = list(partial_data_points.index.values)
-    partial_pos = {}  # Key: x_val, Value: list of y_vals
-    # ------------------------------------------------------------------------------------------------------------------
+    if len(partial_data_points) == 0:
+        return fig
+
+    # every partial data point is drawn as an unlabeled dot by a single overlay trace
+    fig.add_trace(go.Scatter(
+        x=partial_data_points['Date of Event'].to_numpy(),
+        y=partial_data_points['Measure Value'].to_numpy(),
+        mode='markers',
+        marker={'color': '#444', 'size': 6},
+        name=get_label("LBL_Partial_Period"),
+        showlegend=False,
+        hoverinfo='skip'))
+
+    # data point with highest y val (for each x) is labeled, added in one layout update rather than one per point
+    partial_pos = partial_data_points.groupby('Date of Event', sort=False)['Measure Value'].max()
+    partial_label = get_label("LBL_Partial_Period")
+    fig.update_layout(annotations=list(fig.layout.annotations) + [
+        dict(x=x_val, y=y_val, text=partial_label, showarrow=True, arrowhead=7, ax=0, ay=-40, bgcolor='#ffffff')
+        for x_val, y_val in zip(partial_pos.index, partial_pos.to_numpy())])
 
-    for i in range(len(partial_data_points)):
-        # Co-ordinates of marker to be labeled
-        x_val = partial_data_points.loc[index_vals[i], 'Date of Event']
-        y_val = partial_data_points.loc[index_vals[i], 'Measure Value']
-        if x_val in partial_pos:
-            # Add y_val to list associated with x_val
-            current_y_list = partial_pos[x_val]
-            current_y_list.append(y_val)
-            partial_pos[x_val] = current_y_list
-        else:
-            # Create new list of y_vals
-            partial_pos[x_val] = [y_val]
-        partial_pos[x_val].sort(reverse=True)
+    return fig
 
-    # None on bar graph due to formatting
-    if graph_type != 'Bar':
-        for i in partial_pos:
-            for j in range(len(partial_pos[i])):
-                if j == 0:
-                    # Data point with highest y val (for each x) is labeled
-                    fig.add_annotation(
-                        x=i,
-                        y=partial_pos[i][j],
-                        text=get_label("LBL_Partial_Period"),
-                        showarrow=True,
-                        arrowhead=7,
-                        ax=0,
-                        ay=-40,
-                        bgcolor='#ffffff')
-                else:
-                    # Unlabeled black dots on lower data points
-                    fig.add_annotation(
-                        x=i,
-                        y=partial_pos[i][j],
-                        text="",
-                        arrowhead=7,
-                        ax=0,
-                        ay=0)
+
+def get_render_mode(num_points, graph_type):
+    """Returns the plotly express render mode, switching scatter traces to WebGL past the configured threshold."""
+    render_mode = 'webgl' if num_points > config.WEBGL_POINT_THRESHOLD else 'svg'
+    logging.debug("{} figure with {} points rendered as {} (threshold {}).".format(
+        graph_type, num_points, render_mode, config.WEBGL_POINT_THRESHOLD))
+    return render_mode
+
+
+def get_box_stats_figure(dataframe, category, position, orientation, color_discrete, show_outliers):
+    """
+    Returns a box plot figure built from server-computed statistics, one trace per category, so the payload is bounded
+    by the number of boxes rather than the number of values.
+    """
+    group_columns = [category] if position is None else [category, position]
+    stats_df, outliers_df = box_plot_statistics(dataframe, group_columns, config.BOX_OUTLIER_CAP)
+    position_axis, value_axis = ('y', 'x') if orientation == 'Horizontal' else ('x', 'y')
+    fig = go.Figure()
+
+    for i, (name, group_stats) in enumerate(stats_df.groupby(category, sort=False)):
+        colour = color_discrete[i % len(color_discrete)]
+        positions = group_stats[position].to_numpy() if position is not None else [name]
+        fig.add_trace(go.Box(
+            name=name,
+            legendgroup=name,
+            orientation='h' if orientation == 'Horizontal' else 'v',
+            marker_color=colour,
+            q1=group_stats['q1'].to_numpy(),
+            median=group_stats['median'].to_numpy(),
+            q3=group_stats['q3'].to_numpy(),
+            lowerfence=group_stats['lowerfence'].to_numpy(),
+            upperfence=group_stats['upperfence'].to_numpy(),
+            mean=group_stats['mean'].to_numpy(),
+            **{position_axis: positions}))
+
+        if show_outliers:
+            group_outliers = outliers_df[outliers_df[category] == name]
+            if len(group_outliers) != 0:
+                fig.add_trace(go.Scatter(
+                    name=name,
+                    legendgroup=name,
+                    showlegend=False,
+                    mode='markers',
+                    marker_color=colour,
+                    **{position_axis: group_outliers[position].to_numpy() if position is not None else
+                       [name] * len(group_outliers),
+                       value_axis: group_outliers['Measure Value'].to_numpy()}))
+
+    # boxes without a hierarchy position sit on their own category, so there is nothing to group side by side
+    fig.update_layout(boxmode='group' if position is not None else 'overlay')
 
     return fig
 
 
+def get_base_layout(title, legend_title_text, xaxis_title, yaxis_title, graph_type='Line'):
+    """Returns the layout plotly express would generate for a single cartesian subplot figure of the graph type."""
+    layout = deepcopy(GRAPH_TYPE_LAYOUTS[graph_type])
+    layout['title']['text'] = title
+    layout['legend']['title']['text'] = legend_title_text
+    layout['xaxis']['title']['text'] = xaxis_title
+    layout['yaxis']['title']['text'] = yaxis_title
+    # an axis without a column has no title at all
+    for axis, axis_title in [('xaxis', xaxis_title), ('yaxis', yaxis_title)]:
+        if axis_title is None:
+            del layout[axis]['title']
+    return layout
+
+
+def get_color_groups(values, color_discrete):
+    """
+    Returns the (name, colour, positions) of each distinct value in first appearance order, the way plotly express
+    splits and colours traces by its color column.
+    """
+    codes, uniques = pd.factorize(values)
+    positions = split(codes.argsort(kind='stable'), bincount(codes, minlength=len(uniques)).cumsum()[:-1])
+    return [(str(name), color_discrete[i % len(color_discrete)], positions[i]) for i, name in enumerate(uniques)]
+
+
+def get_date_values(dates):
+    """
+    Returns a date column's values the way figure validation would store them, so traces built without validation
+    serialize them as dates rather than as nanosecond integers.
+    """
+    values = dates.to_numpy()
+    return values.astype('datetime64[us]') if values.dtype.kind == 'M' else values
+
+
+def get_line_traces(dataframe, color, line_group, custom_data, color_discrete, render_mode, mode, hovertemplate):
+    """
+    Returns one scatter trace dictionary per color/line group pair, ordered, named and coloured the same way
+    px.line would, built straight from the column arrays.
+    """
+    trace_type = 'scattergl' if render_mode == 'webgl' else 'scatter'
+    group_columns = [color] if line_group is None else [color, line_group]
+    x_values = get_date_values(dataframe['Date of Event'])
+    y_values = dataframe['Measure Value'].to_numpy()
+    custom_values = dataframe[custom_data].to_numpy()
+    groups = dataframe.groupby(group_columns, sort=False).indices
+    # px orders the groups by first appearance of each grouping column, color first
+    orders = [{value: i for i, value in enumerate(dataframe[col].unique())} for col in group_columns]
+    group_names = sorted(groups, key=lambda g: tuple(order[value] for order, value in
+                                                     zip(orders, g if line_group is not None else (g,))))
+    colour_map = {}
+    traces = []
+
+    for group_name in group_names:
+        positions = groups[group_name]
+        name = str(group_name[0] if line_group is not None else group_name)
+        show_legend = name not in colour_map
+        if show_legend:
+            colour_map[name] = color_discrete[len(colour_map) % len(color_discrete)]
+        traces.append({
+            'type': trace_type,
+            'name': name,
+            'legendgroup': name,
+            'showlegend': show_legend,
+            'mode': mode,
+            'line': {'color': colour_map[name], 'dash': 'solid'},
+            'x': x_values[positions],
+            'y': y_values[positions],
+            'customdata': custom_values[positions],
+            'hovertemplate': hovertemplate,
+            'xaxis': 'x',
+            'yaxis': 'y'})
+
+    return traces
+
+
+def get_fit_trace(dataframe, column, name, line_color, render_mode):
+    """Returns a data fitting line trace dictionary matching the one px.line would generate for the column."""
+    return {
+        'type': 'scattergl' if render_mode == 'webgl' else 'scatter',
+        'name': name,
+        'legendgroup': '',
+        'showlegend': True,
+        'mode': 'lines',
+        'line': {'color': line_color, 'dash': 'solid'},
+        'x': get_date_values(dataframe['Date of Event']),
+        'y': dataframe[column].to_numpy(),
+        'hovertemplate': 'Date of Event=%{x}<br>' + column + '=%{y}<extra></extra>',
+        'xaxis': 'x',
+        'yaxis': 'y'}
+
+
+def get_bar_traces(dataframe, x, color, custom_data, orientation, color_discrete):
+    """
+    Returns one bar trace dictionary per color value, matching the grouped px.bar of the column against Measure Value
+    in the orientation, less the hover template each graph sets itself.
+    """
+    category_values = dataframe[x].to_numpy()
+    measure_values = dataframe['Measure Value'].to_numpy()
+    custom_values = dataframe[custom_data].to_numpy()
+    traces = []
+
+    for name, colour, positions in get_color_groups(dataframe[color], color_discrete):
+        traces.append({
+            'type': 'bar',
+            'name': name,
+            'legendgroup': name,
+            'showlegend': True,
+            'marker': {'color': colour},
+            'offsetgroup': name,
+            'alignmentgroup': 'True',
+            'orientation': 'v' if orientation == 'Vertical' else 'h',
+            'textposition': 'auto',
+            'x': (category_values if orientation == 'Vertical' else measure_values)[positions],
+            'y': (measure_values if orientation == 'Vertical' else category_values)[positions],
+            'customdata': custom_values[positions],
+            'xaxis': 'x',
+            'yaxis': 'y'})
+
+    return traces
+
+
+def get_bubble_traces(x, y, size, color, custom_data, color_discrete, render_mode):
+    """
+    Returns one marker trace dictionary per color value, matching the px.scatter bubble figure of the column series,
+    less the hover template each graph sets itself.
+    """
+    x_values = x.to_numpy()
+    y_values = y.to_numpy()
+    size_values = size.to_numpy()
+    custom_values = pd.concat(custom_data, axis=1).to_numpy()
+    size_ref = size_values.max() / BUBBLE_SIZE_MAX ** 2
+    traces = []
+
+    for name, colour, positions in get_color_groups(color, color_discrete):
+        traces.append({
+            'type': 'scattergl' if render_mode == 'webgl' else 'scatter',
+            'name': name,
+            'legendgroup': name,
+            'showlegend': True,
+            'mode': 'markers',
+            'orientation': 'v',
+            'marker': {'color': colour, 'size': size_values[positions], 'sizemode': 'area', 'sizeref': size_ref,
+                       'symbol': 'circle'},
+            'x': x_values[positions],
+            'y': y_values[positions],
+            'customdata': custom_values[positions],
+            'xaxis': 'x',
+            'yaxis': 'y'})
+
+    return traces
+
+
+def get_box_traces(dataframe, category, position, orientation, color_discrete, show_points):
+    """
+    Returns one box trace dictionary per category, with the hover template, matching the px.box figure of Measure
+    Value against the position column (or no position) in the orientation.
+    """
+    value_axis, position_axis = ('x', 'y') if orientation == 'Horizontal' else ('y', 'x')
+    measure_values = dataframe['Measure Value'].to_numpy()
+    position_values = dataframe[position].to_numpy() if position is not None else None
+    hover_axes = {value_axis: 'Measure Value', position_axis: position}
+    hovertemplate = ''.join('<br>{}=%{{{}}}'.format(hover_axes[axis], axis) for axis in ['x', 'y']
+                            if hover_axes[axis] is not None) + '<extra></extra>'
+    traces = []
+
+    for name, colour, positions in get_color_groups(dataframe[category], color_discrete):
+        trace = {
+            'type': 'box',
+            'name': name,
+            'legendgroup': name,
+            'showlegend': True,
+            'marker': {'color': colour},
+            'offsetgroup': name,
+            'alignmentgroup': 'True',
+            'orientation': 'h' if orientation == 'Horizontal' else 'v',
+            'boxpoints': 'all' if show_points else False,
+            'notched': False,
+            'x0': ' ',
+            'y0': ' ',
+            value_axis: measure_values[positions],
+            'hovertemplate': '{}={}'.format(category, name) + hovertemplate,
+            'xaxis': 'x',
+            'yaxis': 'y'}
+        if position_values is not None:
+            trace[position_axis] = position_values[positions]
+        traces.append(trace)
+
+    return traces
+
+
+def get_frame_arrays(dataframe, frame_column, trace_column, point_column, columns):
+    """
+    Pivots the data frame into one (frame, trace, point) array per column in a single pass. Past the configured frame
+    cap, runs of dates are averaged into one frame each, or skipped evenly when ANIMATION_CAPPED_DATES is "skip".
+    Returns the frame, trace and point names, the dictionary of arrays and the number of dates before the cap.
+    """
+    dates = dataframe[frame_column].dropna().unique()
+    frame_names = dates
+    date_frames = arange(len(dates))
+    averaged = False
+    if len(dates) > config.ANIMATION_FRAME_CAP:
+        if config.ANIMATION_CAPPED_DATES == 'skip':
+            # the first and last dates are always kept so the animation spans the whole time frame
+            kept_dates = unique(linspace(0, len(dates) - 1, config.ANIMATION_FRAME_CAP).round().astype(int64))
+            date_frames = full(len(dates), -1)
+            date_frames[kept_dates] = arange(len(kept_dates))
+            frame_names = dates[kept_dates]
+        else:
+            # consecutive dates share a frame, named after the first and last date it covers
+            averaged = True
+            date_frames = arange(len(dates)) * config.ANIMATION_FRAME_CAP // len(dates)
+            firsts = flatnonzero(diff(date_frames, prepend=-1))
+            lasts = append(firsts[1:], len(dates)) - 1
+            frame_names = array([dates[first] if first == last else '{} - {}'.format(dates[first], dates[last])
+                                 for first, last in zip(firsts, lasts)], dtype=object)
+    trace_names = dataframe[trace_column].dropna().unique()
+    point_names = dataframe[point_column].dropna().unique() if point_column is not None else [None]
+
+    frame_codes = pd.Categorical(dataframe[frame_column], categories=dates).codes
+    frame_codes = where(frame_codes != -1, date_frames[frame_codes], -1)
+    trace_codes = pd.Categorical(dataframe[trace_column], categories=trace_names).codes
+    point_codes = pd.Categorical(dataframe[point_column], categories=point_names).codes \
+        if point_column is not None else zeros(len(dataframe), dtype=int64)
+    kept = (frame_codes != -1) & (trace_codes != -1) & (point_codes != -1)
+    cells = (frame_codes[kept], trace_codes[kept], point_codes[kept])
+    shape = (len(frame_names), len(trace_names), len(point_names))
+
+    arrays = {}
+    for column in columns:
+        values = dataframe[column].to_numpy()[kept]
+        if averaged and values.dtype.kind in 'fiu':
+            totals = zeros(shape)
+            counts = zeros(shape)
+            add.at(totals, cells, values)
+            add.at(counts, cells, 1)
+            arrays[column] = where(counts != 0, totals / where(counts != 0, counts, 1), nan)
+        else:
+            # a frame covering several dates keeps the latest non numeric value
+            arrays[column] = full(shape, nan, dtype=float64 if values.dtype.kind in 'fiu' else object)
+            arrays[column][cells] = values
+
+    return frame_names, trace_names, point_names, arrays, len(dates)
+
+
+def get_animation_frames(frame_names, num_dates, num_traces, arrays, frame_trace, frame_label, redraw):
+    """
+    Returns the frames, play/pause buttons and slider of an animation. Key frames carry every trace and the frames in
+    between only the traces that changed since the previous frame, so slider steps replay from the last key frame.
+    The slider notes when the frames cover fewer or more dates than they show one for one.
+    """
+    def frame_args(duration):
+        return {'frame': {'duration': duration, 'redraw': redraw}, 'mode': 'immediate', 'fromcurrent': True,
+                'transition': {'duration': duration, 'easing': 'linear'}}
+
+    frames = []
+    steps = []
+    for i, frame_name in enumerate(frame_names):
+        if i % ANIMATION_KEY_FRAME_INTERVAL == 0:
+            traces = range(num_traces)
+        else:
+            changed = zeros(num_traces, dtype=bool)
+            for values in arrays.values():
+                unchanged = (values[i] == values[i - 1]) | (pd.isnull(values[i]) & pd.isnull(values[i - 1]))
+                changed |= ~unchanged.all(axis=1)
+            traces = flatnonzero(changed)
+        frames.append({'name': str(frame_name), 'data': [frame_trace(i, t) for t in traces],
+                       'traces': [int(t) for t in traces]})
+        key_frame = i - i % ANIMATION_KEY_FRAME_INTERVAL
+        steps.append({'args': [[str(name) for name in frame_names[key_frame:i + 1]], frame_args(0)],
+                      'label': str(frame_name), 'method': 'animate'})
+
+    updatemenus = [{
+        'buttons': [{'args': [None, frame_args(500)], 'label': '&#9654;', 'method': 'animate'},
+                    {'args': [[None], frame_args(0)], 'label': '&#9724;', 'method': 'animate'}],
+        'direction': 'left', 'pad': {'r': 10, 't': 70}, 'showactive': False, 'type': 'buttons', 'x': 0.1,
+        'xanchor': 'right', 'y': 0, 'yanchor': 'top'}]
+    sliders = [{
+        'active': 0, 'yanchor': 'top', 'xanchor': 'left',
+        'currentvalue': {'prefix': frame_label + '=', 'suffix': get_frame_cap_note(len(frame_names), num_dates)},
+        'pad': {'b': 10, 't': 60}, 'len': 0.9, 'x': 0.1, 'y': 0, 'steps': steps}]
+
+    return frames, updatemenus, sliders
+
+
+def get_frame_cap_note(num_frames, num_dates):
+    """Returns the slider note on how the dates past the frame cap were shown, empty when every date has a frame."""
+    if num_frames == num_dates:
+        return ''
+    if config.ANIMATION_CAPPED_DATES == 'skip':
+        return ' ({})'.format(get_label('LBL_Animation_Dates_Skipped').format(num_frames, num_dates))
+    return ' ({})'.format(get_label('LBL_Animation_Dates_Averaged').format(num_dates, num_frames))
+
+
+def get_animated_bar_figure(dataframe, x, color, hierarchy_col, orientation, color_discrete, title):
+    """Returns the bar graph figure animated over 'Date of Event', built from the pivoted frame arrays."""
+    frame_names, trace_names, point_names, arrays, num_dates = get_frame_arrays(
+        dataframe, 'Date of Event', color, x, ['Measure Value', hierarchy_col])
+    point_names = list(point_names)
+    value_axis, point_axis = ('y', 'x') if orientation == 'Vertical' else ('x', 'y')
+
+    def frame_trace(f, t):
+        return {
+            'type': 'bar',
+            point_axis: point_names,
+            value_axis: arrays['Measure Value'][f, t],
+            'customdata': column_stack((arrays[hierarchy_col][f, t], full(len(point_names), trace_names[t], object),
+                                        full(len(point_names), frame_names[f], object)))}
+
+    traces = []
+    for t, trace_name in enumerate(trace_names):
+        trace = frame_trace(0, t)
+        trace.update({
+            'name': str(trace_name), 'legendgroup': str(trace_name), 'showlegend': True,
+            'marker': {'color': color_discrete[t % len(color_discrete)]},
+            'orientation': 'v' if orientation == 'Vertical' else 'h', 'alignmentgroup': 'True',
+            'offsetgroup': str(trace_name), 'textposition': 'auto', 'xaxis': 'x', 'yaxis': 'y'})
+        traces.append(trace)
+
+    frames, updatemenus, sliders = get_animation_frames(frame_names, num_dates, len(trace_names), arrays, frame_trace,
+                                                        'Date of Event', True)
+    layout = get_base_layout(title, color, x if orientation == 'Vertical' else 'Measure Value',
+                             'Measure Value' if orientation == 'Vertical' else x)
+    layout.update({'barmode': 'group', 'updatemenus': updatemenus, 'sliders': sliders})
+
+    return go.Figure(data=traces, layout=layout, frames=frames, _validate=False)
+
+
+def get_animated_bubble_figure(dataframe, x, y, size, color, color_discrete, render_mode, title, range_x, range_y):
+    """Returns the bubble graph figure animated over 'Date of Event', built from the pivoted frame arrays."""
+    frame_names, trace_names, point_names, arrays, num_dates = get_frame_arrays(dataframe, 'Date of Event', color,
+                                                                                None, [x, y, size])
+    trace_type = 'scattergl' if render_mode == 'webgl' else 'scatter'
+    # bubble area scales against the largest bubble of the whole animation, as plotly express does
+    sizeref = dataframe[size].max() / 20 ** 2
+
+    def frame_trace(f, t):
+        return {
+            'type': trace_type,
+            'x': arrays[x][f, t],
+            'y': arrays[y][f, t],
+            'marker': {'color': color_discrete[t % len(color_discrete)], 'size': arrays[size][f, t],
+                       'sizemode': 'area', 'sizeref': sizeref, 'symbol': 'circle'},
+            'customdata': [[trace_names[t], frame_names[f], arrays[size][f, t][0]]]}
+
+    traces = []
+    for t, trace_name in enumerate(trace_names):
+        trace = frame_trace(0, t)
+        trace.update({'name': str(trace_name), 'legendgroup': str(trace_name), 'showlegend': True, 'mode': 'markers',
+                      'xaxis': 'x', 'yaxis': 'y'})
+        traces.append(trace)
+
+    frames, updatemenus, sliders = get_animation_frames(frame_names, num_dates, len(trace_names), arrays, frame_trace,
+                                                        'Date of Event', False)
+    layout = get_base_layout(title, color, str(x), str(y))
+    layout['xaxis']['range'] = range_x
+    layout['yaxis']['range'] = range_y
+    layout['legend']['itemsizing'] = 'constant'
+    layout.update({'updatemenus': updatemenus, 'sliders': sliders})
+
+    return go.Figure(data=traces, layout=layout, frames=frames, _validate=False)
+
+
+def apply_graph_style(graph, gridline, legend, xlegend, ylegend):
+    """Re-applies the style only options (gridlines, legend visibility and position) to a rendered graph."""
+    fig = graph.figure
+    fig.update_layout(
+        legend=dict(x=xlegend if xlegend and ylegend else None, y=ylegend if xlegend and ylegend else None),
+        showlegend=False if legend else True)
+
+    # checks for gridline is toggled
+    if gridline:
+        fig.update_xaxes(showgrid=True, zeroline=True, gridcolor='Gray')
+        fig.update_yaxes(showgrid=True, zeroline=True, gridcolor='Gray')
+    else:
+        fig.update_xaxes(showgrid=False, zeroline=False)
+        fig.update_yaxes(showgrid=False, zeroline=False)
+
+    return graph
+
+
+def set_graph_tile(graph, tile):
+    """Returns a copy of a rendered graph whose id matches its tile, so the browser side style toggles can reach it."""
+    if not isinstance(graph, dcc.Graph):
+        return graph
+    graph = copy(graph)
+    graph.id = {'type': 'graph-display', 'index': tile}
+    return graph
+
+
 def get_empty_graph_subtitle(hierarchy_toggle, hierarchy_level_dropdown, hierarchy_path, secondary_type, secondary_path,
                              df_name, df_const):
     """Returns subtitle for empty graph."""
@@ -120,6 +589,8 @@ def get_line_scatter_figure(arg_value, dff, hierarchy_specific_dropdown, hierarc
     # arg_value[4] = degree
     # arg_value[5] = confidence interval
     # arg_value[6] = variable names selector
+    # arg_value[7] = top n
+    # arg_value[8] = point budget
     # ------------------------------------------------------------------------------------------------------------------
 
     language = session["language"]
@@ -198,6 +669,33 @@ def get_line_scatter_figure(arg_value, dff, hierarchy_specific_dropdown, hierarc
                 line_group = None
                 legend_title_text = get_label('LBL_Variable_Names')
 
+            filtered_df.sort_values(by=[color, 'Date of Event'], inplace=True)
+
+            # data fitting runs on every point before downsampling, so the fit does not depend on the point budget
+            # arg_value[3]: data fitting radio options
+            data_fitting = arg_value[3] == 'linear-fit' or arg_value[3] == 'curve-fit'
+            if data_fitting:
+                ci = True if arg_value[5] == ['ci'] else False
+                if arg_value[3] == 'linear-fit':
+                    best_fit_data = linear_regression(filtered_df, 'Date of Event', 'Measure Value', ci)
+                else:
+                    best_fit_data = polynomial_regression(filtered_df, 'Date of Event', 'Measure Value',
+                                                          arg_value[4], ci)
+                filtered_df["Best Fit"] = best_fit_data["Best Fit"]
+                # arg_value[5]: confidence interval is toggled
+                if ci:
+                    filtered_df["Upper Interval"] = best_fit_data["Upper Interval"]
+                    filtered_df["Lower Interval"] = best_fit_data["Lower Interval"]
+
+            # keep the payload within the tile's point budget, full resolution remains available in table/export
+            point_budget = arg_value[8] if len(arg_value) > 8 and arg_value[8] else config.GRAPH_POINT_BUDGET
+            total_points = len(filtered_df)
+            filtered_df = downsample_traces(filtered_df, [col for col in [color, line_group] if col is not None],
+                                            int(point_budget))
+            if len(filtered_df) < total_points:
+                title += '<br><sub>{}</sub>'.format(
+                    get_label('LBL_Downsampled_Points').format(len(filtered_df), total_points))
+
             # filter the dataframe down to the partial period selected
             filtered_df['Partial Period'] = filtered_df['Partial Period'].astype(str).transform(
                 lambda j: get_label('LBL_TRUE') if j == 'True' else get_label('LBL_FALSE'))
@@ -206,25 +704,15 @@ def get_line_scatter_figure(arg_value, dff, hierarchy_specific_dropdown, hierarc
             filtered_df.sort_values(by=[color, 'Date of Event'], inplace=True)
             # generate graph
             color_discrete = color_picker(arg_value[6])
-
-            fig = px.line(
-                title=title,
-                data_frame=filtered_df,
-                x='Date of Event',
-                y='Measure Value',
-                color=color,
-                color_discrete_sequence=color_discrete,
-                line_group=line_group,
-                custom_data=[hierarchy_col, category])
-            fig.update_layout(legend_title_text=legend_title_text)
+            render_mode = get_render_mode(len(filtered_df), 'Line')
 
             # check what arg_value[2]: mode is selected and sets the corresponding trace
             if arg_value[2] == 'Line':
-                fig.update_traces(mode='lines')
+                mode = 'lines'
             elif arg_value[2] == 'Scatter':
-                fig.update_traces(mode='markers')
+                mode = 'markers'
             else:
-                fig.update_traces(mode='lines+markers')
+                mode = 'lines+markers'
 
             # set up hover label
             hovertemplate = get_label('LBL_Gen_Hover_Data', df_name)
@@ -232,82 +720,27 @@ def get_line_scatter_figure(arg_value, dff, hierarchy_specific_dropdown, hierarc
                 '%AXIS-A%', '%{x}')
             hovertemplate = hovertemplate.replace('%AXIS-TITLE-B%', get_label(arg_value[1],
                 df_name+"_Measure_type")).replace('%AXIS-B%', '%{y}')
-            fig.update_traces(hovertemplate=hovertemplate)
-            fig = set_partial_periods(fig, filtered_df, 'Line')
+
+            traces = get_line_traces(filtered_df, color, line_group, [hierarchy_col, category], color_discrete,
+                                     render_mode, mode, hovertemplate)
 
             # ------------------------------------------DATA FITTING----------------------------------------------------
-            # data fitting options visible when hierarchy toggle is on specific item
-            # arg_value[3]: data fitting radio options
-            if arg_value[3] == 'linear-fit':
-                ci = True if arg_value[5] == ['ci'] else False
-                best_fit_data = linear_regression(filtered_df, 'Date of Event', 'Measure Value', ci)
-                filtered_df["Best Fit"] = best_fit_data["Best Fit"]
-                fig2 = px.line(
-                    data_frame=filtered_df,
-                    x='Date of Event',
-                    y='Best Fit',
-                )
-                fig2.update_traces(line_color='#A9A9A9')
-                fig2.data[0].name = 'Best fit'
-                fig2.data[0].showlegend = True
-                fig.add_trace(fig2.data[0])
+            # data fitting options visible when hierarchy toggle is on specific item, fitted above on every point
+            if data_fitting:
+                traces.append(get_fit_trace(filtered_df, 'Best Fit',
+                                            'Best fit' if arg_value[3] == 'linear-fit' else 'Best Fit', '#A9A9A9',
+                                            render_mode))
                 # arg_value[5]: confidence interval is toggled
-                if arg_value[5] == ['ci']:
-                    filtered_df["Upper Interval"] = best_fit_data["Upper Interval"]
-                    filtered_df["Lower Interval"] = best_fit_data["Lower Interval"]
-                    fig3 = px.line(
-                        data_frame=filtered_df,
-                        x='Date of Event',
-                        y='Upper Interval',
-                    )
-                    fig4 = px.line(
-                        data_frame=filtered_df,
-                        x='Date of Event',
-                        y='Lower Interval',
-                    )
-                    fig3.update_traces(line_color='#000000')
-                    fig3.data[0].showlegend = True
-                    fig3.data[0].name = 'Upper Interval'
-                    fig.add_trace(fig3.data[0])
-                    fig4.update_traces(line_color='#000000')
-                    fig4.data[0].showlegend = True
-                    fig4.data[0].name = 'Lower Interval'
-                    fig.add_trace(fig4.data[0])
-            if arg_value[3] == 'curve-fit':
-                ci = True if arg_value[5] == ['ci'] else False
-                best_fit_data = polynomial_regression(filtered_df, 'Date of Event', 'Measure Value', arg_value[4], ci)
-                filtered_df["Best Fit"] = best_fit_data["Best Fit"]
-                fig2 = px.line(
-                    data_frame=filtered_df,
-                    x='Date of Event',
-                    y='Best Fit',
-                )
-                fig2.update_traces(line_color='#A9A9A9')
-                fig2.data[0].showlegend = True
-                fig2.data[0].name = 'Best Fit'
-                fig.add_trace(fig2.data[0])
-                # arg_value[5]: confidence interval is toggled
-                if arg_value[5] == ['ci']:  # ci
-                    filtered_df["Upper Interval"] = best_fit_data["Upper Interval"]
-                    filtered_df["Lower Interval"] = best_fit_data["Lower Interval"]
-                    fig3 = px.line(
-                        data_frame=filtered_df,
-                        x='Date of Event',
-                        y='Upper Interval',
-                    )
-                    fig4 = px.line(
-                        data_frame=filtered_df,
-                        x='Date of Event',
-                        y='Lower Interval',
-                    )
-                    fig3.update_traces(line_color='#000000')
-                    fig3.data[0].showlegend = True
-                    fig3.data[0].name = 'Upper Interval'
-                    fig.add_trace(fig3.data[0])
-                    fig4.update_traces(line_color='#000000')
-                    fig4.data[0].showlegend = True
-                    fig4.data[0].name = 'Lower Interval'
-                    fig.add_trace(fig4.data[0])
+                if ci:
+                    traces.append(get_fit_trace(filtered_df, 'Upper Interval', 'Upper Interval', '#000000',
+                                                render_mode))
+                    traces.append(get_fit_trace(filtered_df, 'Lower Interval', 'Lower Interval', '#000000',
+                                                render_mode))
+
+            # traces are assembled from known good arrays, skip plotly's per property validation
+            fig = go.Figure(data=traces, layout=get_base_layout(title, legend_title_text, 'Date of Event',
+                                                                'Measure Value'), _validate=False)
+            fig = set_partial_periods(fig, filtered_df, 'Line')
             # ----------------------------------------------------------------------------------------------------------
         else:
             fig = px.line(
@@ -480,16 +913,14 @@ def get_bubble_figure(arg_value, dff, hierarchy_specific_dropdown, hierarchy_lev
             if arg_value[0] == 'Time':
                 color_discrete = color_picker(arg_value[6])
 
-                fig = px.scatter(
-                    title=title,
-                    x=filtered_df['Date of Event'],
-                    y=filtered_df[arg_value[2], arg_value[3]],
-                    size=filtered_df[arg_value[4], arg_value[5]],
-                    color=filtered_df[color],
-                    color_discrete_sequence=color_discrete,
-                    custom_data=[filtered_df[color], filtered_df['Date of Event'], filtered_df[arg_value[4],
-                                                                                               arg_value[5]]]
-                )
+                # traces are assembled from known good arrays, skip plotly's per property validation
+                traces = get_bubble_traces(
+                    filtered_df['Date of Event'], filtered_df[arg_value[2], arg_value[3]],
+                    filtered_df[arg_value[4], arg_value[5]], filtered_df[color], [filtered_df[color],
+                    filtered_df['Date of Event'], filtered_df[arg_value[4], arg_value[5]]], color_discrete,
+                    get_render_mode(len(filtered_df), 'Bubble'))
+                fig = go.Figure(data=traces, layout=get_base_layout(title, 'color', 'x', 'y', 'Bubble'),
+                                _validate=False)
                 fig.update_layout(
                     legend_title_text='Size: <br> &#9; {} ({})<br> <br>{}'.format(arg_value[4], arg_value[5],
                                                                                   legend_title_text))
@@ -504,21 +935,14 @@ def get_bubble_figure(arg_value, dff, hierarchy_specific_dropdown, hierarchy_lev
                 fig.update_traces(hovertemplate=hovertemplate)
             else:
                 color_discrete = color_picker(arg_value[6])
+                # animated frames are drawn one at a time, so size the render mode on the largest frame
+                render_mode = get_render_mode(int(filtered_df['Date of Event'].value_counts().max()), 'Bubble')
                 # generate graph
-                fig = px.scatter(
-                    title=title,
-                    x=filtered_df[arg_value[0], arg_value[1]],
-                    y=filtered_df[arg_value[2], arg_value[3]],
-                    size=filtered_df[arg_value[4], arg_value[5]],
-                    animation_frame=filtered_df['Date of Event'],
-                    color=filtered_df[color],
-                    color_discrete_sequence=color_discrete,
-                    range_x=[0, filtered_df[arg_value[0], arg_value[1]].max()+100],
-                    range_y=[0, filtered_df[arg_value[2], arg_value[3]].max()+100],
-                    labels={'animation_frame': 'Date of Event'},
-                    custom_data=[filtered_df[color], filtered_df['Date of Event'], filtered_df[arg_value[4],
-                                                                                               arg_value[5]]]
-                )
+                fig = get_animated_bubble_figure(
+                    filtered_df, (arg_value[0], arg_value[1]), (arg_value[2], arg_value[3]),
+                    (arg_value[4], arg_value[5]), color, color_discrete, render_mode, title,
+                    [0, filtered_df[arg_value[0], arg_value[1]].max()+100],
+                    [0, filtered_df[arg_value[2], arg_value[3]].max()+100])
                 fig.update_layout(
                     legend_title_text='Size: <br> &#9; {} ({})<br> <br>{}'.format(arg_value[4], arg_value[5],
                                                         legend_title_text), transition={'duration': 4000})
@@ -758,17 +1182,16 @@ def get_bar_figure(arg_value, dff, hierarchy_specific_dropdown, hierarchy_level_
 
             color_discrete = color_picker(arg_value[4])
             # generate graph
-            fig = px.bar(
-                title=title,
-                data_frame=filtered_df,
-                x=x if arg_value[2] == 'Vertical' else 'Measure Value',
-                y='Measure Value' if arg_value[2] == 'Vertical' else x,
-                orientation='v' if arg_value[2] == 'Vertical' else 'h',
-                color=color,
-                color_discrete_sequence=color_discrete,
-                barmode='group',
-                animation_frame='Date of Event' if arg_value[3] else None,
-                custom_data=[hierarchy_col, color, 'Date of Event'])
+            if arg_value[3]:
+                fig = get_animated_bar_figure(filtered_df, x, color, hierarchy_col, arg_value[2], color_discrete,
+                                              title)
+            else:
+                # traces are assembled from known good arrays, skip plotly's per property validation
+                traces = get_bar_traces(filtered_df, x, color, [hierarchy_col, color, 'Date of Event'], arg_value[2],
+                                        color_discrete)
+                fig = go.Figure(data=traces, layout=get_base_layout(
+                    title, color, x if arg_value[2] == 'Vertical' else 'Measure Value',
+                    'Measure Value' if arg_value[2] == 'Vertical' else x, 'Bar'), _validate=False)
             fig.update_layout(legend_title_text=legend_title_text)
             # set up hover label
             hovertemplate = get_label('LBL_Gen_Hover_Data', df_name)
@@ -965,15 +1388,18 @@ def get_box_figure(arg_value, dff, hierarchy_specific_dropdown, hierarchy_level_
 
             color_discrete = color_picker(arg_value[3])
             # generate graph
-            fig = px.box(
-                title=title,
-                data_frame=filtered_df,
+            if len(filtered_df) > config.BOX_STATS_THRESHOLD:
+                # too many values to ship, send precomputed statistics and a capped set of outliers instead
+                fig = get_box_stats_figure(filtered_df, category, y, arg_value[1], color_discrete, arg_value[2])
+                fig.update_layout(title=title)
+            else:
+                # traces are assembled from known good arrays, skip plotly's per property validation
                 # check arg_value[1]: orientation assign to corresponding x and y-axis
-                x=x if arg_value[1] == 'Horizontal' else y,
-                y=y if arg_value[1] == 'Horizontal' else x,
-                color=category,
-                color_discrete_sequence=color_discrete,
-                points='all' if arg_value[2] else False)
+                fig = go.Figure(
+                    data=get_box_traces(filtered_df, category, y, arg_value[1], color_discrete, arg_value[2]),
+                    layout=get_base_layout(title, category, x if arg_value[1] == 'Horizontal' else y,
+                                           y if arg_value[1] == 'Horizontal' else x, 'Box_Plot'),
+                    _validate=False)
 
             fig.update_layout(legend_title_text=get_label('LBL_Variable_Names'))
         # filtered is empty, create default empty graph
@@ -1135,6 +1561,19 @@ def get_table_figure(arg_value, dff, tile, hierarchy_specific_dropdown, hierarch
     if arg_value[1] is None or type(arg_value[1]) is not int:
         arg_value[1] = 10
 
+    # small results are shipped whole and paged, sorted and filtered in the browser, larger ones by _update_table
+    if len(dff) <= config.TABLE_NATIVE_ROW_BUDGET and \
+            dff.memory_usage(deep=True).sum() <= config.TABLE_NATIVE_BYTE_BUDGET:
+        table_action = 'native'
+        data = dff.copy()
+        # Reformat date column
+        if df_name == "OPG010" and 'Date of Event' in data.columns:
+            data['Date of Event'] = data['Date of Event'].transform(lambda y: y.strftime(format='%Y-%m-%d'))
+        data = data.to_dict('records')
+    else:
+        table_action = 'custom'
+        data = None
+
     table = html.Div([
         html.Div(style={'height': '28px'}),
         html.Plaintext(title,
@@ -1148,14 +1587,16 @@ def get_table_figure(arg_value, dff, tile, hierarchy_specific_dropdown, hierarch
             id={'type': 'datatable', 'index': tile},
             columns=columns_for_dash_table,
 
+            data=data,
+
             page_current=0,
             page_size=int(arg_value[1]),
-            page_action="custom",
+            page_action=table_action,
 
-            filter_action='custom',
+            filter_action=table_action,
             filter_query='',
 
-            sort_action='custom',
+            sort_action=table_action,
             sort_mode='multi',
             sort_by=[],
 
@@ -1205,31 +1646,18 @@ def get_sankey_figure(dff, hierarchy_level_dropdown, hierarchy_path, hierarchy_t
 
     title += '<br><sub>{} {} </sub>'.format(get_label('LBL_Data_Accessed_On'), datetime.date(datetime.now()))
 
-    node_df = session[df_name + "_NodeData"]
-
-    label_numpy = []
-    custom_numpy = []
-    x_numpy = []
-    y_numpy = []
-    node_colour_numpy = []
-
-    for index, row in node_df.iterrows():
-        label_numpy.append(get_label("LBL_" + row['node_id'], df_name))
-        custom_numpy.append(get_label("".join(["LBL_", row['node_id'], '_Long']), df_name))
-        x_numpy.append(row['x_coord'])
-        y_numpy.append(row['y_coord'])
-        node_colour_numpy.append(row['colour'])
+    node_meta = get_node_metadata(df_name)
 
-    source_numpy = []
-    target_numpy = []
-    value_numpy = []
-    link_colour_numpy = []
+    # collapse duplicate flows so the payload scales with distinct edges rather than rows
+    link_df = pd.DataFrame({'source': pd.to_numeric(filtered_df['Measure Id']).astype('int64').to_numpy(),
+                            'target': pd.to_numeric(filtered_df['MeasQual1']).astype('int64').to_numpy(),
+                            'value': pd.to_numeric(filtered_df['MeasQual2']).to_numpy()})
+    link_df = link_df.groupby(['source', 'target'], sort=False, as_index=False)['value'].sum()
 
-    for index, row in filtered_df.iterrows():
-        source_numpy.append(row['Measure Id'])
-        target_numpy.append(row['MeasQual1'])
-        value_numpy.append(row['MeasQual2'])
-        link_colour_numpy.append(node_colour_numpy[int(row['Measure Id'])])
+    source_numpy = link_df['source'].to_numpy()
+    target_numpy = link_df['target'].to_numpy()
+    value_numpy = link_df['value'].to_numpy()
+    link_colour_numpy = node_meta['colour'][source_numpy]
 
     # set up hover labels
     node_hover_template = get_label('LBL_Node_HoverTemplate', df_name)
@@ -1248,12 +1676,12 @@ def get_sankey_figure(dff, hierarchy_level_dropdown, hierarchy_path, hierarchy_t
             pad=15,
             # thickness=20,
             # line=dict(color="black", width=0.5),
-            label=label_numpy,  # label=["A1", "A2", "B1", "B2", "C1", "C2"],
-            x=x_numpy,
-            y=y_numpy,
-            customdata=custom_numpy,
+            label=node_meta['label'],  # label=["A1", "A2", "B1", "B2", "C1", "C2"],
+            x=node_meta['x'],
+            y=node_meta['y'],
+            customdata=node_meta['customdata'],
             hovertemplate=node_hover_template,
-            color=node_colour_numpy
+            color=node_meta['colour']
         ),
         link=dict(
             source=source_numpy,  # source=[0, 1, 0, 2, 3, 3],  # indices correspond to labels, eg A1, A2, A2, B1, ...
@@ -1291,88 +1719,105 @@ def __update_graph(df_name, graph_options, graph_type, graph_title, num_periods,
                    secondary_level_dropdown, secondary_state_of_display, secondary_toggle,
                    secondary_graph_children, secondary_options, session_key, hierarchy_type):
     """Update graph internal - can be called from callbacks or programmatically"""
-    # Creates a hierarchy trail from the display
-    if type(state_of_display) == dict:
-        state_of_display = [state_of_display]
-
-    list_of_names = []
-
-    if len(state_of_display) > 0:
-        for obj in state_of_display:
-            list_of_names.append(obj['props']['children'])
-
-    if hierarchy_toggle == 'Specific Item' and hierarchy_graph_children == ['graph_children']:
-        # If at a leaf node then display its parents data
-        nid_path = "root"
-        for x in list_of_names:
-            nid_path += ('^||^{}'.format(x))
-        if not hierarchy_options:
-            list_of_names.pop()
+    list_of_names = get_hierarchy_trail(state_of_display, hierarchy_toggle, hierarchy_graph_children,
+                                        hierarchy_options)
 
     # hierarchy specific dropdown selection is last item in list_of_names, otherwise None
     hierarchy_specific_dropdown = list_of_names[-1] if len(list_of_names) > 0 else None
 
-    # Creates a secondary hierarchy trail from the display
-    if type(secondary_state_of_display) == dict:
-        secondary_state_of_display = [secondary_state_of_display]
-
-    list_of_secondary_names = []
-
-    if len(secondary_state_of_display) > 0:
-        for obj in secondary_state_of_display:
-            list_of_secondary_names.append(obj['props']['children'])
+    # graphing all children reads them from the server, the dropdown options only hold the first or searched ones
+    if secondary_toggle == 'Specific Item' and secondary_graph_children == ['graph_children'] and \
+            session_key in session:
+        if type(secondary_state_of_display) == dict:
+            secondary_state_of_display = [secondary_state_of_display]
+        secondary_options = get_secondary_children_options(session_key, '^||^'.join(
+            ['root'] + [obj['props']['children'] for obj in secondary_state_of_display]))
+
+    list_of_secondary_names = get_hierarchy_trail(secondary_state_of_display, secondary_toggle,
+                                                  secondary_graph_children, secondary_options)
+
+    # the data stage is keyed on everything that filters or aggregates the data, the figure on everything but style
+    data_key = get_render_cache_key(df_name, session_key, graph_type, graph_options, hierarchy_toggle,
+                                    hierarchy_level_dropdown, hierarchy_graph_children, list_of_names, secondary_type,
+                                    timeframe, fiscal_toggle, start_year, end_year, start_secondary, end_secondary,
+                                    num_periods, period_type, list_of_secondary_names, secondary_toggle,
+                                    secondary_level_dropdown, secondary_graph_children, secondary_options)
+    # figures are keyed on the day too, their subtitle holds the date the data was accessed on
+    figure_key = get_render_cache_key(data_key, graph_title, xtitle, ytitle, session["language"], hierarchy_type,
+                                      datetime.date(datetime.now()))
+
+    # style only changes re-use the rendered figure
+    if graph_type in CACHED_GRAPH_TYPES:
+        # cached results are shared by the session's requests, style and render a copy
+        graph = get_render_cache('figure', figure_key)
+        if graph is not None:
+            return apply_graph_style(deepcopy(graph), gridline, legend, xlegend, ylegend)
+        filtered_df = get_render_cache('data', data_key)
+        if filtered_df is not None:
+            filtered_df = filtered_df.copy()
+    else:
+        filtered_df = None
 
-    if secondary_toggle == 'Specific Item' and secondary_graph_children == ['graph_children']:
-        # If at a leaf node then display its parents data
-        nid_path = "root"
-        for x in list_of_secondary_names:
-            nid_path += ('^||^{}'.format(x))
-        if not secondary_options:
-            list_of_secondary_names.pop()
+    if filtered_df is None:
+        # If "Last ___ ____" is active and the num_periods is invalid (None), return an empty graph
+        if timeframe == 'to-current' and not num_periods:
+            filtered_df = pd.DataFrame(columns=df_const[session_key]['COLUMN_NAMES'])
+        # else, filter normally
+        else:
+            filtered_df = get_filtered_base(list_of_names, hierarchy_toggle, hierarchy_level_dropdown,
+                                            hierarchy_graph_children, df_name, df_const, secondary_type,
+                                            end_secondary, end_year, start_secondary, start_year, timeframe,
+                                            fiscal_toggle, num_periods, period_type, session_key)
+
+        # roll every member past the tile's top n into a single "Other" series when graphing a whole level
+        if graph_type in TOP_N_ARG_INDEX and len(graph_options) > TOP_N_ARG_INDEX[graph_type] and \
+                (hierarchy_toggle == 'Level Filter' or hierarchy_graph_children == ['graph_children']):
+            if graph_type == 'Bubble':
+                rank_mask = (filtered_df[df_const[session_key]['VARIABLE_LEVEL']] == graph_options[4]) & \
+                            (filtered_df['Measure Type'] == graph_options[5])
+            else:
+                rank_mask = filtered_df['Measure Type'] == graph_options[1]
+            member_column = get_hierarchy_col(hierarchy_toggle, hierarchy_level_dropdown, hierarchy_graph_children,
+                                              list_of_names, df_const, session_key)
+            filtered_df = top_n_bucketing(filtered_df, member_column, graph_options[TOP_N_ARG_INDEX[graph_type]],
+                                          get_label('LBL_Other'), rank_mask)
 
-    # If "Last ___ ____" is active and the num_periods is invalid (None), return an empty graph
-    if timeframe == 'to-current' and not num_periods:
-        filtered_df = pd.DataFrame(columns=df_const[session_key]['COLUMN_NAMES'])
-    # else, filter normally
-    else:
-        filtered_df = data_manipulator(list_of_names, hierarchy_toggle, hierarchy_level_dropdown,
-                                       hierarchy_graph_children, df_name, df_const, secondary_type, end_secondary,
-                                       end_year, start_secondary, start_year, timeframe, fiscal_toggle, num_periods,
-                                       period_type, graph_options, graph_type, list_of_secondary_names,
-                                       secondary_toggle, secondary_level_dropdown, secondary_graph_children,
-                                       secondary_options, session_key)
+        if graph_type in CACHED_GRAPH_TYPES:
+            set_render_cache('data', data_key, filtered_df.copy())
 
     # line and scatter graph creation
     if graph_type == 'Line' or graph_type == 'Scatter':
-        return get_line_scatter_figure(graph_options, filtered_df, hierarchy_specific_dropdown,
-                                       hierarchy_level_dropdown, list_of_names, hierarchy_toggle,
-                                       hierarchy_graph_children, graph_title, df_name, df_const, xtitle, ytitle,
-                                       xlegend, ylegend, gridline, legend,
-                                       secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
-                                       secondary_graph_children, session_key, hierarchy_type)
+        graph = get_line_scatter_figure(graph_options, filtered_df, hierarchy_specific_dropdown,
+                                        hierarchy_level_dropdown, list_of_names, hierarchy_toggle,
+                                        hierarchy_graph_children, graph_title, df_name, df_const, xtitle, ytitle,
+                                        xlegend, ylegend, gridline, legend,
+                                        secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
+                                        secondary_graph_children, session_key, hierarchy_type)
     # bubble graph creation
     elif graph_type == 'Bubble':
-        return get_bubble_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
-                                 list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
-                                 df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend, session_key,
-                                 hierarchy_type)
+        graph = get_bubble_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
+                                  list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
+                                  df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend, session_key,
+                                  hierarchy_type)
     # bar graph creation
     elif graph_type == 'Bar':
-        return get_bar_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
-                              list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
-                              df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend,
-                              secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
-                              secondary_graph_children, session_key, hierarchy_type)
+        graph = get_bar_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
+                               list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
+                               df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend,
+                               secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
+                               secondary_graph_children, session_key, hierarchy_type)
     # box plot creation
     elif graph_type == 'Box_Plot':
-        return get_box_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
-                              list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
-                              df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend,
-                              secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
-                              secondary_graph_children, session_key, hierarchy_type)
+        graph = get_box_figure(graph_options, filtered_df, hierarchy_specific_dropdown, hierarchy_level_dropdown,
+                               list_of_names, hierarchy_toggle, hierarchy_graph_children, graph_title, df_name,
+                               df_const, xtitle, ytitle, xlegend, ylegend, gridline, legend,
+                               secondary_level_dropdown, list_of_secondary_names, secondary_toggle,
+                               secondary_graph_children, session_key, hierarchy_type)
     # table creation
     elif graph_type == 'Table':
-        changed_index = dash.callback_context.inputs_list[2]['id']['index']
+        # rebuilt outside of a callback (ex. the graph api) there is no tile to index the table by
+        changed_index = dash.callback_context.inputs_list[2]['id']['index'] \
+            if dash.callback_context.inputs_list else 0
         return get_table_figure(graph_options, filtered_df, changed_index, hierarchy_specific_dropdown,
                                 hierarchy_level_dropdown, list_of_names, hierarchy_toggle, hierarchy_graph_children,
                                 graph_title, df_name, hierarchy_type)
@@ -1385,6 +1830,9 @@ def __update_graph(df_name, graph_options, graph_type, graph_title, num_periods,
     else:
         return None
 
+    set_render_cache('figure', figure_key, graph)
+    return graph
+
 
 # different colour palette colour hex codes
 def color_picker(palette):
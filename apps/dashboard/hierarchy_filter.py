@@ -11,7 +11,7 @@ import dash_core_components as dcc
 import dash_html_components as html
 
 # Internal Modules
-from apps.dashboard.data import get_label, session
+from apps.dashboard.data import get_label, get_hierarchy_children
 
 # ***********************************************HELPER FUNCTIONS****************************************************
 
@@ -19,24 +19,8 @@ from apps.dashboard.data import get_label, session
 def generate_dropdown(tile, df_name, nid_path, session_key):
     """Helper function to generate and return hierarchy drop-down."""
     if df_name:
-        # using a subset of our dataframe, turn it into a multiindex df, and access unique values for option
-        df = session[session_key][['H0', 'H1', 'H2', 'H3', 'H4']]
-        hierarchy_nid_list = list(nid_path.split("^||^"))[1:]
-        llen = len(hierarchy_nid_list)
-        if llen == 5:
-            option_list = []
-        elif llen != 0:
-            for i in range(llen):
-                df = df.filter(df['H{}'.format(i)] == hierarchy_nid_list[i])
-                df = df.drop('H{}'.format(i))
-            option_list = df['H{}'.format(llen)].unique(dropmissing=True)
-        else:
-            option_list = df['H0'].unique(dropmissing=True)
-        if df_name == "OPG011":
-            options = [{'label': i, 'value': i} for i in option_list]
-        else:
-            options = [{'label': i, 'value': i} for i in option_list]
-        options = sorted(options, key=lambda k: k['label'])
+        # the node's children are read from the data set's hierarchy tree, already sorted
+        options = [{'label': i, 'value': i} for i in get_hierarchy_children(session_key, nid_path)]
 
         return dcc.Dropdown(
             id={'type': 'hierarchy_specific_dropdown', 'index': tile},
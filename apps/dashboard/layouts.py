@@ -8,6 +8,10 @@ Stores all layouts excluding hierarchy filter layout.
 
 # External Packages
 import inspect
+from uuid import uuid4
+from re import compile as compile_regex
+from threading import Lock
+from plotly.utils import PlotlyJSONEncoder
 import dash_core_components as dcc
 from dash_core_components import Store, Dropdown, RadioItems, Location, Markdown, Checklist
 import dash_html_components as html
@@ -20,6 +24,7 @@ import dash_bootstrap_components as dbc
 import dash_responsive_grid_layout as drgl
 
 # Internal Modules
+import config
 from conn import exec_storedproc_results
 from apps.dashboard.data import GRAPH_OPTIONS, DATA_CONTENT_SHOW, DATA_CONTENT_HIDE, VIEW_CONTENT_SHOW, \
     BAR_X_AXIS_OPTIONS, CUSTOMIZE_CONTENT_HIDE, X_AXIS_OPTIONS, get_label, LAYOUT_CONTENT_HIDE, LAYOUTS, \
@@ -32,31 +37,90 @@ from apps.dashboard.graphs import __update_graph
 
 # ********************************************HELPER FUNCTION(S)******************************************************
 
+# serialized layout fragments keyed on their builder, its arguments, the language and the client css
+LAYOUT_FRAGMENTS = {}
+LAYOUT_FRAGMENTS_LOCK = Lock()
 
-def change_index(doc, index):
-    """Change index numbers of all id's within tile or data side-menu."""
+# placeholders left by the layout builders for per-user values, see get_slot()
+SLOT_PATTERN = compile_regex(r'"__slot_(\w+)__"')
 
-    def _change_index(document, new_index):
-        if isinstance(document, list):
-            for list_items in document:
-                _change_index(
-                    document=list_items, new_index=new_index
-                )
-        elif isinstance(document, dict):
-            for dict_key, dict_value in document.items():
-                if dict_key == 'index':
-                    document['index'] = new_index
-                elif dict_key == 'type' and 'args-value: ' in dict_value:
-                    document['type'] = 'args-value: {}'.replace("{}", str(new_index))
-                    break
-                elif dict_key == 'type' and 'button: ' in dict_value:
-                    document['type'] = 'button: {}'.replace("{}", str(new_index))
-                _change_index(
-                    document=dict_value, new_index=new_index
-                )
-        return document
+# index slots of a serialized layout: the customize menu ids keep their argument index, the hierarchy button ids and
+# every other id take the new index
+INDEX_SLOT_PATTERN = compile_regex(r'(?P<args_value>"type": "[^"\\]*args-value: [^"\\]*")'
+                                   r'(?P<arg_index>, "index": -?\d+)?|'
+                                   r'(?P<button>"type": "[^"\\]*button: [^"\\]*")|'
+                                   r'"index": (?:-?\d+|null|"[^"\\]*")')
+
+
+def get_slot(name):
+    """Returns the placeholder a layout builder leaves for a value filled in by get_layout_fragment."""
+    return '__slot_{}__'.format(name)
+
+
+def get_layout_fragment(build, *args, tile=None, **slots):
+    """
+    Returns the layout of build(*args) as plotly json, built and serialized once per language and client css. Tile
+    layouts are built once as tile 0 and re-indexed on the serialization. The slots the builder left are filled with
+    the keyword values on every call.
+    """
+    fragment_key = (build.__name__,) + args + (session['language'], config.client_css)
+    with LAYOUT_FRAGMENTS_LOCK:
+        fragment = LAYOUT_FRAGMENTS.get(fragment_key)
+
+    if fragment is None:
+        # built outside of the lock, a fragment built concurrently by two requests is the same
+        fragment = json.dumps(build(*args) if tile is None else build(0, *args), cls=PlotlyJSONEncoder)
+        with LAYOUT_FRAGMENTS_LOCK:
+            LAYOUT_FRAGMENTS[fragment_key] = fragment
+            while len(LAYOUT_FRAGMENTS) > config.LAYOUT_CACHE_SIZE:
+                del LAYOUT_FRAGMENTS[next(iter(LAYOUT_FRAGMENTS))]
+
+    if tile:
+        fragment = reindex_json(fragment, tile)
+
+    values = {name: json.dumps(value, cls=PlotlyJSONEncoder) for name, value in slots.items()}
+    return json.loads(SLOT_PATTERN.sub(lambda match: values[match.group(1)], fragment))
 
-    return _change_index(document=doc, new_index=index)
+
+def get_saved_layout_options(search_value=None, value=None):
+    """
+    Returns a page of the user's saved graph dropdown options, the titles containing the searched text if any. The
+    selected layout is kept in the page so the dropdown still shows it.
+    """
+    search_value = (search_value or '').lower()
+    options = []
+    for key, title in session['saved_layout_titles'].items():
+        if len(options) == config.DROPDOWN_OPTION_LIMIT:
+            break
+        if search_value in title.lower():
+            options.append({'label': title, 'value': key})
+    if value in session['saved_layout_titles'] and not any(option['value'] == value for option in options):
+        options.append({'label': session['saved_layout_titles'][value], 'value': value})
+    return options
+
+
+def get_saved_dashboard_options():
+    """Returns the saved dashboard dropdown options of the user."""
+    return [{'label': session['saved_dashboards'][key]['Dashboard Title'], 'value': key}
+            for key in session['saved_dashboards']]
+
+
+def reindex_json(fragment, index):
+    """Returns the serialized layout with the index slots of its ids set to the index."""
+
+    def _reindex_slot(match):
+        if match.group('args_value'):
+            return '"type": "args-value: {}"{}'.format(index, match.group('arg_index') or '')
+        elif match.group('button'):
+            return '"type": "button: {}"'.format(index)
+        return '"index": {}'.format(index)
+
+    return INDEX_SLOT_PATTERN.sub(_reindex_slot, fragment)
+
+
+def change_index(doc, index):
+    """Change index numbers of all id's within tile or data side-menu."""
+    return json.loads(reindex_json(json.dumps(doc, cls=PlotlyJSONEncoder), index))
 
 
 # TODO: No usages
@@ -250,6 +314,11 @@ def get_data_menu(tile, df_name=None, mode='Default', hierarchy_toggle='Level Fi
         return dashboard_loading_wrapper
 
 
+def get_default_data_menu(tile):
+    """Returns the data side-menu of a tile without a data set."""
+    return get_layout_fragment(get_data_menu, tile=tile)
+
+
 # ****************************************************TAB LAYOUT******************************************************
 
 
@@ -258,7 +327,7 @@ def get_div_body(num_tiles=1, tile_keys=None, layout=LAYOUTS[0]):
     cols = {'lg': 24}
     breakpoints = {'lg': 1200}
     if num_tiles == 1 and tile_keys is None:
-        children = get_tile(0, df_name=None)
+        children = build_tile(0)
     else:
         children = get_tile_layout(num_tiles, tile_keys)
     return [
@@ -277,6 +346,12 @@ def get_div_body(num_tiles=1, tile_keys=None, layout=LAYOUTS[0]):
 
 def get_default_tab_content():
     """Returns the default tab layout."""
+    return get_layout_fragment(build_default_tab_content, saved_layouts=get_saved_layout_options(),
+                               tile_wrapper='tile-wrapper: 0')
+
+
+def build_default_tab_content():
+    """Builds the default tab layout, leaving a slot for the saved graph options."""
     return [
         # stores number of tiles for the tab
         Div(
@@ -431,6 +506,16 @@ def get_dashboard_title_input(title=''):
 
 def get_layout_dashboard():
     """Returns layout of app's UI."""
+    # the served layout starts with a single new tab, the tab content parked by previously served layouts is orphaned
+    for lookup in [key for key in session if key.startswith('tab_content_')]:
+        session.pop(lookup)
+    return get_layout_fragment(build_layout_dashboard, saved_layouts=get_saved_layout_options(),
+                               saved_dashboards=get_saved_dashboard_options(), tab_handle=uuid4().hex,
+                               tile_wrapper='tile-wrapper: 0')
+
+
+def build_layout_dashboard():
+    """Builds the layout of app's UI, leaving slots for the saved graph and dashboard options and the tab handle."""
     return Div([
         # flex
         Div([
@@ -500,9 +585,7 @@ def get_layout_dashboard():
                         children=[
                             Dropdown(
                                 id='select-dashboard-dropdown',
-                                options=[{'label': session['saved_dashboards'][key]['Dashboard Title'], 'value': key}
-                                         for key in
-                                         session['saved_dashboards']],
+                                options=get_slot('saved_dashboards'),
                                 clearable=False,
                                 style={'width': '400px', 'font-size': '13px'},
                                 value='',
@@ -519,7 +602,7 @@ def get_layout_dashboard():
                 # tab content
                 Div([
                     Div(
-                        get_default_tab_content(),
+                        build_default_tab_content(),
                         className='flex-container graph-container',
                         id='tab-content')],
                     className='flex-container graph-container',
@@ -866,11 +949,16 @@ def get_layout_dashboard():
         Store(
             id='num-tiles-4',
             data={'num-tiles': 1}),
-        # memory locations for tabs
+        # memory locations for tabs, their contents are parked server-side under the handles
         Store(
             id='tab-storage',
             storage_type='memory',
-            data=[{'content': get_default_tab_content(), 'title': ''}]),
+            data=[{'handle': get_slot('tab_handle'), 'title': '', 'num-tiles': 1}]),
+        # token of the parent data menu's selections, shared by every linked tile
+        Store(
+            id='parent-spec',
+            storage_type='memory',
+            data=None),
         # memory locations for dataframe constants and its triggers
         Div(
             Div(
@@ -963,6 +1051,24 @@ def get_tile(tile, tile_keys=None, df_name=None):
     :param df_name: Name of the data set being used.
     :return: New default tile with index values matching the specified tile index
     """
+    tile_wrapper = "tile-wrapper: " + str(tile)
+    if tile_keys:
+        return get_layout_fragment(build_tile, df_name, True, tile=tile, saved_layouts=get_saved_layout_options(),
+                                   tile_wrapper=tile_wrapper, tile_title=tile_keys['Tile Title'],
+                                   tile_link=tile_keys['Link'], customize_content=tile_keys['Customize Content'],
+                                   rebuild_menu=tile_keys['Rebuild Menu'])
+    return get_layout_fragment(build_tile, df_name, False, tile=tile, saved_layouts=get_saved_layout_options(),
+                               tile_wrapper=tile_wrapper)
+
+
+def build_tile(tile, df_name=None, keyed=False):
+    """
+    :param tile: Index of the created tile
+    :param df_name: Name of the data set being used.
+    :param keyed: Whether the tile's title, link, customize content and rebuild flag are left as slots
+    :return: Tile with index values matching the specified tile index and slots for its wrapper id and the saved
+    graph options
+    """
     return Div(
         Div([
             # flex container
@@ -971,7 +1077,7 @@ def get_tile(tile, tile_keys=None, df_name=None):
                     dcc.Input(
                         id={'type': 'tile-title', 'index': tile},
                         placeholder=get_label('LBL_Enter_Graph_Title'),
-                        value=tile_keys['Tile Title'] if tile_keys else '',
+                        value=get_slot('tile_title') if keyed else '',
                         className='tile-title',
                         debounce=True),
                     Header([
@@ -1008,7 +1114,7 @@ def get_tile(tile, tile_keys=None, df_name=None):
                 ], style={'display': 'flex'}),
                 Div(
                     I(
-                        className=tile_keys['Link'] if tile_keys else 'fa fa-link',
+                        className=get_slot('tile_link') if keyed else 'fa fa-link',
                         id={'type': 'tile-link', 'index': tile},
                         style={'position': 'relative'}),
                     className='dragbar',
@@ -1028,7 +1134,7 @@ def get_tile(tile, tile_keys=None, df_name=None):
                             className='fill-container')]),
                 Div(
                     Div(
-                        tile_keys['Customize Content'] if tile_keys
+                        get_slot('customize_content') if keyed
                         else get_customize_content(tile=tile, graph_type=None, graph_menu=None, df_name=df_name),
                         style=CUSTOMIZE_CONTENT_HIDE,
                         id={'type': 'tile-customize-content', 'index': tile},
@@ -1042,9 +1148,7 @@ def get_tile(tile, tile_keys=None, df_name=None):
                         id={'type': 'select-layout-dropdown-div', 'index': tile},
                         children=[
                             Dropdown(id={'type': 'select-layout-dropdown', 'index': tile},
-                                         options=[{'label': session['saved_layouts'][key]['Title'], 'value': key} for
-                                                  key in
-                                                  session['saved_layouts']],
+                                         options=get_slot('saved_layouts'),
                                          optionHeight=30,
                                          style={'width': '400px', 'font-size': '13px'},
                                          clearable=False,
@@ -1063,12 +1167,12 @@ def get_tile(tile, tile_keys=None, df_name=None):
             # used to prevent graph menu rebuilds on key built components
             # (Rebuild menu if set to True, Do not rebuild menu if False)
             Store(id={'type': 'tile-rebuild-menu-flag', 'index': tile},
-                      data=tile_keys['Rebuild Menu'] if tile_keys else True),
+                      data=get_slot('rebuild_menu') if keyed else True),
         ], className='tile-container',
             id={'type': 'tile', 'index': tile}),
         className='fill-container',
         style={'border': '1px solid #c7c7c7'},
-        id="tile-wrapper: " + str(tile))  # added to remove errors on responsive grid layout
+        id=get_slot('tile_wrapper'))  # added to remove errors on responsive grid layout
 
 
 # arrange tiles on the page for 1-4 tiles
@@ -1105,7 +1209,7 @@ def get_tile_layout(num_tiles, tile_keys=None, parent_df=None):
 def get_line_scatter_graph_menu(tile, x, mode, measure_type, df_name, gridline, legend, df_const, data_fitting, ci,
                                 data_fit, degree, xaxis, yaxis, xpos, ypos, xmodified, ymodified, secondary_level_value,
                                 secondary_nid_path, secondary_hierarchy_toggle, secondary_graph_all_toggle, color,
-                                session_key):
+                                session_key, top_n=None, point_budget=None):
     """
     :param data_fitting: boolean to determine whether to show data fitting options
     :param ci: show confidence interval or not
@@ -1131,6 +1235,8 @@ def get_line_scatter_graph_menu(tile, x, mode, measure_type, df_name, gridline,
     :param secondary_nid_path: the path of secondary specific hierarchy
     :param color: the color palette of the graph
     :param session_key: df_constants dictionary key
+    :param top_n: number of members graphed before the rest are rolled into "Other", None graphs all
+    :param point_budget: number of points graphed before the traces are downsampled, None uses the default budget
     :return: Menu with options to modify a line graph
     """
     # arg_value[0] = xaxis selector
@@ -1140,6 +1246,8 @@ def get_line_scatter_graph_menu(tile, x, mode, measure_type, df_name, gridline,
     # arg_value[4] = degree
     # arg_value[5] = confidence interval
     # arg_value[6] = color
+    # arg_value[7] = top n
+    # arg_value[8] = point budget
 
     return [
         Div(
@@ -1312,6 +1420,8 @@ def get_line_scatter_graph_menu(tile, x, mode, measure_type, df_name, gridline,
                             style={'font-size': '13px', 'margin-left': '40px'})],
                         style={'display': 'inline-flex', 'max-width': '290px'})
                 ]),
+                get_top_n_option(tile, 7, top_n),
+                get_point_budget_option(tile, 8, point_budget),
                 Div(
                     Div(
                         children=get_default_graph_options(xaxis=xaxis, yaxis=yaxis, xpos=xpos, ypos=ypos,
@@ -1324,7 +1434,7 @@ def get_line_scatter_graph_menu(tile, x, mode, measure_type, df_name, gridline,
 
 def get_bar_graph_menu(tile, x, measure_type, orientation, animate, gridline, legend, df_name, df_const, xaxis,
                        yaxis, xpos, ypos, xmodified, ymodified, secondary_level_value, secondary_nid_path,
-                       secondary_hierarchy_toggle, secondary_graph_all_toggle, color, session_key):
+                       secondary_hierarchy_toggle, secondary_graph_all_toggle, color, session_key, top_n=None):
     """
     :param tile: Index of the tile the bar graph menu corresponds to
     :param x: the x-axis value
@@ -1347,14 +1457,15 @@ def get_bar_graph_menu(tile, x, measure_type, orientation, animate, gridline, le
     :param secondary_nid_path: the path of secondary specific hierarchy
     :param color: the color palette of the graph
     :param session_key: df_constants dictionary key
+    :param top_n: number of members graphed before the rest are rolled into "Other", None graphs all
     :return: Menu with options to modify a bar graph
     """
     # args_value[0] = x-axis
     # args_value[1] = y-axis (measure type)
     # args_value[2] = orientation
-    # args_value[3] = graphed variables
-    # args_value[4] = animate graph
-    # args_value[5] = color
+    # args_value[3] = animate graph
+    # args_value[4] = color
+    # args_value[5] = top n
 
     return [
         Div(
@@ -1467,6 +1578,7 @@ def get_bar_graph_menu(tile, x, measure_type, orientation, animate, gridline, le
                         style={'font-size': '13px', 'margin-left': '40px'})],
                     style={'display': 'inline-flex', 'max-width': '290px'})
             ]),
+            get_top_n_option(tile, 5, top_n),
             Div(
                 Div(
                     children=get_default_graph_options(xaxis=xaxis, yaxis=yaxis, xpos=xpos, ypos=ypos,
@@ -1478,7 +1590,7 @@ def get_bar_graph_menu(tile, x, measure_type, orientation, animate, gridline, le
 
 
 def get_bubble_graph_menu(tile, x, x_measure, y, y_measure, size, size_measure, gridline, legend, df_name, df_const,
-                          xaxis, yaxis, xpos, ypos, xmodified, ymodified, color, session_key):
+                          xaxis, yaxis, xpos, ypos, xmodified, ymodified, color, session_key, top_n=None):
     """
     :param tile: Index of the tile the bar graph menu corresponds to
     :param x: the x-axis value
@@ -1499,6 +1611,7 @@ def get_bubble_graph_menu(tile, x, x_measure, y, y_measure, size, size_measure,
     :param ymodified: the y of the yaxis title has been modified
     :param color: the color palette of the graph
     :param session_key: df_constants dictionary key
+    :param top_n: number of members graphed before the rest are rolled into "Other", None graphs all
     :return: Menu with options to modify a bubble graph
     """
     # args_value[0] = x-axis
@@ -1508,6 +1621,7 @@ def get_bubble_graph_menu(tile, x, x_measure, y, y_measure, size, size_measure,
     # args_value[4] = size
     # args_value[5] = size measure
     # args_value[6] = color
+    # args_value[7] = top n
 
     return [
         Div(
@@ -1653,6 +1767,7 @@ def get_bubble_graph_menu(tile, x, x_measure, y, y_measure, size, size_measure,
                         style={'font-size': '13px', 'margin-left': '40px'})],
                     style={'display': 'inline-flex', 'max-width': '290px'})
             ]),
+            get_top_n_option(tile, 7, top_n),
             Div(
                 Div(
                     children=get_default_graph_options(xaxis=xaxis, yaxis=yaxis, xpos=xpos, ypos=ypos,
@@ -2031,6 +2146,46 @@ def get_default_graph_options(xaxis, yaxis, xpos, ypos, xmodified, ymodified, ti
         ], style={'display': 'None'})]
 
 
+# top-n bucketing option, rolls every member past the top n into an "Other" series
+def get_top_n_option(tile, index, top_n):
+    return Div([
+        Div([
+            P(
+                "{}:".format(get_label('LBL_Top_N')),
+                className='graph-option-title')],
+            style={'display': 'inline-block', 'position': 'relative', 'top': '-3px', 'margin-right': '98px'}),
+        Div([
+            dcc.Input(
+                id={'type': 'args-value: {}'.replace("{}", str(tile)), 'index': index},
+                type='number',
+                min=1,
+                step=1,
+                value=top_n,
+                debounce=True,
+                style={'width': '60px', 'font-size': '13px', 'text-align': 'center'})],
+            style={'display': 'inline-block'})])
+
+
+# point budget option, line and scatter traces past the budget are downsampled
+def get_point_budget_option(tile, index, point_budget):
+    return Div([
+        Div([
+            P(
+                "{}:".format(get_label('LBL_Point_Budget')),
+                className='graph-option-title')],
+            style={'display': 'inline-block', 'position': 'relative', 'top': '-3px', 'margin-right': '55px'}),
+        Div([
+            dcc.Input(
+                id={'type': 'args-value: {}'.replace("{}", str(tile)), 'index': index},
+                type='number',
+                min=3,
+                step=1,
+                value=point_budget if point_budget else config.GRAPH_POINT_BUDGET,
+                debounce=True,
+                style={'width': '60px', 'font-size': '13px', 'text-align': 'center'})],
+            style={'display': 'inline-block'})])
+
+
 # empty graph menu
 def empty_graph_menu(tile):
     return [
@@ -0,0 +1,350 @@
+######################################################################################################################
+"""
+routes.py
+
+Contains the flask routes serving tile data outside of the dash callbacks.
+"""
+######################################################################################################################
+
+# External Packages
+import os
+import json
+import flask
+from datetime import date, datetime, time
+from tempfile import NamedTemporaryFile
+import dash_core_components as dcc
+from plotly.utils import PlotlyJSONEncoder
+from flask import session, request, Response, send_file
+from werkzeug.utils import secure_filename
+from werkzeug.urls import url_quote
+from pandas import DataFrame
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Internal Modules
+import config
+from apps.dashboard.app import app
+from apps.dashboard.data import data_manipulator, dataset_to_df, generate_constants, get_render_cache_key, \
+    get_render_cache, set_render_cache, get_df_const, get_df_const_token, get_hierarchy_children, get_dataset_version, \
+    get_loaded_version
+from apps.dashboard.graphs import __update_graph
+from apps.dashboard.hierarchy_filter import generate_dropdown
+from apps.dashboard.secondary_hierarchy_filter import get_secondary_children_options
+from apps.dashboard.saving_functions import get_saved_layout
+
+# Contents:
+#   HELPER FUNCTIONS
+#       - get_session_key()
+#       - load_data_set()
+#       - get_layout_arguments()
+#       - get_export_path()
+#       - get_content_disposition()
+#       - get_partial_file()
+#       - remove_partial_file()
+#       - prune_exports()
+#       - stream_csv()
+#       - write_parquet()
+#   EXPORT
+#       - export_tile_data()
+#   GRAPH API
+#       - get_layout_graph()
+#       - get_graph_etag()
+#       - get_graph_last_modified()
+#       - is_not_modified()
+#       - get_graph_response()
+#       - get_saved_graph()
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/octet-stream'}
+
+# ***********************************************HELPER FUNCTIONS****************************************************
+
+
+def get_session_key(df_name, time_period):
+    """Returns the session key the data set is stored under."""
+    if df_name != 'OPG010':
+        return df_name + time_period
+    return df_name
+
+
+def load_data_set(layout):
+    """Loads the data set of a saved layout if needed and returns its session key."""
+    session_key = get_session_key(layout['Data Set'], layout['Time Period'])
+    # check if data is loaded
+    if session_key not in session:
+        session[session_key] = dataset_to_df(layout['Data Set'], layout['Time Period'])
+    return session_key
+
+
+def get_layout_arguments(layout):
+    """Returns the data_manipulator arguments of a saved layout, loading its data set if needed."""
+    df_name = layout['Data Set']
+    session_key = load_data_set(layout)
+    # constants are shared with the dashboard's server-side cache
+    df_const = get_df_const({session_key: {'VERSION': get_loaded_version(session_key)}})
+    if session_key not in df_const:
+        df_const = {session_key: generate_constants(df_name, session_key)}
+        get_df_const_token(df_const)
+
+    hierarchy_path = layout['NID Path'].split('^||^')[1:]
+    if layout['Hierarchy Toggle'] == 'Specific Item' and layout['Graph All Toggle'] == ['graph_children'] and \
+            not get_hierarchy_children(session_key, layout['NID Path']):
+        # If at a leaf node then use its parents data
+        hierarchy_path.pop()
+
+    secondary_level, secondary_nid_path, secondary_toggle, secondary_graph_all, secondary_options = \
+        layout['Graph Variable']
+    secondary_path = secondary_nid_path.split('^||^')[1:]
+    # graphing all children reads them from the server, the saved dropdown options only hold the first or searched ones
+    if secondary_toggle == 'Specific Item' and secondary_graph_all == ['graph_children']:
+        secondary_options = get_secondary_children_options(session_key, secondary_nid_path)
+    if secondary_toggle == 'Specific Item' and secondary_graph_all == ['graph_children'] and not secondary_options:
+        secondary_path.pop()
+
+    # dates outside of 'select-range' are placeholders, the same as the data menu's
+    return {'hierarchy_path': hierarchy_path,
+            'hierarchy_toggle': layout['Hierarchy Toggle'],
+            'hierarchy_level_dropdown': layout['Level Value'],
+            'hierarchy_graph_children': layout['Graph All Toggle'],
+            'df_name': df_name,
+            'df_const': df_const,
+            'secondary_type': layout.get('Date Tab'),
+            'end_secondary': layout.get('End Secondary', 1),
+            'end_year': layout.get('End Year', 1),
+            'start_secondary': layout.get('Start Secondary', 1),
+            'start_year': layout.get('Start Year', 1),
+            'timeframe': layout['Timeframe'],
+            'fiscal_toggle': layout['Fiscal Toggle'],
+            'num_periods': layout['Num Periods'],
+            'period_type': layout['Period Type'],
+            'arg_values': layout['Args List'],
+            'graph_type': layout['Graph Type'],
+            'secondary_state_of_display': secondary_path,
+            'secondary_hierarchy_toggle': secondary_toggle,
+            'secondary_level_dropdown': secondary_level,
+            'secondary_graph_children': secondary_graph_all,
+            'secondary_options': secondary_options,
+            'session_key': session_key}
+
+
+def get_export_path(layout, export_format):
+    """Returns the cache path of a layout's export, keyed on the user, the layout and the data set version."""
+    session_key = get_session_key(layout['Data Set'], layout['Time Period'])
+    export_key = get_render_cache_key(session['sessionID'], session['language'], layout,
+                                      session.get('dataset_versions', {}).get(session_key))
+    return os.path.join(config.EXPORT_DIRECTORY, '{}.{}'.format(export_key, export_format))
+
+
+def get_content_disposition(title, export_format):
+    """Returns the attachment header of a download, an ascii file name with the RFC 5987 utf-8 name of the title."""
+    return "attachment; filename=\"{}.{}\"; filename*=UTF-8''{}".format(
+        secure_filename(title) or 'export', export_format, url_quote('{}.{}'.format(title, export_format), safe=''))
+
+
+def get_partial_file(**kwargs):
+    """Returns a new uniquely named partial export file, so concurrent downloads of an export don't share one."""
+    return NamedTemporaryFile(dir=config.EXPORT_DIRECTORY, suffix='.part', delete=False, **kwargs)
+
+
+def remove_partial_file(partial_path):
+    """Deletes a partial export file left behind by an aborted or failed export."""
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+
+def prune_exports():
+    """Deletes the oldest cached exports past the configured cache size."""
+    # partial files belong to downloads in progress
+    exports = sorted((os.path.join(config.EXPORT_DIRECTORY, f) for f in os.listdir(config.EXPORT_DIRECTORY)
+                      if not f.endswith('.part')), key=os.path.getmtime)
+    for export in exports[:-config.EXPORT_CACHE_SIZE]:
+        try:
+            os.remove(export)
+        except OSError:
+            pass
+
+
+def stream_csv(dff, export_path):
+    """Yields the data frame as csv chunks while writing them to the export cache."""
+    export_file = get_partial_file(mode='w', encoding='utf-8', newline='')
+    # the generator is closed early if the download is aborted, the partial file is then removed
+    try:
+        with export_file:
+            # an empty data frame still yields the header
+            for start in range(0, max(len(dff), 1), config.EXPORT_CHUNK_ROWS):
+                chunk = dff.iloc[start: start + config.EXPORT_CHUNK_ROWS].to_csv(index=False, header=start == 0)
+                export_file.write(chunk)
+                yield chunk
+        os.replace(export_file.name, export_path)
+    finally:
+        remove_partial_file(export_file.name)
+    prune_exports()
+
+
+def write_parquet(dff, export_path):
+    """Writes the data frame to the export cache as parquet, one row group per chunk."""
+    with get_partial_file() as export_file:
+        partial_path = export_file.name
+    schema = pyarrow.Schema.from_pandas(dff, preserve_index=False)
+    try:
+        with pyarrow.parquet.ParquetWriter(partial_path, schema) as writer:
+            for start in range(0, len(dff), config.EXPORT_CHUNK_ROWS):
+                writer.write_table(pyarrow.Table.from_pandas(dff.iloc[start: start + config.EXPORT_CHUNK_ROWS],
+                                                             schema=schema, preserve_index=False))
+        os.replace(partial_path, export_path)
+    finally:
+        remove_partial_file(partial_path)
+    prune_exports()
+
+# ***************************************************EXPORT***********************************************************
+
+
+# requests are authenticated by the session validation in server.before_request_func
+@app.server.route(app.config.routes_pathname_prefix + 'export/<layout_pointer>', methods=['GET', 'POST'])
+def export_tile_data(layout_pointer):
+    """
+    Streams the data of a saved layout as csv, or parquet if pyarrow is installed. Tiles which are not saved can POST
+    the fields of a saved layout, the layout pointer then only names the download.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_MIMETYPES or export_format == 'parquet' and pyarrow is None:
+        flask.abort(400)
+
+    if request.method == 'POST':
+        layout = request.get_json(silent=True)
+    else:
+        layout = get_saved_layout(layout_pointer)
+    if not layout:
+        flask.abort(404)
+
+    export_path = get_export_path(layout, export_format)
+    content_disposition = get_content_disposition(layout.get('Title') or layout_pointer, export_format)
+
+    # repeat downloads are served from the export cache
+    if not os.path.exists(export_path):
+        arguments = get_layout_arguments(layout)
+        # If "Last ___ ____" is saved without a valid num_periods, export an empty data set
+        if arguments['timeframe'] == 'to-current' and not arguments['num_periods']:
+            dff = DataFrame(columns=arguments['df_const'][arguments['session_key']]['COLUMN_NAMES'])
+        else:
+            dff = data_manipulator(**arguments)
+        if export_format == 'csv':
+            return Response(stream_csv(dff, export_path), mimetype=EXPORT_MIMETYPES[export_format],
+                            headers={'Content-Disposition': content_disposition})
+        write_parquet(dff, export_path)
+
+    response = send_file(export_path, mimetype=EXPORT_MIMETYPES[export_format])
+    response.headers['Content-Disposition'] = content_disposition
+    return response
+
+# *************************************************GRAPH API**********************************************************
+
+
+def get_layout_graph(layout, arguments):
+    """Rebuilds a saved layout's graph through __update_graph, outside of a dash callback."""
+    graph_options = layout['Graph Options']
+    hierarchy_options = generate_dropdown(0, layout['Data Set'], layout['NID Path'], arguments['session_key']).options
+    # __update_graph reads the hierarchy trails from the display buttons' children
+    state_of_display = [{'props': {'children': name}} for name in layout['NID Path'].split('^||^')[1:]]
+    secondary_state_of_display = [{'props': {'children': name}}
+                                  for name in layout['Graph Variable'][1].split('^||^')[1:]]
+
+    return __update_graph(arguments['df_name'], arguments['arg_values'], arguments['graph_type'], layout['Title'],
+                          arguments['num_periods'], arguments['period_type'], arguments['hierarchy_toggle'],
+                          arguments['hierarchy_level_dropdown'], arguments['hierarchy_graph_children'],
+                          hierarchy_options, state_of_display, arguments['secondary_type'], arguments['timeframe'],
+                          arguments['fiscal_toggle'], arguments['start_year'], arguments['end_year'],
+                          arguments['start_secondary'], arguments['end_secondary'], arguments['df_const'],
+                          graph_options[0], graph_options[1], graph_options[2], graph_options[3], graph_options[6],
+                          graph_options[7], arguments['secondary_level_dropdown'], secondary_state_of_display,
+                          arguments['secondary_hierarchy_toggle'], arguments['secondary_graph_children'],
+                          arguments['secondary_options'], arguments['session_key'], layout['Hierarchy Type'])
+
+
+def get_graph_etag(layout, content, dataset_version):
+    """
+    Returns the ETag of a saved layout's graph api response for a version of its data set. Figures change daily too,
+    their subtitle holds the date the data was accessed on.
+    """
+    return get_render_cache_key(session['language'], layout, content, dataset_version and dataset_version[0],
+                                date.today() if content == 'figure' else None)
+
+
+def get_graph_last_modified(content, dataset_version):
+    """
+    Returns the utc Last-Modified of a saved layout's graph api response for a version of its data set. Figures are
+    modified at the start of each local day too, as their subtitle holds the date the data was accessed on.
+    """
+    if content != 'figure':
+        return dataset_version[1]
+    now = datetime.now()
+    day_start = datetime.utcnow() - (now - datetime.combine(now.date(), time()))
+    return max(dataset_version[1], day_start.replace(microsecond=0))
+
+
+def is_not_modified(layout, content, dataset_version):
+    """Returns whether the graph api request's conditional headers match the version of the layout's data set."""
+    if request.if_none_match:
+        return request.if_none_match.contains(get_graph_etag(layout, content, dataset_version))
+    return request.if_modified_since is not None and \
+        request.if_modified_since.replace(tzinfo=None) >= get_graph_last_modified(content, dataset_version)
+
+
+def get_graph_response(response, layout, content, dataset_version):
+    """Sets the ETag and Last-Modified of a graph api response from the version of the layout's data set."""
+    response.set_etag(get_graph_etag(layout, content, dataset_version))
+    if dataset_version is not None:
+        response.last_modified = get_graph_last_modified(content, dataset_version)
+    return response
+
+
+# requests are authenticated by the session validation in server.before_request_func
+@app.server.route(app.config.routes_pathname_prefix + 'api/graph/<layout_pointer>')
+def get_saved_graph(layout_pointer):
+    """
+    Returns a saved layout's figure as json, or its aggregated data with ?content=data. Responses carry an ETag and
+    Last-Modified of the data set version, so polling an unchanged graph is answered with 304 Not Modified.
+    """
+    content = request.args.get('content', 'figure').lower()
+    if content not in ('figure', 'data'):
+        flask.abort(400)
+
+    layout = get_saved_layout(layout_pointer)
+    if not layout:
+        flask.abort(404)
+
+    # conditional requests are answered from the data set version known before loading anything, so polling an
+    # unchanged graph never pulls its data set from the database
+    session_key = get_session_key(layout['Data Set'], layout['Time Period'])
+    dataset_version = get_dataset_version(session_key)
+    if dataset_version is not None and is_not_modified(layout, content, dataset_version):
+        return get_graph_response(Response(status=304), layout, content, dataset_version)
+
+    load_data_set(layout)
+    dataset_version = get_dataset_version(session_key)
+    etag = get_graph_etag(layout, content, dataset_version)
+    if dataset_version is not None and is_not_modified(layout, content, dataset_version):
+        response = Response(status=304)
+    else:
+        # unchanged graphs polled without conditional headers are served from the render cache
+        body = get_render_cache('api', etag)
+        if body is None:
+            arguments = get_layout_arguments(layout)
+            if content == 'data':
+                # If "Last ___ ____" is saved without a valid num_periods, return an empty data set
+                if arguments['timeframe'] == 'to-current' and not arguments['num_periods']:
+                    dff = DataFrame(columns=arguments['df_const'][session_key]['COLUMN_NAMES'])
+                else:
+                    dff = data_manipulator(**arguments)
+                body = dff.to_json(orient='records', date_format='iso')
+            else:
+                graph = get_layout_graph(layout, arguments)
+                # graphs return their figure, tables their component tree
+                body = json.dumps(graph.figure if isinstance(graph, dcc.Graph) else graph, cls=PlotlyJSONEncoder)
+            set_render_cache('api', etag, body)
+        response = Response(body, mimetype='application/json')
+
+    return get_graph_response(response, layout, content, dataset_version)
@@ -12,7 +12,7 @@ from flask import session
 from dash.exceptions import PreventUpdate
 
 # Internal Modules
-from conn import exec_storedproc
+from conn import exec_storedproc, exec_storedproc_results
 from apps.dashboard.layouts import get_line_scatter_graph_menu, get_bar_graph_menu, get_table_graph_menu, \
     get_box_plot_menu, get_sankey_menu, get_bubble_graph_menu
 
@@ -27,6 +27,7 @@ def save_layout_state(name, attributes):
     """
     if attributes:
         session['saved_layouts'][name] = attributes
+        session['saved_layout_titles'][name] = attributes['Title']
 
 
 def save_dashboard_state(name, attributes):
@@ -76,7 +77,8 @@ def delete_layout(graph_id):
 
     exec_storedproc(query)
 
-    del session['saved_layouts'][graph_id]
+    del session['saved_layout_titles'][graph_id]
+    session['saved_layouts'].pop(graph_id, None)
 
 
 def delete_dashboard(dashboard_id):
@@ -92,6 +94,32 @@ def delete_dashboard(dashboard_id):
 
     del session['saved_dashboards'][dashboard_id]
 
+# *********************************************LOADING FUNCTIONS********************************************************
+
+
+def get_saved_layout(graph_id):
+    """
+    Returns a saved graph layout, fetched from the database on first use since only the titles are loaded at login.
+    :param graph_id: the pointer of the layout
+    :return: the layout's meta data, or None if the user has no such layout
+    """
+    if graph_id not in session['saved_layout_titles']:
+        return None
+
+    if graph_id not in session['saved_layouts']:
+        query = """\
+        declare @p_result_status varchar(255)
+        exec dbo.opp_addgeteditdeletefind_extdashboardreports {}, 'Get', \'{}\', null, null, null, null, null,
+        @p_result_status output
+        select @p_result_status as result_status
+        """.format(session['sessionID'], graph_id)
+
+        results = exec_storedproc_results(query)
+
+        session['saved_layouts'][graph_id] = json.loads(results["clob_text"].iloc[0])
+
+    return session['saved_layouts'][graph_id]
+
 
 def load_graph_menu(graph_type, tile, df_name, args_list, graph_options, graph_variable, df_const, session_key):
     """Retuns the graph menu dependent on the graph type."""
@@ -106,7 +134,9 @@ def load_graph_menu(graph_type, tile, df_name, args_list, graph_options, graph_v
                                                  secondary_level_value=graph_variable[0],
                                                  secondary_nid_path=graph_variable[1],
                                                  secondary_hierarchy_toggle=graph_variable[2],
-                                                 secondary_graph_all_toggle=graph_variable[3], session_key=session_key)
+                                                 secondary_graph_all_toggle=graph_variable[3], session_key=session_key,
+                                                 top_n=args_list[7] if len(args_list) > 7 else None,
+                                                 point_budget=args_list[8] if len(args_list) > 8 else None)
     elif graph_type == 'Bar':
         graph_menu = get_bar_graph_menu(tile=tile, x=args_list[0], measure_type=args_list[1],
                                         orientation=args_list[2], animate=args_list[3], color=args_list[4],
@@ -116,7 +146,8 @@ def load_graph_menu(graph_type, tile, df_name, args_list, graph_options, graph_v
                                         df_const=df_const, secondary_level_value=graph_variable[0],
                                         secondary_nid_path=graph_variable[1],
                                         secondary_hierarchy_toggle=graph_variable[2],
-                                        secondary_graph_all_toggle=graph_variable[3], session_key=session_key)
+                                        secondary_graph_all_toggle=graph_variable[3], session_key=session_key,
+                                        top_n=args_list[5] if len(args_list) > 5 else None)
     elif graph_type == 'Table':
         graph_menu = get_table_graph_menu(tile=tile, number_of_columns=args_list[1], xaxis=graph_options[0],
                                           yaxis=graph_options[1], xpos=graph_options[2], ypos=graph_options[3],
@@ -147,7 +178,8 @@ def load_graph_menu(graph_type, tile, df_name, args_list, graph_options, graph_v
                                            gridline=graph_options[6], legend=graph_options[7], xaxis=graph_options[0],
                                            yaxis=graph_options[1],  df_name=df_name, df_const=df_const,
                                            xpos=graph_options[2], ypos=graph_options[3], xmodified=graph_options[4],
-                                           ymodified=graph_options[5], session_key=session_key)
+                                           ymodified=graph_options[5], session_key=session_key,
+                                           top_n=args_list[7] if len(args_list) > 7 else None)
     else:
         raise PreventUpdate
 
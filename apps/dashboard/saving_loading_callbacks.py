@@ -17,11 +17,12 @@ import dash_html_components as html
 from flask import session
 
 # Internal Modules
-from apps.dashboard.layouts import get_data_menu, get_customize_content, get_div_body
+from apps.dashboard.layouts import get_data_menu, get_customize_content, get_div_body, get_saved_layout_options
 from apps.dashboard.app import app
-from apps.dashboard.data import get_label, dataset_to_df, generate_constants
+from apps.dashboard.data import get_label, dataset_to_df, generate_constants, get_df_const, get_df_const_token, \
+    load_data_sets
 from apps.dashboard.saving_functions import delete_layout, save_layout_state, save_layout_to_db, \
-    save_dashboard_state, save_dashboard_to_db, delete_dashboard, load_graph_menu
+    save_dashboard_state, save_dashboard_to_db, delete_dashboard, load_graph_menu, get_saved_layout
 
 # **********************************************GLOBAL VARIABLES*****************************************************
 
@@ -54,23 +55,30 @@ app.clientside_callback(
 # ***********************************************SHARED SAVING*******************************************************
 
 
-# Update the dropdown options of available tile layouts.
+# Update the dropdown options of available tile layouts, on saves/deletes or as the user searches a dropdown.
 @app.callback(
     Output({'type': 'select-layout-dropdown', 'index': ALL}, 'options'),
     [Input({'type': 'set-dropdown-options-trigger', 'index': ALL}, 'data-tile_saving'),
-     Input({'type': 'set-dropdown-options-trigger', 'index': 0}, 'data-dashboard_saving')],
-    [State({'type': 'tile-link', 'index': ALL}, 'className')],
+     Input({'type': 'set-dropdown-options-trigger', 'index': 0}, 'data-dashboard_saving'),
+     Input({'type': 'select-layout-dropdown', 'index': ALL}, 'search_value')],
+    [State({'type': 'select-layout-dropdown', 'index': ALL}, 'value'),
+     State({'type': 'select-layout-dropdown', 'index': ALL}, 'id')],
     prevent_initial_call=True
 )
-def _update_tile_loading_dropdown_options(_tile_saving_trigger, _dashboard_saving_trigger, links):
+def _update_tile_loading_dropdown_options(_tile_saving_trigger, _dashboard_saving_trigger, search_values, values,
+                                          dropdown_ids):
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
 
     if changed_id == '.':
         raise PreventUpdate
 
-    # graph titles was previously session['saved_layouts']
-    return [[{'label': session['saved_layouts'][key]['Title'], 'value': key} for key in
-             session['saved_layouts']]] * len(links)
+    # the searched dropdown gets the page of titles matching its search, the others are left as they are
+    if 'select-layout-dropdown' in changed_id:
+        changed_index = int(search(r'\d+', changed_id).group())
+        return [get_saved_layout_options(search_value, value) if dropdown_id['index'] == changed_index
+                else no_update for search_value, value, dropdown_id in zip(search_values, values, dropdown_ids)]
+
+    return [get_saved_layout_options(value=value) for value in values]
 
 
 # *************************************************TILE SAVING********************************************************
@@ -245,6 +253,7 @@ for y in range(4):
                            fiscal_toggle, input_method, secondary_start, secondary_end, x_time_period, period_type, tab,
                            time_period, secondary_button_path, secondary_toggle, secondary_level, secondary_graph_all,
                            secondary_options, selected_layout, df_const):
+        df_const = get_df_const(df_const)
 
         if link_state == 'fa fa-link':
             fiscal_toggle = parent_fiscal_toggle
@@ -303,10 +312,7 @@ for y in range(4):
         # if save requested or the over-write was confirmed, check for exceptions and save
         if trigger == 'save' or trigger == 'confirm-overwrite':
             intermediate_pointer = REPORT_POINTER_PREFIX + graph_title.replace(" ", "")
-            graph_titles = []
-
-            for layout in session['saved_layouts']:
-                graph_titles.append(session['saved_layouts'][layout]['Title'])
+            graph_titles = list(session['saved_layout_titles'].values())
 
             # if user is trying to save an empty graph, warn them that they must have a graph to save
             if not graph_display:
@@ -319,8 +325,7 @@ for y in range(4):
                                            data=[['empty_title', tile], {}, get_label('LBL_Untitled_Graph'),
                                                  get_label('LBL_Untitled_Graph_Prompt'), False])
             # if conflicting tiles and overwrite not requested, prompt overwrite
-            elif intermediate_pointer in session['saved_layouts'] \
-                    and session['saved_layouts'][intermediate_pointer]['Title'] == graph_title \
+            elif session['saved_layout_titles'].get(intermediate_pointer) == graph_title \
                     and 'confirm-overwrite' != trigger:
                 prompt_trigger = dcc.Store(id={'type': 'prompt-trigger', 'index': tile},
                                            data=[['overwrite', tile], {}, get_label('LBL_Overwrite_Graph'),
@@ -328,7 +333,7 @@ for y in range(4):
             # else, title is valid to be saved
             else:
                 while True:
-                    if intermediate_pointer in session['saved_layouts'] and trigger != "confirm-overwrite":
+                    if intermediate_pointer in session['saved_layout_titles'] and trigger != "confirm-overwrite":
                         layout_pointer = intermediate_pointer + "_"
                         intermediate_pointer = layout_pointer
                     else:
@@ -395,13 +400,10 @@ for y in range(4):
         # if delete button was pressed, prompt delete
         elif trigger == 'delete':
             intermediate_pointer = REPORT_POINTER_PREFIX + graph_title.replace(" ", "")
-            graph_titles = []
-            for layout in session['saved_layouts']:
-                graph_titles.append(session['saved_layouts'][layout]['Title'])
+            graph_titles = list(session['saved_layout_titles'].values())
 
             # if tile exists in session, send delete prompt
-            if intermediate_pointer in session['saved_layouts'] \
-                    and session['saved_layouts'][intermediate_pointer]['Title'] == graph_title:
+            if session['saved_layout_titles'].get(intermediate_pointer) == graph_title:
                 prompt_trigger = dcc.Store(id={'type': 'prompt-trigger', 'index': tile},
                                            data=[['delete', tile], {}, get_label('LBL_Delete_Graph'),
                                                  get_label('LBL_Delete_Graph_Prompt').format(graph_title), False])
@@ -414,8 +416,10 @@ for y in range(4):
             popup_is_open = True
         # if confirm-load then we load what was selected from menu
         elif trigger == 'confirm-load':
-            df_name = session['saved_layouts'][selected_layout]['Data Set']
-            time_period = session['saved_layouts'][selected_layout]['Time Period']
+            # the layout is fetched from the database the first time it is loaded
+            saved_layout = get_saved_layout(selected_layout)
+            df_name = saved_layout['Data Set']
+            time_period = saved_layout['Time Period']
             if df_name != 'OPG010':
                 session_key = df_name + time_period
             else:
@@ -428,11 +432,11 @@ for y in range(4):
                 df_const[session_key] = generate_constants(df_name, session_key)
 
             #  --------- create customize menu ---------
-            graph_type = session['saved_layouts'][selected_layout]['Graph Type']
-            time_period = session['saved_layouts'][selected_layout]['Time Period']
-            args_list = session['saved_layouts'][selected_layout]['Args List']
-            graph_options = session['saved_layouts'][selected_layout]['Graph Options']
-            graph_variable = session['saved_layouts'][selected_layout]['Graph Variable']
+            graph_type = saved_layout['Graph Type']
+            time_period = saved_layout['Time Period']
+            args_list = saved_layout['Args List']
+            graph_options = saved_layout['Graph Options']
+            graph_variable = saved_layout['Graph Variable']
             graph_menu = load_graph_menu(graph_type=graph_type, tile=tile, df_name=df_name, args_list=args_list,
                                          graph_options=graph_options, graph_variable=graph_variable, df_const=df_const,
                                          session_key=session_key)
@@ -441,23 +445,23 @@ for y in range(4):
 
             #  --------- create data side menu ---------
             # set hierarchy type
-            hierarchy_type = session['saved_layouts'][selected_layout]['Hierarchy Type']
+            hierarchy_type = saved_layout['Hierarchy Type']
             # set hierarchy toggle value (level vs specific)
-            hierarchy_toggle = session['saved_layouts'][selected_layout]['Hierarchy Toggle']
+            hierarchy_toggle = saved_layout['Hierarchy Toggle']
             # set level value selection
-            level_value = session['saved_layouts'][selected_layout]['Level Value']
+            level_value = saved_layout['Level Value']
             # retrieve nid string
-            nid_path = session['saved_layouts'][selected_layout]['NID Path']
+            nid_path = saved_layout['NID Path']
             # set the value of "Graph All" checkbox
-            graph_all_toggle = session['saved_layouts'][selected_layout]['Graph All Toggle']
+            graph_all_toggle = saved_layout['Graph All Toggle']
             # set gregorian/fiscal toggle value
-            fiscal_toggle = session['saved_layouts'][selected_layout]['Fiscal Toggle']
+            fiscal_toggle = saved_layout['Fiscal Toggle']
             # set timeframe radio buttons selection
-            input_method = session['saved_layouts'][selected_layout]['Timeframe']
+            input_method = saved_layout['Timeframe']
             # set num periods
-            num_periods = session['saved_layouts'][selected_layout]['Num Periods']
+            num_periods = saved_layout['Num Periods']
             # set period type
-            period_type = session['saved_layouts'][selected_layout]['Period Type']
+            period_type = saved_layout['Period Type']
 
             data_content = get_data_menu(tile=tile, df_name=df_name, mode='tile-loading',
                                          hierarchy_toggle=hierarchy_toggle, level_value=level_value,
@@ -468,19 +472,19 @@ for y in range(4):
                                          hier_type=hierarchy_type)
 
             # show and set 'Select Range' inputs if selected, else leave hidden and unset
-            if session['saved_layouts'][selected_layout]['Timeframe'] == 'select-range':
-                tab_output = session['saved_layouts'][selected_layout]['Date Tab']
-                start_year = session['saved_layouts'][selected_layout]['Start Year']
-                end_year = session['saved_layouts'][selected_layout]['End Year']
-                start_secondary = session['saved_layouts'][selected_layout]['Start Secondary']
-                end_secondary = session['saved_layouts'][selected_layout]['End Secondary']
+            if saved_layout['Timeframe'] == 'select-range':
+                tab_output = saved_layout['Date Tab']
+                start_year = saved_layout['Start Year']
+                end_year = saved_layout['End Year']
+                start_secondary = saved_layout['Start Secondary']
+                end_secondary = saved_layout['End Secondary']
             else:
                 tab_output = start_year = end_year = start_secondary = end_secondary = no_update
 
             df_const_output = dcc.Store(
                 id='df-constants-storage',
                 storage_type='memory',
-                data=df_const)
+                data=get_df_const_token(df_const))
             for x in range(tile):
                 df_const_output = html.Div(
                     df_const_output,
@@ -492,7 +496,7 @@ for y in range(4):
                 className='fa fa-unlink',
                 id={'type': 'tile-link', 'index': tile},
                 style={'position': 'relative'})
-            tile_title_trigger = session['saved_layouts'][selected_layout]['Title']
+            tile_title_trigger = saved_layout['Title']
         # if we have linking inputs
         elif trigger == 'fa fa-unlink':
             link_output = 'fa fa-unlink'
@@ -742,6 +746,7 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
                                       date_tab_0, date_tab_1, date_tab_2, date_tab_3, date_tab_4,
                                       secondary_button_path, secondary_toggle, secondary_level, secondary_graph_all,
                                       secondary_options, layout, df_const):
+    df_const = get_df_const(df_const)
     # ---------------------------------------Variable Declarations------------------------------------------------------
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
     # loading Outputs
@@ -814,6 +819,15 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
         tile_keys = [{}] * 4
         num_tiles = 0
 
+        # pull the dashboard's data sets together before rebuilding its tiles
+        data_sets = []
+        for dict_key, dict_value in session['saved_dashboards'][selected_dashboard].items():
+            if 'Tile' in dict_key:
+                tile_data = get_saved_layout(dict_value['Tile Pointer'])
+                if tile_data is not None:
+                    data_sets.append((tile_data['Data Set'], tile_data['Time Period']))
+        df_const = load_data_sets(data_sets, df_const)
+
         for dict_key, dict_value in session['saved_dashboards'][selected_dashboard].items():
 
             if 'Tile' in dict_key:
@@ -826,8 +840,9 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
                 tile_pointer = dict_value['Tile Pointer']
                 link_state = dict_value['Link']
 
-                if tile_pointer in session['saved_layouts']:
-                    tile_data = session['saved_layouts'][tile_pointer].copy()
+                tile_data = get_saved_layout(tile_pointer)
+                if tile_data is not None:
+                    tile_data = tile_data.copy()
                     tile_title = tile_data.pop("Title")
                 # TODO: In 'prod' we will check for pointers and only do a 'virtual' delete for
                 #  the single user
@@ -930,7 +945,7 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
                         dcc.Store(
                             id='df-constants-storage',
                             storage_type='memory',
-                            data=df_const),
+                            data=get_df_const_token(df_const)),
                         id={'type': 'df-constants-storage-tile-wrapper', 'index': 0}),
                     id={'type': 'df-constants-storage-tile-wrapper', 'index': 1}),
                 id={'type': 'df-constants-storage-tile-wrapper', 'index': 2}),
@@ -951,10 +966,7 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
                 if tile_title == '':
                     auto_named_titles[idx] = tile_titles[idx] = dashboard_title + '-' + str(idx + 1)
 
-            used_titles = []
-
-            for tile_layout in session['saved_layouts']:
-                used_titles.append(session['saved_layouts'][tile_layout]["Title"])
+            used_titles = list(session['saved_layout_titles'].values())
 
             # check if the dashboard title is blank
             if dashboard_title == '':
@@ -1069,10 +1081,7 @@ def _manage_dashboard_saves_and_reset(_save_clicks, _delete_clicks, _load_clicks
                 for i in range(len(links)):
                     tile_pointer = REPORT_POINTER_PREFIX + tile_titles[i].replace(" ", "")
                     # regex.sub('[^A-Za-z0-9]+', '', tile_titles[i])
-                    used_titles = []
-
-                    for key in session['saved_layouts']:
-                        used_titles.append(session['saved_layouts'][key]["Title"])
+                    used_titles = list(session['saved_layout_titles'].values())
 
                     if type(secondary_button_path[i]) == dict:
                         secondary_button_path[i] = [secondary_button_path[i]]
@@ -11,46 +11,49 @@ import dash_core_components as dcc
 import dash_html_components as html
 
 # Internal Modules
-from apps.dashboard.data import get_label, session
+import config
+from apps.dashboard.data import get_label, search_hierarchy_children, get_hierarchy_children
 
 # ***********************************************HELPER FUNCTIONS****************************************************
 
 
+def get_secondary_options(df_name, nid_path, df_const, session_key, search_value=None):
+    """Returns the document type hierarchy options starting with the searched prefix, the first ones if no search."""
+    hierarchy_level = df_const[session_key]['SECONDARY_HIERARCHY_LEVELS']
+    llen = len(nid_path.split("^||^")) - 1
+    # the node's children are searched in the data set's variable hierarchy tree, only the top matches are sent
+    option_list = search_hierarchy_children(session_key, nid_path, search_value, config.DROPDOWN_OPTION_LIMIT,
+                                            secondary=True)
+
+    # check if the hierarchy level has none variables and assigns to a option list
+    if df_name == "OPG010":
+        options = [{'label': i, 'value': i} for i in option_list if
+                   len(df_const[session_key][hierarchy_level[llen]]) >= 1 and df_const[session_key][hierarchy_level
+                   [llen]][0] is not None]
+    else:
+        options = [{'label': i, 'value': i}
+                   for i in option_list if
+                   len(df_const[session_key][hierarchy_level[llen]]) >= 1 and df_const[session_key]
+                   [hierarchy_level[llen]] is not None]
+
+    return options
+
+
+def get_secondary_children_options(session_key, nid_path):
+    """
+    Returns the options of every child of a document type hierarchy node, read from the data set's variable hierarchy
+    tree. Graphing all children uses these, the dropdown only holds the first or searched children.
+    """
+    return [{'label': i, 'value': i} for i in get_hierarchy_children(session_key, nid_path, secondary=True)]
+
+
 def generate_secondary_dropdown(tile, df_name, nid_path, df_const, session_key):
     """Helper function to generate and return document type hierarchy drop-down."""
     if df_name:
-        # using a subset of our dataframe, turn it into a multiindex df, and access unique values for option
-        hierarchy_level = df_const[session_key]['SECONDARY_HIERARCHY_LEVELS']
-        df = session[session_key][['Variable Name', 'Variable Name Qualifier', 'Variable Name Sub Qualifier']]
-        hierarchy_nid_list = list(nid_path.split("^||^"))[1:]
-        llen = len(hierarchy_nid_list)
-        if llen == 3:
-            option_list = []
-        elif llen != 0:
-            for i in range(llen):
-                level = hierarchy_nid_list[i]
-                df = df.filter(df[hierarchy_level[i]] == level)
-                df = df.drop(hierarchy_level[i])
-            option_list = df[hierarchy_level[llen]].unique(dropmissing=True, dropnan=True)
-        else:
-            option_list = df['Variable Name'].unique()
-
-        # check if the hierarchy level has none variables and assigns to a option list
-        if df_name == "OPG010":
-            options = [{'label': i, 'value': i} for i in option_list if
-                       len(df_const[session_key][hierarchy_level[llen]]) >= 1 and df_const[session_key][hierarchy_level
-                       [llen]][0] is not None]
-        else:
-            options = [{'label': i, 'value': i}
-                       for i in option_list if
-                       len(df_const[session_key][hierarchy_level[llen]]) >= 1 and df_const[session_key]
-                       [hierarchy_level[llen]] is not None]
-
-        options = sorted(options, key=lambda k: k['label'])
-
+        # options past the first ones are fetched as the user types, see _search_secondary_dropdown
         return dcc.Dropdown(
             id={'type': 'secondary_hierarchy_specific_dropdown', 'index': tile},
-            options=options,
+            options=get_secondary_options(df_name, nid_path, df_const, session_key),
             optionHeight=30,
             clearable=False,
             multi=False,
@@ -10,6 +10,7 @@ Stores all callbacks for the user interface.
 import copy
 from re import search
 from urllib.parse import parse_qsl
+from uuid import uuid4
 # import dash_core_components as dcc
 import dash
 import dash_html_components as html
@@ -22,10 +23,11 @@ from flask import url_for
 # Internal Modules
 from apps.dashboard.app import app
 from apps.dashboard.data import DATA_CONTENT_HIDE, DATA_CONTENT_SHOW, get_label, X_AXIS_OPTIONS, \
-    session, BAR_X_AXIS_OPTIONS, generate_constants, dataset_to_df, GRAPH_OPTIONS, CUSTOMIZE_CONTENT_HIDE, LAYOUTS
+    session, BAR_X_AXIS_OPTIONS, generate_constants, dataset_to_df, GRAPH_OPTIONS, CUSTOMIZE_CONTENT_HIDE, LAYOUTS, \
+    get_df_const, get_df_const_token
 from apps.dashboard.layouts import get_line_scatter_graph_menu, get_bar_graph_menu, get_table_graph_menu, \
     get_tile_layout, change_index, get_box_plot_menu, get_default_tab_content, get_layout_dashboard, get_layout_graph, \
-    get_data_menu, get_sankey_menu, get_dashboard_title_input, get_bubble_graph_menu
+    get_data_menu, get_sankey_menu, get_dashboard_title_input, get_bubble_graph_menu, get_default_data_menu
 
 
 # *************************************************MAIN LAYOUT********************************************************
@@ -103,6 +105,7 @@ def _new_and_delete(_new_clicks, close_id, _dashboard_reset, tile_titles, tile_l
     :return: Layout of tiles for the main body, a NEW button whose n_clicks data encodes the number of tiles to
     display, and updates the tile-closed-trigger div with the index of the deleted tile
     """
+    df_const = get_df_const(df_const)
     # -------------------------------------------Variable Declarations--------------------------------------------------
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
     changed_value = [p['value'] for p in dash.callback_context.triggered][0]
@@ -181,6 +184,16 @@ app.clientside_callback(
 
 # *************************************************TAB LAYOUT********************************************************
 
+
+def unpark_tab_content(handle):
+    """Returns and releases the tab content parked under the handle, the default tab content if none is parked."""
+    # the tab-storage only holds each tab's handle, title and number of tiles, so a tab change exchanges the content
+    # of the tab being left and the one being opened rather than every tab's
+    content = session.pop('tab_content_' + handle, None)
+    if content is None:
+        content = get_default_tab_content()
+    return content
+
 # Manage tab saves.
 @app.callback(
     [Output('tab-storage', 'data'),
@@ -224,7 +237,8 @@ def _change_tab(_tab_clicks, _tab_close_clicks, _tab_add_nclicks,
                     id={'type': 'dashboard-tab-close', 'index': len(tab_toggle_children)},
                     className='dashboard-tab-close')],
                 className='dashboard-tab')]
-        data.append({'content': get_default_tab_content(), 'title': ''})
+        # new tabs have no parked content, they are opened with the default tab content
+        data.append({'handle': uuid4().hex, 'title': '', 'num-tiles': 1})
         return data, active_tab, tab_toggle_children, no_update, no_update, no_update, no_update
 
     for tile in range(4):
@@ -247,13 +261,14 @@ def _change_tab(_tab_clicks, _tab_close_clicks, _tab_add_nclicks,
             new_tab = active_tab - 1
 
         for i in range(4):
-            if i < data[new_tab]['content'][0]['props']['data-num-tiles']:
+            if i < data[new_tab]['num-tiles']:
                 children[i] = Store(id={'type': 'tab-swap-flag', 'index': i}, data=True)
             else:
                 children[i] = Store(id={'type': 'tab-swap-flag', 'index': i}, data=False)
         # remove the tab and its x from the children
         del tab_toggle_children[deleted_tab_index]
-        # remove the tab data from the storage
+        # remove the tab data from the storage and its parked content
+        session.pop('tab_content_' + data[deleted_tab_index]['handle'], None)
         del data[deleted_tab_index]
         # shift all tab button indices down one following deleted tab
         for i in tab_toggle_children[deleted_tab_index:]:
@@ -270,7 +285,8 @@ def _change_tab(_tab_clicks, _tab_close_clicks, _tab_add_nclicks,
         # force a load if required else return new tab that's been shifted
         if deleted_tab_index == active_tab:
             title_wrapper = get_dashboard_title_input(data[new_tab]['title'])
-            return data, new_tab, tab_toggle_children, data[new_tab]['content'], no_update, title_wrapper, children
+            return data, new_tab, tab_toggle_children, unpark_tab_content(data[new_tab]['handle']), no_update, \
+                title_wrapper, children
         return data, new_tab, tab_toggle_children, no_update, no_update, no_update, children
 
     # else, user requested a tab change
@@ -280,13 +296,14 @@ def _change_tab(_tab_clicks, _tab_close_clicks, _tab_add_nclicks,
         raise PreventUpdate
     # flags to prevent the dashboard from resetting the graph menus
     for i in range(4):
-        if i < data[new_tab]['content'][0]['props']['data-num-tiles']:
+        if i < data[new_tab]['num-tiles']:
             children[i] = Store(id={'type': 'tab-swap-flag', 'index': i}, data=True)
         else:
             children[i] = Store(id={'type': 'tab-swap-flag', 'index': i}, data=False)
-    # else, user requested a different tab. Save the current tab content to the appropriate save location and swap tabs
-    data[active_tab]['content'] = tab_content
+    # else, user requested a different tab. Park the current tab content server-side under its handle and swap tabs
+    session['tab_content_' + data[active_tab]['handle']] = tab_content
     data[active_tab]['title'] = dashboard_title
+    data[active_tab]['num-tiles'] = tab_content[0]['props']['data-num-tiles']
     # set old active tab style as unselected
     tab_toggle_children[active_tab]['props']['className'] = 'dashboard-tab'
     # enable old active tab button
@@ -300,10 +317,11 @@ def _change_tab(_tab_clicks, _tab_close_clicks, _tab_add_nclicks,
     # set new tab close button style as selected
     tab_toggle_children[new_tab]['props']['children'][1]['props']['className'] = 'dashboard-tab-close-selected'
     # set the number of tiles to the number of tiles in the new tab
-    num_tiles = data[new_tab]['content'][0]['props']['data-num-tiles']
+    num_tiles = data[new_tab]['num-tiles']
     # create dashboard title wrapper
     title_wrapper = get_dashboard_title_input(data[new_tab]['title'])
-    return data, new_tab, tab_toggle_children, data[new_tab]['content'], num_tiles, title_wrapper, children
+    return data, new_tab, tab_toggle_children, unpark_tab_content(data[new_tab]['handle']), num_tiles, title_wrapper, \
+        children
 
 
 # Update num-tiles.
@@ -683,6 +701,7 @@ def _update_graph_menu(gm_trigger, selected_graph_type, link_state, rebuild_menu
     :param selected_graph_type: Selected graph type, i.e. 'bar', 'line', etc.
     :return: Graph menu corresponding to selected graph type
     """
+    df_const = get_df_const(df_const)
     # -------------------------------------------Variable Declarations--------------------------------------------------
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][-1]
     # ------------------------------------------------------------------------------------------------------------------
@@ -1050,6 +1069,7 @@ def _manage_data_sidemenus(closed_tile, links_style, data_clicks,
     :param data_states: State of all data side-menus
     :return: Data side-menus for all 5 side-menus
     """
+    df_const = get_df_const(df_const)
     # -------------------------------------------Variable Declarations--------------------------------------------------
     changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
     # initialize return variables, data is NONE and sidemenus are hidden by default
@@ -1267,7 +1287,7 @@ def _manage_data_sidemenus(closed_tile, links_style, data_clicks,
                     df_const = {}
 
                 df_const[session_key] = generate_constants(df_name, session_key)
-                store = df_const
+                store = get_df_const_token(df_const)
                 data[changed_index] = get_data_menu(changed_index, df_name, df_const=df_const, session_key=session_key,
                                                     hier_type=hierarchy_type)
                 sidemenu_styles[changed_index] = DATA_CONTENT_SHOW
@@ -1346,7 +1366,7 @@ def _manage_data_sidemenus(closed_tile, links_style, data_clicks,
                                 df_const = {}
 
                             df_const[session_key] = generate_constants(df_name, session_key)
-                            store = df_const
+                            store = get_df_const_token(df_const)
                     if len(session[session_key]) != 0:
                         # reset data menu for tile no matter what
                         data[tile] = get_data_menu(tile, df_name, df_const=df_const, time_period=time_period,
@@ -1446,7 +1466,7 @@ def _manage_data_sidemenus(closed_tile, links_style, data_clicks,
                                 df_const = {}
 
                             df_const[session_key] = generate_constants(df_name, session_key)
-                            store = df_const
+                            store = get_df_const_token(df_const)
                     # [i]= 'fa-fa-unlink'
                     # set the dataset of the new menu from unlinking
                     if len(session[session_key]) != 0:
@@ -1494,7 +1514,7 @@ def _manage_data_sidemenus(closed_tile, links_style, data_clicks,
         # elif 'RESET' dashboard requested, hide and reset all data tiles
         elif prompt_data[0] == 'reset' and prompt_result == 'ok':
             for i in range(len(data)):
-                data[i] = get_data_menu(i, df_const=df_const)
+                data[i] = get_default_data_menu(i)
                 prev_selection[i] = None
                 prev_time[i] = None
                 prev_hierarchy[i] = None
@@ -1990,7 +2010,7 @@ for x in range(4):
                         }
                         else{
                             string[1]=string[1].replace(')','')
-                            if(dfConst[sessionKey]['VARIABLE_OPTION_LISTS'].includes(string[0])){
+                            if(string[0] == argValue[0]){
                                 if(dfConst[sessionKey]['MEASURE_TYPE_VALUES'].includes(string[1])){
                                     event.x_modified = false;
                                     break;
@@ -2059,7 +2079,7 @@ for x in range(4):
                         string= event.y_axis.split(" (")
                         if(string.length==1){
                             if(argValue[0]=='Time'){
-                                if(dfConst[sessionKey]['VARIABLE_OPTION_LISTS'].includes(string[0])){
+                                if(string[0] == argValue[2]){
                                     event.y_modified = false;
                                     break;
                                 }
@@ -2075,7 +2095,7 @@ for x in range(4):
                         }
                         else{
                             string[1]=string[1].replace(')','')
-                            if(dfConst[sessionKey]['VARIABLE_OPTION_LISTS'].includes(string[0])){
+                            if(string[0] == argValue[2]){
                                 if(dfConst[sessionKey]['MEASURE_TYPE_VALUES'].includes(string[1])){
                                     event.y_modified = false;
                                     break;
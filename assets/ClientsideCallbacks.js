@@ -72,7 +72,6 @@ function isEquivalent(a, b) {
     return true;
 }
 
-
 // Handles Resizing of ContentWrapper, uses x as a throw away output, takes x,y,z and throw away inputs to trigger when tabs are modified
 window.dash_clientside = Object.assign({}, window.dash_clientside, {
     clientside: {
@@ -80,6 +79,22 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
             resizeContentWrapper();
             return x
         },
+        updateGraphStyle: function(gridline, legend, figure) {
+            if (figure == null || figure.layout == null) {
+                return dash_clientside.no_update;
+            }
+
+            // copies the figure so the graph sees a new figure prop, only the styled parts of the layout are copied
+            let showGrid = gridline != null && gridline.length > 0;
+            let layout = Object.assign({}, figure.layout, {'showlegend': !(legend != null && legend.length > 0)});
+            for (let axis of ['xaxis', 'yaxis']) {
+                layout[axis] = Object.assign({}, layout[axis], {'showgrid': showGrid, 'zeroline': showGrid});
+                if (showGrid) {
+                    layout[axis]['gridcolor'] = 'Gray';
+                }
+            }
+            return Object.assign({}, figure, {'layout': layout});
+        },
         graphLoadScreen0: function(trigger) {
             if (trigger == 'confirm-load'){
                 let newDiv = document.createElement('div');
@@ -56,6 +56,124 @@ UPDATING_MSG = os.getenv("UPDATING_MSG")
 if UPDATING_MSG is None:
     UPDATING_MSG = "Updating..."
 
+GRAPH_POINT_BUDGET = os.getenv("GRAPH_POINT_BUDGET")  # max points sent to the browser per line/scatter tile
+
+if GRAPH_POINT_BUDGET is None:
+    GRAPH_POINT_BUDGET = 5000
+else:
+    GRAPH_POINT_BUDGET = int(GRAPH_POINT_BUDGET)
+
+WEBGL_POINT_THRESHOLD = os.getenv("WEBGL_POINT_THRESHOLD")  # points per figure before scatter traces switch to WebGL
+
+if WEBGL_POINT_THRESHOLD is None:
+    WEBGL_POINT_THRESHOLD = 10000
+else:
+    WEBGL_POINT_THRESHOLD = int(WEBGL_POINT_THRESHOLD)
+
+BOX_STATS_THRESHOLD = os.getenv("BOX_STATS_THRESHOLD")  # values per box plot tile before statistics are server-computed
+
+if BOX_STATS_THRESHOLD is None:
+    BOX_STATS_THRESHOLD = 5000
+else:
+    BOX_STATS_THRESHOLD = int(BOX_STATS_THRESHOLD)
+
+BOX_OUTLIER_CAP = os.getenv("BOX_OUTLIER_CAP")  # max outliers drawn per box when statistics are server-computed
+
+if BOX_OUTLIER_CAP is None:
+    BOX_OUTLIER_CAP = 100
+else:
+    BOX_OUTLIER_CAP = int(BOX_OUTLIER_CAP)
+
+ANIMATION_FRAME_CAP = os.getenv("ANIMATION_FRAME_CAP")  # max frames per animated graph
+
+if ANIMATION_FRAME_CAP is None:
+    ANIMATION_FRAME_CAP = 120
+else:
+    ANIMATION_FRAME_CAP = int(ANIMATION_FRAME_CAP)
+
+ANIMATION_CAPPED_DATES = os.getenv("ANIMATION_CAPPED_DATES")  # "average" or "skip" the dates past the frame cap
+
+if ANIMATION_CAPPED_DATES is None:
+    ANIMATION_CAPPED_DATES = "average"
+
+RENDER_CACHE_SIZE = os.getenv("RENDER_CACHE_SIZE")  # results kept per session and render stage for re-renders
+
+if RENDER_CACHE_SIZE is None:
+    RENDER_CACHE_SIZE = 8
+else:
+    RENDER_CACHE_SIZE = int(RENDER_CACHE_SIZE)
+
+RENDER_CACHE_SESSIONS = os.getenv("RENDER_CACHE_SESSIONS")  # user sessions whose render results a process keeps
+
+if RENDER_CACHE_SESSIONS is None:
+    RENDER_CACHE_SESSIONS = 32
+else:
+    RENDER_CACHE_SESSIONS = int(RENDER_CACHE_SESSIONS)
+
+TABLE_NATIVE_ROW_BUDGET = os.getenv("TABLE_NATIVE_ROW_BUDGET")  # max rows paged, sorted and filtered in the browser
+
+if TABLE_NATIVE_ROW_BUDGET is None:
+    TABLE_NATIVE_ROW_BUDGET = 1000
+else:
+    TABLE_NATIVE_ROW_BUDGET = int(TABLE_NATIVE_ROW_BUDGET)
+
+TABLE_NATIVE_BYTE_BUDGET = os.getenv("TABLE_NATIVE_BYTE_BUDGET")  # max in-memory bytes for a browser side table
+
+if TABLE_NATIVE_BYTE_BUDGET is None:
+    TABLE_NATIVE_BYTE_BUDGET = 1000000
+else:
+    TABLE_NATIVE_BYTE_BUDGET = int(TABLE_NATIVE_BYTE_BUDGET)
+
+EXPORT_DIRECTORY = os.getenv("EXPORT_DIRECTORY")  # where generated tile exports are cached for repeat downloads
+
+if EXPORT_DIRECTORY is None:
+    EXPORT_DIRECTORY = os.path.join(os.path.dirname(os.path.realpath(__file__)), "export")
+
+if not os.path.exists(EXPORT_DIRECTORY):
+    os.mkdir(EXPORT_DIRECTORY)
+
+EXPORT_CHUNK_ROWS = os.getenv("EXPORT_CHUNK_ROWS")  # rows written per chunk when streaming an export
+
+if EXPORT_CHUNK_ROWS is None:
+    EXPORT_CHUNK_ROWS = 10000
+else:
+    EXPORT_CHUNK_ROWS = int(EXPORT_CHUNK_ROWS)
+
+EXPORT_CACHE_SIZE = os.getenv("EXPORT_CACHE_SIZE")  # max generated exports kept on disk
+
+if EXPORT_CACHE_SIZE is None:
+    EXPORT_CACHE_SIZE = 32
+else:
+    EXPORT_CACHE_SIZE = int(EXPORT_CACHE_SIZE)
+
+LAYOUT_CACHE_SIZE = os.getenv("LAYOUT_CACHE_SIZE")  # serialized layout fragments kept across languages and clients
+
+if LAYOUT_CACHE_SIZE is None:
+    LAYOUT_CACHE_SIZE = 64
+else:
+    LAYOUT_CACHE_SIZE = int(LAYOUT_CACHE_SIZE)
+
+HIERARCHY_CACHE_SIZE = os.getenv("HIERARCHY_CACHE_SIZE")  # hierarchy trees kept across data set versions
+
+if HIERARCHY_CACHE_SIZE is None:
+    HIERARCHY_CACHE_SIZE = 16
+else:
+    HIERARCHY_CACHE_SIZE = int(HIERARCHY_CACHE_SIZE)
+
+DROPDOWN_OPTION_LIMIT = os.getenv("DROPDOWN_OPTION_LIMIT")  # max options sent per search of a searchable dropdown
+
+if DROPDOWN_OPTION_LIMIT is None:
+    DROPDOWN_OPTION_LIMIT = 100
+else:
+    DROPDOWN_OPTION_LIMIT = int(DROPDOWN_OPTION_LIMIT)
+
+DATASET_LOAD_WORKERS = os.getenv("DATASET_LOAD_WORKERS")  # max data sets pulled at once when loading a dashboard
+
+if DATASET_LOAD_WORKERS is None:
+    DATASET_LOAD_WORKERS = 4
+else:
+    DATASET_LOAD_WORKERS = int(DATASET_LOAD_WORKERS)
+
 # logging setup ########################################################################################################
 
 LOG_FORMAT = "[%(asctime)s] %(levelname)s in %(filename)s (fn:%(funcName)s ln:%(lineno)d): %(message)s"
@@ -76,7 +76,8 @@ def load_labels(language="En"):
 
 def load_saved_graphs_from_db():
     """
-    loads the saved layouts into the saved_layouts dictionary from the database
+    loads the titles of the saved layouts into the saved_layout_titles dictionary from the database, the layouts
+    themselves are fetched when first used (see saving_functions.get_saved_layout)
     """
     query = """\
     declare @p_result_status varchar(255)
@@ -88,7 +89,7 @@ def load_saved_graphs_from_db():
     results = exec_storedproc_results(query)
 
     for i, row in results.iterrows():
-        session['saved_layouts'][row["ref_value"]] = json.loads(row["clob_text"])
+        session['saved_layout_titles'][row["ref_value"]] = row["ref_desc"]
 
 
 def load_saved_dashboards_from_db():
@@ -262,6 +263,7 @@ def before_request_func():
 
         # setup session variables
         session['saved_layouts'] = {}
+        session['saved_layout_titles'] = {}
         session['saved_dashboards'] = {}
         session['tile_edited'] = {0: True, 1: True, 2: True, 3: True, 4: True}
 
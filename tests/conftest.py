@@ -0,0 +1,13 @@
+######################################################################################################################
+"""
+conftest.py
+
+Shared pytest setup, the dashboard modules are imported from the repository root.
+"""
+######################################################################################################################
+
+# External Packages
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
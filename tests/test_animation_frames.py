@@ -0,0 +1,64 @@
+######################################################################################################################
+"""
+test_animation_frames.py
+
+Tests how the animation frame arrays handle the dates past the frame cap.
+"""
+######################################################################################################################
+
+# External Packages
+import pandas as pd
+import pytest
+
+# Internal Modules
+import config
+from apps.dashboard.graphs import get_frame_arrays
+
+DATES = ['2020-01-01', '2020-02-01', '2020-03-01', '2020-04-01', '2020-05-01', '2020-06-01']
+
+
+def get_test_df():
+    """Returns two members over six dates, member 'b' missing on the second date."""
+    rows = []
+    for i, date in enumerate(DATES):
+        for member in 'ab':
+            if member == 'b' and i == 1:
+                continue
+            rows.append({'Date of Event': date, 'H1': member, 'Measure Value': float(i if member == 'a' else 10 * i)})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def frame_cap(monkeypatch):
+    monkeypatch.setattr(config, 'ANIMATION_FRAME_CAP', 3)
+    return monkeypatch
+
+
+def test_dates_past_the_cap_are_averaged_into_frames(frame_cap):
+    frame_cap.setattr(config, 'ANIMATION_CAPPED_DATES', 'average')
+    frame_names, trace_names, _, arrays, num_dates = get_frame_arrays(get_test_df(), 'Date of Event', 'H1', None,
+                                                                      ['Measure Value', 'H1'])
+    assert list(frame_names) == ['2020-01-01 - 2020-02-01', '2020-03-01 - 2020-04-01', '2020-05-01 - 2020-06-01']
+    assert num_dates == 6
+    # every date counts towards its frame, a member missing on a date is averaged over the dates it has
+    assert list(arrays['Measure Value'][:, 0, 0]) == [0.5, 2.5, 4.5]
+    assert list(arrays['Measure Value'][:, 1, 0]) == [0.0, 25.0, 45.0]
+    assert list(arrays['H1'][:, 1, 0]) == ['b', 'b', 'b']
+
+
+def test_dates_past_the_cap_can_be_skipped(frame_cap):
+    frame_cap.setattr(config, 'ANIMATION_CAPPED_DATES', 'skip')
+    frame_names, _, _, arrays, num_dates = get_frame_arrays(get_test_df(), 'Date of Event', 'H1', None,
+                                                            ['Measure Value'])
+    assert list(frame_names) == ['2020-01-01', '2020-03-01', '2020-06-01']
+    assert num_dates == 6
+    assert list(arrays['Measure Value'][:, 0, 0]) == [0.0, 2.0, 5.0]
+
+
+def test_dates_within_the_cap_each_get_a_frame(frame_cap):
+    frame_cap.setattr(config, 'ANIMATION_FRAME_CAP', len(DATES))
+    frame_names, _, _, arrays, num_dates = get_frame_arrays(get_test_df(), 'Date of Event', 'H1', None,
+                                                            ['Measure Value'])
+    assert list(frame_names) == DATES
+    assert num_dates == len(DATES)
+    assert pd.isna(arrays['Measure Value'][1, 1, 0])
@@ -0,0 +1,46 @@
+######################################################################################################################
+"""
+test_box_plot_statistics.py
+
+Tests the server-side box plot statistics against pandas' own quantiles and Tukey fences.
+"""
+######################################################################################################################
+
+# External Packages
+import pandas as pd
+from numpy import arange, nan
+
+# Internal Modules
+from apps.dashboard.data import box_plot_statistics
+
+
+def get_test_df():
+    """Returns two groups of values, the first with outliers on both sides."""
+    values = list(arange(1, 21, dtype=float)) + [-100, 250, 300]
+    return pd.DataFrame({'Variable Name': ['a'] * len(values) + ['b'] * 5,
+                         'Measure Value': values + [5, 6, nan, 7, 8]})
+
+
+def test_statistics_match_pandas():
+    dff = get_test_df()
+    stats_df, _ = box_plot_statistics(dff, ['Variable Name'], 10)
+    stats_df = stats_df.set_index('Variable Name')
+    for name, group in dff.groupby('Variable Name')['Measure Value']:
+        assert stats_df.loc[name, 'q1'] == group.quantile(0.25)
+        assert stats_df.loc[name, 'median'] == group.quantile(0.5)
+        assert stats_df.loc[name, 'q3'] == group.quantile(0.75)
+        assert stats_df.loc[name, 'mean'] == group.mean()
+
+
+def test_fences_are_the_extreme_values_inside_the_whiskers():
+    stats_df, outliers_df = box_plot_statistics(get_test_df(), ['Variable Name'], 10)
+    stats_df = stats_df.set_index('Variable Name')
+    assert stats_df.loc['a', 'lowerfence'] == 1 and stats_df.loc['a', 'upperfence'] == 20
+    assert stats_df.loc['b', 'lowerfence'] == 5 and stats_df.loc['b', 'upperfence'] == 8
+    assert sorted(outliers_df['Measure Value']) == [-100, 250, 300]
+    assert set(outliers_df['Variable Name']) == {'a'}
+
+
+def test_outliers_are_capped_to_the_most_extreme():
+    _, outliers_df = box_plot_statistics(get_test_df(), ['Variable Name'], 2)
+    assert sorted(outliers_df['Measure Value']) == [250, 300]
@@ -0,0 +1,46 @@
+######################################################################################################################
+"""
+test_dataset_store.py
+
+Tests that storing a pulled data set replaces everything derived from the previous load, even when it is empty.
+"""
+######################################################################################################################
+
+# External Packages
+import pytest
+import pandas as pd
+from flask import session
+
+# Internal Modules
+from server import server
+from apps.dashboard import data
+from apps.dashboard.data import store_dataset, get_loaded_version, get_render_cache, set_render_cache, \
+    EMPTY_DATASET_DIGEST
+
+
+@pytest.fixture
+def user_session(monkeypatch):
+    """Yields a new user session holding a loaded sankey data set, with empty process caches."""
+    monkeypatch.setattr(data, 'DATASET_VERSIONS', {})
+    monkeypatch.setattr(data, 'RENDER_CACHES', data.OrderedDict())
+    with server.test_request_context():
+        session['sessionID'] = 1
+        session['language'] = 'En'
+        store_dataset('OPG010', 'all-time', pd.DataFrame({'a': [1]}), 'loaded', pd.DataFrame({'node_id': [1]}))
+        session['OPG010_NodeMeta_En'] = {}
+        set_render_cache('figure', 'key', 'figure')
+        yield
+
+
+def test_empty_pull_replaces_the_previous_load(user_session):
+    assert get_loaded_version('OPG010') == 'loaded'
+    store_dataset('OPG010', 'all-time', pd.DataFrame(), EMPTY_DATASET_DIGEST, None)
+    assert get_loaded_version('OPG010') == EMPTY_DATASET_DIGEST
+    assert get_render_cache('figure', 'key') is None
+    assert 'OPG010_NodeData' not in session and 'OPG010_NodeMeta_En' not in session
+
+
+def test_reload_drops_the_node_metadata(user_session):
+    store_dataset('OPG010', 'all-time', pd.DataFrame({'a': [2]}), 'reloaded', pd.DataFrame({'node_id': [2]}))
+    assert get_loaded_version('OPG010') == 'reloaded'
+    assert 'OPG010_NodeMeta_En' not in session and 'OPG010_NodeData' in session
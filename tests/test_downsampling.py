@@ -0,0 +1,71 @@
+######################################################################################################################
+"""
+test_downsampling.py
+
+Tests the Largest-Triangle-Three-Buckets downsampling of line and scatter traces.
+"""
+######################################################################################################################
+
+# External Packages
+import pandas as pd
+from numpy import arange, sin, diff, array_equal
+
+# Internal Modules
+from apps.dashboard.data import lttb_downsample, downsample_traces
+
+
+def test_lttb_keeps_every_point_within_threshold():
+    x = arange(10, dtype=float)
+    assert array_equal(lttb_downsample(x, x, 10), arange(10))
+    assert array_equal(lttb_downsample(x, x, 50), arange(10))
+
+
+def test_lttb_keeps_every_point_below_minimum_threshold():
+    x = arange(10, dtype=float)
+    assert array_equal(lttb_downsample(x, x, 2), arange(10))
+
+
+def test_lttb_keeps_threshold_points_in_order():
+    x = arange(1000, dtype=float)
+    kept = lttb_downsample(x, sin(x / 25), 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert (diff(kept) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    x = arange(1000, dtype=float)
+    y = x * 0
+    y[437] = 100
+    y[702] = -100
+    kept = lttb_downsample(x, y, 20)
+    assert 437 in kept and 702 in kept
+
+
+def test_lttb_handles_missing_values():
+    x = arange(100, dtype=float)
+    y = sin(x)
+    y[10:20] = float('nan')
+    assert len(lttb_downsample(x, y, 10)) == 10
+
+
+def test_downsample_traces_fits_budget_per_trace():
+    dates = pd.date_range('2020-01-01', periods=500, freq='D')
+    dff = pd.concat([pd.DataFrame({'Date of Event': dates, 'Measure Value': sin(arange(500) / 10) * (i + 1),
+                                   'Partial Period': 'False', 'Variable Name': name})
+                     for i, name in enumerate(['a', 'b'])], ignore_index=True)
+    dff.loc[dff.index[-1], 'Partial Period'] = 'True'
+    result = downsample_traces(dff, ['Variable Name'], 100)
+    assert set(result['Variable Name']) == {'a', 'b'}
+    # each trace gets half the budget, plus its partial periods and extremes
+    assert (result.groupby('Variable Name').size() <= 50 + 3).all()
+    assert (result['Partial Period'] == 'True').sum() == 1
+    for name, trace in dff.groupby('Variable Name'):
+        kept = result[result['Variable Name'] == name]['Measure Value']
+        assert kept.max() == trace['Measure Value'].max() and kept.min() == trace['Measure Value'].min()
+
+
+def test_downsample_traces_within_budget_is_unchanged():
+    dff = pd.DataFrame({'Date of Event': pd.date_range('2020-01-01', periods=10), 'Measure Value': arange(10),
+                        'Partial Period': 'False'})
+    assert downsample_traces(dff, [], 10) is dff
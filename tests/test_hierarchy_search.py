@@ -0,0 +1,64 @@
+######################################################################################################################
+"""
+test_hierarchy_search.py
+
+Tests the prefix search of the hierarchy trees' children.
+"""
+######################################################################################################################
+
+# External Packages
+import pytest
+import pandas as pd
+from vaex import from_pandas
+from flask import session
+
+# Internal Modules
+from server import server
+from apps.dashboard import data
+from apps.dashboard.data import get_hierarchy_children, search_hierarchy_children
+
+SESSION_KEY = 'OPG011last-month'
+
+
+@pytest.fixture
+def variable_hierarchy(monkeypatch):
+    """Loads a variable hierarchy into a new user session, with an empty process hierarchy tree cache."""
+    monkeypatch.setattr(data, 'HIERARCHY_TREES', data.OrderedDict())
+    dff = pd.DataFrame({'Variable Name': ['beta', 'Alpha', 'alpha2', 'Gamma', 'apple', 'Alpha', None],
+                        'Variable Name Qualifier': [None, 'x', None, None, None, 'y', None],
+                        'Variable Name Sub Qualifier': [None] * 7})
+    with server.test_request_context():
+        session['language'] = 'En'
+        session[SESSION_KEY] = from_pandas(dff)
+        session['dataset_versions'] = {SESSION_KEY: data.set_dataset_version(SESSION_KEY, data.get_dataset_digest(dff))}
+        yield
+
+
+def test_children_are_in_sorted_order(variable_hierarchy):
+    assert get_hierarchy_children(SESSION_KEY, 'root', secondary=True) == ['Alpha', 'Gamma', 'alpha2', 'apple',
+                                                                            'beta']
+    assert get_hierarchy_children(SESSION_KEY, 'root^||^Alpha', secondary=True) == ['x', 'y']
+    assert get_hierarchy_children(SESSION_KEY, 'root^||^beta', secondary=True) == []
+    assert get_hierarchy_children(SESSION_KEY, 'root^||^missing', secondary=True) == []
+
+
+def test_prefix_search_ignores_case_in_children_order(variable_hierarchy):
+    assert search_hierarchy_children(SESSION_KEY, 'root', 'al', 10, secondary=True) == ['Alpha', 'alpha2']
+    assert search_hierarchy_children(SESSION_KEY, 'root', 'A', 10, secondary=True) == ['Alpha', 'alpha2', 'apple']
+    assert search_hierarchy_children(SESSION_KEY, 'root', 'ALPHA2', 10, secondary=True) == ['alpha2']
+    assert search_hierarchy_children(SESSION_KEY, 'root', 'z', 10, secondary=True) == []
+    assert search_hierarchy_children(SESSION_KEY, 'root^||^missing', 'a', 10, secondary=True) == []
+
+
+def test_search_is_limited(variable_hierarchy):
+    assert search_hierarchy_children(SESSION_KEY, 'root', 'a', 2, secondary=True) == ['Alpha', 'alpha2']
+    assert search_hierarchy_children(SESSION_KEY, 'root', None, 2, secondary=True) == ['Alpha', 'Gamma']
+    assert search_hierarchy_children(SESSION_KEY, 'root', '', 10, secondary=True) == \
+        get_hierarchy_children(SESSION_KEY, 'root', secondary=True)
+
+
+def test_trees_are_shared_by_data_set_version(variable_hierarchy):
+    tree = data.get_hierarchy_tree(SESSION_KEY, secondary=True)
+    assert data.get_hierarchy_tree(SESSION_KEY, secondary=True) is tree
+    session['dataset_versions'] = {SESSION_KEY: ('reloaded', None)}
+    assert data.get_hierarchy_tree(SESSION_KEY, secondary=True) is not tree
@@ -0,0 +1,137 @@
+######################################################################################################################
+"""
+test_line_traces.py
+
+Tests that the hand built line/scatter, bar, bubble and box traces and layouts serialize the same as the plotly express
+figures they replace.
+"""
+######################################################################################################################
+
+# External Packages
+import json
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Internal Modules
+from apps.dashboard.graphs import get_line_traces, get_fit_trace, get_base_layout, get_bar_traces, get_bubble_traces, \
+    get_box_traces
+
+COLOR_DISCRETE = ['#3366CC', '#DC3912', '#FF9900']
+
+HOVERTEMPLATE = 'Date=%{x}<br>Value=%{y}<extra></extra>'
+
+
+def get_test_df():
+    """Returns a frame of three colours, one of them spread over two line groups, in a non sorted order."""
+    return pd.DataFrame({
+        'Date of Event': pd.to_datetime(['2020-01-01', '2020-02-01', '2020-03-01'] * 4),
+        'Measure Value': [3.0, 1.5, 2.0, 7.0, 6.0, 8.0, 4.0, 4.5, 5.0, 1.0, 0.5, 0.0],
+        'Variable Name': ['b'] * 3 + ['a'] * 3 + ['b'] * 3 + ['c'] * 3,
+        'H1': ['y'] * 3 + ['y'] * 3 + ['x'] * 3 + ['z'] * 3})
+
+
+def get_serialized_figure(fig):
+    """Returns the figure as plotly json, without the template px adds and the default orientation of its traces."""
+    fig = json.loads(fig.to_json())
+    fig['layout'].pop('template', None)
+    for trace in fig['data']:
+        trace.pop('orientation', None)
+    return fig
+
+
+def test_line_traces_match_px_line():
+    dff = get_test_df()
+    for line_group in [None, 'H1']:
+        for render_mode, mode in [('svg', 'lines'), ('webgl', 'markers')]:
+            expected = px.line(data_frame=dff, x='Date of Event', y='Measure Value', color='Variable Name',
+                               line_group=line_group, custom_data=['H1', 'Variable Name'],
+                               color_discrete_sequence=COLOR_DISCRETE, render_mode=render_mode, title='Title')
+            expected.update_layout(legend_title_text='Legend')
+            expected.update_traces(mode=mode, hovertemplate=HOVERTEMPLATE)
+
+            traces = get_line_traces(dff, 'Variable Name', line_group, ['H1', 'Variable Name'], COLOR_DISCRETE,
+                                     render_mode, mode, HOVERTEMPLATE)
+            actual = go.Figure(data=traces, layout=get_base_layout('Title', 'Legend', 'Date of Event',
+                                                                    'Measure Value'), _validate=False)
+
+            assert get_serialized_figure(actual) == get_serialized_figure(expected)
+
+
+def test_fit_trace_matches_px_line():
+    dff = get_test_df().assign(**{'Best Fit': range(12)})
+    for render_mode in ['svg', 'webgl']:
+        expected = px.line(data_frame=dff, x='Date of Event', y='Best Fit', render_mode=render_mode)
+        expected.update_traces(line_color='#A9A9A9')
+        expected.data[0].name = 'Best fit'
+        expected.data[0].showlegend = True
+
+        actual = go.Figure(data=[get_fit_trace(dff, 'Best Fit', 'Best fit', '#A9A9A9', render_mode)],
+                           _validate=False)
+
+        assert get_serialized_figure(actual)['data'] == get_serialized_figure(expected)['data']
+
+
+def test_bar_traces_match_px_bar():
+    dff = get_test_df()
+    dff['Date of Event'] = dff['Date of Event'].dt.strftime('%Y-%m-%d')
+    for x, color in [('H1', 'Variable Name'), ('Date of Event', 'Variable Name'), ('Variable Name', 'H1')]:
+        for orientation in ['Vertical', 'Horizontal']:
+            expected = px.bar(title='Title', data_frame=dff, x=x if orientation == 'Vertical' else 'Measure Value',
+                              y='Measure Value' if orientation == 'Vertical' else x,
+                              orientation='v' if orientation == 'Vertical' else 'h', color=color,
+                              color_discrete_sequence=COLOR_DISCRETE, barmode='group',
+                              custom_data=['H1', color, 'Date of Event'])
+            expected.update_traces(hovertemplate=HOVERTEMPLATE)
+
+            traces = get_bar_traces(dff, x, color, ['H1', color, 'Date of Event'], orientation, COLOR_DISCRETE)
+            actual = go.Figure(data=traces, layout=get_base_layout(
+                'Title', color, x if orientation == 'Vertical' else 'Measure Value',
+                'Measure Value' if orientation == 'Vertical' else x, 'Bar'), _validate=False)
+            actual.update_traces(hovertemplate=HOVERTEMPLATE)
+
+            assert get_serialized_figure(actual) == get_serialized_figure(expected)
+
+
+def test_bubble_traces_match_px_scatter():
+    dff = get_test_df()
+    dff['Date of Event'] = dff['Date of Event'].dt.strftime('%Y-%m-%d')
+    dff['Measure Type'] = 'Count'
+    # the bubble graph pivots each variable into its own (variable, measure type) column
+    dff = pd.concat([dff.assign(**{'Variable Name': 'Size'}), dff.assign(**{'Variable Name': 'b'})]).pivot_table(
+        index=['Date of Event', 'H1'], columns=['Variable Name', 'Measure Type'],
+        values='Measure Value').reset_index().dropna()
+    for render_mode in ['svg', 'webgl']:
+        expected = px.scatter(render_mode=render_mode, title='Title', x=dff['Date of Event'], y=dff['b', 'Count'],
+                              size=dff['Size', 'Count'], color=dff['H1'], color_discrete_sequence=COLOR_DISCRETE,
+                              custom_data=[dff['H1'], dff['Date of Event'], dff['Size', 'Count']])
+        expected.update_traces(hovertemplate=HOVERTEMPLATE)
+
+        traces = get_bubble_traces(dff['Date of Event'], dff['b', 'Count'], dff['Size', 'Count'], dff['H1'],
+                                   [dff['H1'], dff['Date of Event'], dff['Size', 'Count']], COLOR_DISCRETE,
+                                   render_mode)
+        actual = go.Figure(data=traces, layout=get_base_layout('Title', 'color', 'x', 'y', 'Bubble'),
+                           _validate=False)
+        actual.update_traces(hovertemplate=HOVERTEMPLATE)
+
+        assert len(actual.data) == 3
+        assert get_serialized_figure(actual) == get_serialized_figure(expected)
+
+
+def test_box_traces_match_px_box():
+    dff = get_test_df()
+    for position in [None, 'H1']:
+        for orientation in ['Vertical', 'Horizontal']:
+            for show_points in [True, False]:
+                expected = px.box(title='Title', data_frame=dff,
+                                  x='Measure Value' if orientation == 'Horizontal' else position,
+                                  y=position if orientation == 'Horizontal' else 'Measure Value',
+                                  color='Variable Name', color_discrete_sequence=COLOR_DISCRETE,
+                                  points='all' if show_points else False)
+
+                traces = get_box_traces(dff, 'Variable Name', position, orientation, COLOR_DISCRETE, show_points)
+                actual = go.Figure(data=traces, layout=get_base_layout(
+                    'Title', 'Variable Name', 'Measure Value' if orientation == 'Horizontal' else position,
+                    position if orientation == 'Horizontal' else 'Measure Value', 'Box_Plot'), _validate=False)
+
+                assert get_serialized_figure(actual) == get_serialized_figure(expected)
@@ -0,0 +1,70 @@
+######################################################################################################################
+"""
+test_reindex_json.py
+
+Tests the re-indexing of serialized tile layouts against the recursive change_index it replaced.
+"""
+######################################################################################################################
+
+# External Packages
+import json
+from plotly.utils import PlotlyJSONEncoder
+import dash_core_components as dcc
+import dash_html_components as html
+
+# Internal Modules
+from apps.dashboard.layouts import reindex_json, change_index
+
+
+def change_index_recursively(doc, index):
+    """The recursive change_index reindex_json replaced, kept as the reference implementation."""
+
+    def _change_index(document, new_index):
+        if isinstance(document, list):
+            for list_items in document:
+                _change_index(document=list_items, new_index=new_index)
+        elif isinstance(document, dict):
+            for dict_key, dict_value in document.items():
+                if dict_key == 'index':
+                    document['index'] = new_index
+                elif dict_key == 'type' and 'args-value: ' in dict_value:
+                    document['type'] = 'args-value: {}'.replace("{}", str(new_index))
+                    break
+                elif dict_key == 'type' and 'button: ' in dict_value:
+                    document['type'] = 'button: {}'.replace("{}", str(new_index))
+                _change_index(document=dict_value, new_index=new_index)
+        return document
+
+    return _change_index(document=doc, new_index=index)
+
+
+def get_tile_layout():
+    """Returns a layout holding every kind of id a tile or its menus use, serialized as plotly json."""
+    return json.loads(json.dumps(html.Div([
+        html.Div(id={'type': 'tile-title-wrapper', 'index': 0}, children=[
+            dcc.Input(id={'type': 'tile-title', 'index': 0}, value='A "quoted" title, "index": 7')]),
+        dcc.Store(id={'type': 'tab-swap-flag', 'index': 0}, data={'index': 2, 'values': [1, 2]}),
+        dcc.Dropdown(id={'type': 'args-value: 0', 'index': 3}, options=[{'label': 'a', 'value': 'a'}]),
+        dcc.RadioItems(id={'type': 'args-value: 0', 'index': 0}, options=[], value=None),
+        html.Div([html.Button('Level', id={'type': 'button: 0', 'index': 2}),
+                  html.Button('Level', id={'type': 'secondary_hierarchy-button: 0', 'index': 1})]),
+        dcc.Markdown('{"type": "args-value: 0", "index": 4}', id={'type': 'graph-info', 'index': 0}),
+        html.I(id={'type': 'tile-link', 'index': 'none'}, className='fa fa-link'),
+        html.Div(id='tile-body')], id={'type': 'tile', 'index': 0}), cls=PlotlyJSONEncoder))
+
+
+def test_reindex_json_matches_change_index_recursion():
+    for index in [1, 3, 12]:
+        expected = change_index_recursively(get_tile_layout(), index)
+        assert json.loads(reindex_json(json.dumps(get_tile_layout()), index)) == expected
+        assert change_index(get_tile_layout(), index) == expected
+
+
+def test_reindex_json_keeps_argument_indices_and_text():
+    layout = change_index(get_tile_layout(), 2)
+    serialized = json.dumps(layout)
+    assert '"type": "args-value: 2", "index": 3' in serialized
+    assert '"type": "args-value: 2", "index": 0' in serialized
+    assert '"type": "button: 2", "index": 2' in serialized
+    assert 'A \\"quoted\\" title, \\"index\\": 7' in serialized
+    assert '{\\"type\\": \\"args-value: 0\\", \\"index\\": 4}' in serialized
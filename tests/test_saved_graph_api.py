@@ -0,0 +1,97 @@
+######################################################################################################################
+"""
+test_saved_graph_api.py
+
+Tests the conditional requests of the saved graph api, answered from the data set version before loading anything.
+"""
+######################################################################################################################
+
+# External Packages
+import pytest
+from datetime import datetime
+from pandas import DataFrame
+from werkzeug.http import http_date
+from flask import session
+
+# Internal Modules
+from server import server
+from apps.dashboard import data, routes
+
+LAYOUT = {'Data Set': 'OPG011', 'Time Period': 'last-month', 'Title': 'Graph'}
+
+SESSION_KEY = 'OPG011last-month'
+
+# digest of the rows the faked data set loads return
+DATABASE = {'digest': 'loaded'}
+
+
+@pytest.fixture
+def graph_api(monkeypatch):
+    """Returns the data set loads made by the api, the saved layout, data set and aggregation are faked."""
+    loads = []
+
+    def load_data_set(layout):
+        loads.append(layout)
+        session.setdefault('dataset_versions', {})[SESSION_KEY] = data.set_dataset_version(SESSION_KEY,
+                                                                                            DATABASE['digest'])
+        return SESSION_KEY
+
+    monkeypatch.setattr(routes, 'get_saved_layout', lambda layout_pointer: LAYOUT)
+    monkeypatch.setattr(routes, 'load_data_set', load_data_set)
+    monkeypatch.setattr(routes, 'get_layout_arguments', lambda layout: {'timeframe': 'all-time', 'num_periods': None})
+    monkeypatch.setattr(routes, 'data_manipulator', lambda **arguments: DataFrame({'Measure Value': [1, 2]}))
+    monkeypatch.setattr(data, 'DATASET_VERSIONS', {})
+    monkeypatch.setitem(DATABASE, 'digest', 'loaded')
+    return loads
+
+
+def request_graph(headers=None):
+    """Returns the api response to a data request made with the headers, in a new user session."""
+    with server.test_request_context('/api/graph/Report_Ext_Graph?content=data', headers=headers):
+        session['sessionID'] = 1
+        session['language'] = 'En'
+        return routes.get_saved_graph('Report_Ext_Graph')
+
+
+def test_unknown_version_loads_the_data_set(graph_api):
+    response = request_graph()
+    assert response.status_code == 200
+    assert response.get_json() == [{'Measure Value': 1}, {'Measure Value': 2}]
+    assert response.get_etag()[0] and response.last_modified is not None
+    assert len(graph_api) == 1
+
+
+def test_matching_etag_is_answered_without_loading(graph_api):
+    etag = request_graph().get_etag()[0]
+    response = request_graph({'If-None-Match': '"{}"'.format(etag)})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag
+    # only the first request, whose session had not loaded the data set, loaded it
+    assert len(graph_api) == 1
+
+
+def test_stale_etag_reloads(graph_api):
+    request_graph()
+    response = request_graph({'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+    assert len(graph_api) == 2
+
+
+def test_if_modified_since_is_answered_without_loading(graph_api):
+    last_modified = request_graph().last_modified
+    response = request_graph({'If-Modified-Since': http_date(last_modified)})
+    assert response.status_code == 304
+    assert len(graph_api) == 1
+    response = request_graph({'If-Modified-Since': http_date(datetime(2000, 1, 1))})
+    assert response.status_code == 200
+    assert len(graph_api) == 2
+
+
+def test_changed_data_changes_the_etag(graph_api):
+    etag = request_graph().get_etag()[0]
+    # the data set changes in the database and another session loads it
+    DATABASE['digest'] = 'reloaded'
+    request_graph()
+    response = request_graph({'If-None-Match': '"{}"'.format(etag)})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
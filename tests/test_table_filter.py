@@ -0,0 +1,59 @@
+######################################################################################################################
+"""
+test_table_filter.py
+
+Tests the parsing of datatable filter queries and the row filtering of the server-side table cache.
+"""
+######################################################################################################################
+
+# External Packages
+import pandas as pd
+from numpy import array_equal
+
+# Internal Modules
+from apps.dashboard.functionality_callbacks import split_filter_part, compile_filter_query, get_filtered_positions
+
+
+def test_split_symbol_and_word_operators():
+    assert split_filter_part('{Measure Value} >= 5') == ('Measure Value', 'ge', 5.0)
+    assert split_filter_part('{Measure Value} ge 5') == ('Measure Value', 'ge', 5.0)
+    assert split_filter_part('{Measure Value} < -1.5') == ('Measure Value', 'lt', -1.5)
+    assert split_filter_part('{Measure Value} != 3') == ('Measure Value', 'ne', 3.0)
+    assert split_filter_part('{H1} = Ottawa') == ('H1', 'eq', 'Ottawa')
+    assert split_filter_part('{H1} contains Ott') == ('H1', 'contains', 'Ott')
+    assert split_filter_part('{Date of Event} datestartswith 2020-01') == ('Date of Event', 'datestartswith',
+                                                                           '2020-01')
+
+
+def test_split_quoted_values():
+    assert split_filter_part('{H1} contains "a b"') == ('H1', 'contains', 'a b')
+    assert split_filter_part("{H1} eq 'it\\'s'") == ('H1', 'eq', "it's")
+    assert split_filter_part('{H1} = "5"') == ('H1', 'eq', '5')
+
+
+def test_split_column_names_holding_operators():
+    assert split_filter_part('{a >= b} > 2') == ('a >= b', 'gt', 2.0)
+    assert split_filter_part('{contains eq} contains x') == ('contains eq', 'contains', 'x')
+
+
+def test_split_invalid_parts():
+    assert split_filter_part('') == [None] * 3
+    assert split_filter_part('{H1} contains ') == [None] * 3
+    assert split_filter_part('H1 = 3') == [None] * 3
+
+
+def test_compile_lowers_string_clauses_and_drops_invalid_ones():
+    assert compile_filter_query('{H1} contains "OtT" && {Measure Value} > 2 && {H2} contains 5 && bad') == (
+        ('H1', 'contains', 'ott'), ('Measure Value', 'gt', 2.0))
+
+
+def test_filtered_positions_and_every_clause():
+    dff = pd.DataFrame({'H1': ['Ottawa', 'Toronto', 'ottawa east', 'Montreal'],
+                        'Measure Value': [1.0, 5.0, 7.0, 9.0],
+                        'Date of Event': ['2020-01-01', '2020-01-15', '2020-02-01', '2020-01-31']})
+    lowered_columns = {}
+    assert array_equal(get_filtered_positions(dff, '{H1} contains OTT && {Measure Value} >= 5', lowered_columns), [2])
+    assert array_equal(get_filtered_positions(dff, '{Date of Event} datestartswith 2020-01', lowered_columns),
+                       [0, 1, 3])
+    assert set(lowered_columns) == {'H1', 'Date of Event'}
+    assert array_equal(get_filtered_positions(dff, '{Measure Value} ne 5', lowered_columns), [0, 2, 3])
@@ -0,0 +1,50 @@
+######################################################################################################################
+"""
+test_top_n_bucketing.py
+
+Tests the bucketing of every member past the top n into a single "Other" member.
+"""
+######################################################################################################################
+
+# External Packages
+import pandas as pd
+from numpy import nan
+
+# Internal Modules
+from apps.dashboard.data import top_n_bucketing
+
+
+def get_test_df():
+    """Returns five members over two dates, member 'e' ranked last."""
+    rows = []
+    for date in ['2020-01-01', '2020-02-01']:
+        for member, value in zip('abcde', [50, 40, 30, 20, 10]):
+            rows.append({'Date of Event': date, 'H1': member, 'Variable Name': 'v', 'Measure Type': 'm',
+                         'Measure Value': value, 'Partial Period': 'True' if member == 'e' and
+                         date == '2020-02-01' else nan})
+    return pd.DataFrame(rows)
+
+
+def test_members_past_top_n_are_summed_per_date():
+    result = top_n_bucketing(get_test_df(), 'H1', 2, 'Other')
+    assert set(result['H1']) == {'a', 'b', 'Other'}
+    other = result[result['H1'] == 'Other'].set_index('Date of Event')
+    assert list(other['Measure Value']) == [60, 60]
+    # the bucket is partial where any of its members is
+    assert other.loc['2020-02-01', 'Partial Period'] is True
+    assert pd.isna(other.loc['2020-01-01', 'Partial Period'])
+    assert result['Measure Value'].sum() == get_test_df()['Measure Value'].sum()
+
+
+def test_rank_mask_ranks_over_its_rows_only():
+    dff = get_test_df()
+    dff.loc[(dff['Date of Event'] == '2020-02-01') & (dff['H1'] == 'e'), 'Measure Value'] = 1000
+    result = top_n_bucketing(dff, 'H1', 1, 'Other', rank_mask=dff['Date of Event'] == '2020-02-01')
+    assert set(result['H1']) == {'e', 'Other'}
+
+
+def test_frames_within_top_n_are_unchanged():
+    dff = get_test_df()
+    assert top_n_bucketing(dff, 'H1', 5, 'Other') is dff
+    assert top_n_bucketing(dff, 'H1', None, 'Other') is dff
+    assert top_n_bucketing(dff, 'Missing', 2, 'Other') is dff